@@ -5,8 +5,17 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from .routers.students import router as students_router
 from .routers.analytics import router as analytics_router
+from .routers.rankings import router as rankings_router
+from .routers.cohorts import router as cohorts_router
 from .routers.latex.fragility import router as latex_router
-from database import DatabaseManager
+from .routers.latex.network import router as network_router
+from .routers.latex.library import router as library_router, load_index
+from .routers.latex.batch import router as batch_router
+from fragility import shutdown_pool as shutdown_connectivity_pool
+from database import (
+    DatabaseManager, RailNetwork, FragilityLibrary, StudentAggregates, GradePartitioning, GradeSketches,
+    GradeNormalization, GradeImport
+)
 
 # Create FastAPI app
 app = FastAPI(
@@ -24,12 +33,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count"],
 )
 
 # Include routers
 app.include_router(students_router)
 app.include_router(analytics_router)
+app.include_router(rankings_router)
+app.include_router(cohorts_router)
 app.include_router(latex_router)
+app.include_router(network_router)
+app.include_router(library_router)
+app.include_router(batch_router)
 
 
 @app.get("/")
@@ -43,7 +58,11 @@ async def root():
         "endpoints": {
             "students": "/students",
             "analytics": "/analytics",
-            "latex": "/latex"
+            "rankings": "/rankings",
+            "cohorts": "/cohorts",
+            "latex": "/latex",
+            "network": "/latex/network",
+            "library": "/latex/library"
         }
     }
 
@@ -81,6 +100,25 @@ async def startup_event():
                 print(f"✅ Database connected successfully! Found {count:,} student grade records.")
             else:
                 print("⚠️ Database connected but no student_grades table found.")
+            
+            if StudentAggregates.create_tables(db):
+                print("✅ Student aggregates ready.")
+            
+            if GradeSketches.create_tables(db):
+                print("✅ Grade sketches ready.")
+            
+            if GradeNormalization.create_tables(db):
+                print("✅ Grade z-scores ready.")
+            
+            if GradePartitioning.create_tables(db) and GradePartitioning.ensure_partitions(db):
+                print("✅ Grade partitions ready.")
+            
+            if RailNetwork.create_tables(db):
+                print("✅ Rail network tables ready.")
+            
+            if FragilityLibrary.create_tables(db) and FragilityLibrary.seed_examples(db):
+                index = load_index(db)
+                print(f"✅ Fragility library loaded: {len(index)} entries.")
     except Exception as e:
         print(f"❌ Database connection failed: {e}")
         print("⚠️ API will start but database endpoints may not work.")
@@ -92,6 +130,8 @@ async def startup_event():
 async def shutdown_event():
     """Application shutdown event"""
     print("👋 Rail DB API shutting down...")
+    GradeImport.shutdown()
+    shutdown_connectivity_pool()
 
 
 if __name__ == "__main__":
@@ -24,9 +24,26 @@ class StudentGrade(BaseModel):
         }
 
 
+class StudentGradeFields(BaseModel):
+    """Model for a student grade listing where only the requested fields are set"""
+    id: Optional[int] = None
+    aem: Optional[int] = Field(None, description="Student AEM number")
+    test: Optional[str] = Field(None, description="Test name")
+    grade: Optional[Decimal] = Field(None, description="Grade value", ge=0, le=10)
+    year: Optional[int] = Field(None, description="Academic year")
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    z_score: Optional[float] = Field(None, description="(grade - mean) / stddev of the test and year; null without spread")
+    
+    class Config:
+        json_encoders = {
+            Decimal: float
+        }
+
+
 class StudentGradeCreate(BaseModel):
     """Model for creating new student grades"""
-    aem: int = Field(..., description="Student AEM number")
+    aem: int = Field(..., description="Student AEM number", gt=0)
     test: str = Field(..., description="Test name")
     grade: float = Field(..., description="Grade value", ge=0, le=10)
     year: int = Field(..., description="Academic year")
@@ -37,6 +54,70 @@ class StudentGradeUpdate(BaseModel):
     grade: Optional[float] = Field(None, description="Grade value", ge=0, le=10)
 
 
+class StudentGradeKey(BaseModel):
+    """Model for the (aem, test, year) key of a grade record"""
+    aem: int = Field(..., description="Student AEM number")
+    test: str = Field(..., description="Test name")
+    year: int = Field(..., description="Academic year")
+
+
+class StudentGradeKeyedUpdate(StudentGradeKey):
+    """Model for one item of a batch grade update"""
+    grade: float = Field(..., description="Grade value", ge=0, le=10)
+
+
+class StudentGradeBatchUpdate(BaseModel):
+    """Model for updating many grades in one statement"""
+    items: List[StudentGradeKeyedUpdate] = Field(..., min_length=1, max_length=1000)
+
+
+class StudentGradeBatchDelete(BaseModel):
+    """Model for deleting many grades in one statement"""
+    keys: List[StudentGradeKey] = Field(..., min_length=1, max_length=1000)
+
+
+class StudentGradeBatchResult(BaseModel):
+    """Model for batch write results"""
+    rows_affected: int
+    grades: List[StudentGrade] = Field(..., description="Affected records as written (as deleted for deletes)")
+    missing: List[StudentGradeKey] = Field(default_factory=list, description="Requested keys without a record")
+
+
+class GradeUploadError(BaseModel):
+    """Model for the validation errors of one uploaded row"""
+    line: int = Field(..., description="Line number in the uploaded file (header is line 1)")
+    errors: List[str]
+
+
+class GradeUploadReport(BaseModel):
+    """Model for the result of a grade file upload"""
+    rows: int
+    valid: int
+    invalid: int
+    inserted: int
+    updated: int
+    dry_run: bool
+    errors: List[GradeUploadError]
+    errors_truncated: bool = Field(..., description="True when more invalid rows exist than are listed")
+
+
+class StudentGradesBatchRequest(BaseModel):
+    """Model for fetching the grades of several students at once"""
+    aems: List[int] = Field(..., description="Student AEM numbers", min_length=1, max_length=500)
+
+
+class StudentTranscript(BaseModel):
+    """Model for all grades of one student"""
+    aem: int
+    grades: List[StudentGrade]
+
+
+class StudentTranscriptBatch(BaseModel):
+    """Model for batch transcript results"""
+    students: List[StudentTranscript]
+    missing: List[int] = Field(default_factory=list, description="Requested AEMs without any grades")
+
+
 class StudentStats(BaseModel):
     """Model for student statistics"""
     aem: int
@@ -46,6 +127,38 @@ class StudentStats(BaseModel):
     max_grade: float
 
 
+class StudentRank(BaseModel):
+    """Model for the rank of a student by average grade"""
+    aem: int
+    year: Optional[int] = None
+    test: Optional[str] = None
+    average_grade: float
+    total_tests: int
+    rank: int
+    percentile: float = Field(..., description="Share of students ranked below, ties counted as half")
+    students: int = Field(..., description="Number of ranked students in the scope")
+
+
+class LeaderboardEntry(BaseModel):
+    """Model for one leaderboard row"""
+    rank: int
+    aem: int
+    average_grade: float
+    total_tests: int
+    min_grade: float
+    max_grade: float
+
+
+class Leaderboard(BaseModel):
+    """Model for a page of the leaderboard"""
+    year: Optional[int] = None
+    test: Optional[str] = None
+    total: int
+    limit: int
+    offset: int
+    entries: List[LeaderboardEntry]
+
+
 class TestStats(BaseModel):
     """Model for test statistics"""
     test: str
@@ -62,6 +175,9 @@ class YearlyStats(BaseModel):
     total_records: int
     unique_students: int
     average_grade: float
+    unique_students_error: Optional[int] = Field(
+        None, description="Approximate mode only: about 95% bound on the unique_students error"
+    )
 
 
 class GradeDistribution(BaseModel):
@@ -71,6 +187,113 @@ class GradeDistribution(BaseModel):
     percentage: float
 
 
+class HistogramBin(BaseModel):
+    """Model for one histogram bin; the last bin includes its upper edge"""
+    lower: float
+    upper: float
+    count: int
+    percentage: float
+    cumulative_percentage: float
+
+
+class GradeHistogram(BaseModel):
+    """Model for a grade histogram"""
+    test: Optional[str] = None
+    year: Optional[int] = None
+    total: int = Field(..., description="Grades matching the filters, including those outside the edges")
+    below: int = Field(..., description="Grades below the first edge")
+    above: int = Field(..., description="Grades above the last edge")
+    bins: List[HistogramBin]
+
+
+class PassRateGroup(BaseModel):
+    """Model for the pass rates of one (test, year) at every threshold"""
+    test: str
+    year: int
+    total: int
+    pass_counts: List[int]
+    pass_rates: List[float]
+
+
+class PassRateSweep(BaseModel):
+    """Model for pass rates across thresholds; group lists align with thresholds"""
+    thresholds: List[float]
+    groups: List[PassRateGroup]
+
+
+class TestYearPivot(BaseModel):
+    """Model for test x year statistics as matrices indexed [test][year]"""
+    tests: List[str]
+    years: List[int]
+    pass_threshold: float
+    count: List[List[Optional[int]]]
+    average: List[List[Optional[float]]]
+    stddev: List[List[Optional[float]]] = Field(..., description="Sample standard deviation, null for single grades")
+    pass_rate: List[List[Optional[float]]]
+
+
+class GradePercentiles(BaseModel):
+    """Model for grade percentiles; values align with fractions"""
+    mode: str
+    test: Optional[str] = None
+    year: Optional[int] = None
+    count: int
+    fractions: List[float]
+    values: List[Optional[float]]
+    value_error: float = Field(..., description="Bound on the error of each value")
+
+
+class CohortDeltas(BaseModel):
+    """Model for grade changes between consecutive tests, one entry per pair"""
+    from_test: List[str]
+    to_test: List[str]
+    count: List[int]
+    average: List[Optional[float]]
+    stddev: List[Optional[float]]
+    improved_share: List[Optional[float]] = Field(..., description="Percentage of students whose grade went up")
+
+
+class CohortAnalysis(BaseModel):
+    """Model for the analysis of one year's cohort; per-test lists align with tests"""
+    year: int
+    tests: List[str]
+    students: int
+    complete_students: int = Field(..., description="Students with a grade in every test")
+    average: Optional[float] = Field(None, description="Mean of the students' average grades")
+    passed_all_share: Optional[float] = Field(None, description="Percentage of students who passed every test")
+    count: List[int]
+    test_average: List[Optional[float]]
+    stddev: List[Optional[float]]
+    pass_rate: List[Optional[float]]
+    deltas: CohortDeltas
+    correlation: List[List[Optional[float]]] = Field(..., description="Pearson correlation between tests, [test][test]")
+
+
+class CohortTrajectories(BaseModel):
+    """Model for a page of student trajectories; grades are indexed [student][test]"""
+    year: int
+    tests: List[str]
+    total: int
+    limit: int
+    offset: int
+    aems: List[int]
+    grades: List[List[Optional[float]]]
+    average: List[Optional[float]]
+    change: List[Optional[float]] = Field(..., description="Last minus first grade taken")
+
+
+class CohortComparison(BaseModel):
+    """Model for cohorts of several years side by side; matrices are indexed [year][test]"""
+    years: List[int]
+    tests: List[str]
+    students: List[int]
+    complete_students: List[int]
+    average: List[Optional[float]]
+    passed_all_share: List[Optional[float]]
+    test_average: List[List[Optional[float]]]
+    pass_rate: List[List[Optional[float]]]
+
+
 class DatabaseSummary(BaseModel):
     """Model for database summary"""
     total_records: int
@@ -80,6 +303,9 @@ class DatabaseSummary(BaseModel):
     average_grade: float
     min_grade: float
     max_grade: float
+    unique_students_error: Optional[int] = Field(
+        None, description="Approximate mode only: about 95% bound on the unique_students error"
+    )
 
 
 class APIResponse(BaseModel):
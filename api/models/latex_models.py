@@ -2,7 +2,7 @@
 LaTeX equations models for API responses
 """
 from pydantic import BaseModel, Field
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Literal
 
 
 class LatexEquation(BaseModel):
@@ -14,11 +14,37 @@ class LatexEquation(BaseModel):
     variables: Optional[Dict[str, str]] = Field(None, description="Variable definitions")
 
 
+class ParameterDistribution(BaseModel):
+    """Epistemic uncertainty of a fragility parameter around its nominal value"""
+    distribution: Literal["lognormal", "normal", "uniform"] = Field("lognormal", description="Distribution type")
+    std: Optional[float] = Field(None, description="Log standard deviation (lognormal) or standard deviation (normal)", gt=0)
+    lower: Optional[float] = Field(None, description="Lower bound (uniform)", gt=0)
+    upper: Optional[float] = Field(None, description="Upper bound (uniform)", gt=0)
+
+
+class FragilityUncertainty(BaseModel):
+    """Latin hypercube settings for fragility uncertainty bands"""
+    pga_mean: Optional[ParameterDistribution] = Field(None, description="Distribution of the median PGA")
+    beta: Optional[ParameterDistribution] = Field(None, description="Distribution of beta")
+    samples: int = Field(10000, description="Number of Latin hypercube samples", ge=2, le=200000)
+    percentiles: List[float] = Field([5, 50, 95], description="Percentile bands to return", min_length=1, max_length=10)
+    seed: Optional[int] = Field(None, description="Random seed for reproducible bands", ge=0)
+
+
+class UncertaintyBand(BaseModel):
+    """Mean and percentile fragility probabilities at each PGA"""
+    samples: int
+    pga: List[float]
+    mean: List[float]
+    percentiles: Dict[str, List[float]]
+
+
 class ParameterizedEquation(LatexEquation):
     """Model for equations with parameters"""
     parameters: Optional[Dict[str, float]] = Field(None, description="Parameter values")
     latex_with_values: Optional[str] = Field(None, description="LaTeX with substituted values")
     numerical_result: Optional[float] = Field(None, description="Computed numerical result")
+    uncertainty: Optional[UncertaintyBand] = Field(None, description="Uncertainty band when parameter distributions are given")
 
 
 class FragilityParameters(BaseModel):
@@ -26,4 +52,152 @@ class FragilityParameters(BaseModel):
     pga: float = Field(..., description="Peak Ground Acceleration", ge=0)
     pga_mean: float = Field(..., description="Mean PGA for damage state", gt=0)
     beta: float = Field(..., description="Beta parameter (standard deviation)", gt=0)
-    damage_state: Optional[str] = Field("ds_i", description="Damage state identifier")
\ No newline at end of file
+    damage_state: Optional[str] = Field("ds_i", description="Damage state identifier")
+    uncertainty: Optional[FragilityUncertainty] = Field(None, description="Parameter distributions for uncertainty bands")
+
+
+class FragilityCurveRequest(BaseModel):
+    """PGA grid and parameters for evaluating a whole fragility curve"""
+    pga_mean: float = Field(..., description="Mean PGA for damage state", gt=0)
+    beta: float = Field(..., description="Beta parameter (standard deviation)", gt=0)
+    damage_state: str = Field("ds_i", description="Damage state identifier")
+    pga_min: float = Field(0.01, description="Smallest PGA of the grid", gt=0)
+    pga_max: float = Field(2.0, description="Largest PGA of the grid", gt=0)
+    points: int = Field(50, description="Number of grid points", ge=2, le=200)
+    uncertainty: Optional[FragilityUncertainty] = Field(None, description="Parameter distributions for uncertainty bands")
+
+
+class FragilityCurveResult(BaseModel):
+    """Fragility probabilities over a PGA grid"""
+    damage_state: str
+    pga: List[float]
+    probability: List[float]
+    uncertainty: Optional[UncertaintyBand] = None
+
+
+class RailStationCreate(BaseModel):
+    """Model for creating rail network stations"""
+    code: str = Field(..., description="Unique station code")
+    name: str = Field(..., description="Station name")
+    latitude: Optional[float] = Field(None, description="Latitude", ge=-90, le=90)
+    longitude: Optional[float] = Field(None, description="Longitude", ge=-180, le=180)
+
+
+class RailElementCreate(BaseModel):
+    """Model for creating rail segments and bridges"""
+    name: str = Field(..., description="Element name")
+    element_type: Literal["segment", "bridge"] = Field(..., description="Element type")
+    from_station: int = Field(..., description="Start station id")
+    to_station: int = Field(..., description="End station id")
+    pga_mean: float = Field(..., description="Median PGA capacity of the element", gt=0)
+    beta: float = Field(..., description="Beta parameter (log standard deviation)", gt=0)
+
+
+class ConnectivityRequest(BaseModel):
+    """Parameters for a Monte Carlo network connectivity analysis"""
+    source_station: int = Field(..., description="Origin station id")
+    target_station: int = Field(..., description="Destination station id")
+    pga: float = Field(..., description="Scenario PGA applied to every element", ge=0)
+    element_pga: Optional[Dict[int, float]] = Field(None, description="Per-element PGA overrides keyed by element id")
+    realizations: int = Field(10000, description="Number of Monte Carlo realizations", gt=0, le=1_000_000)
+    batch_size: int = Field(2000, description="Realizations per parallel batch", gt=0, le=100_000)
+    seed: Optional[int] = Field(None, description="Random seed for reproducible runs", ge=0)
+
+
+class ConnectivityResult(BaseModel):
+    """Result of a Monte Carlo network connectivity analysis"""
+    source_station: int
+    target_station: int
+    probability_connected: float
+    standard_error: float
+    ci_lower: float
+    ci_upper: float
+    realizations: int
+    element_failure_probabilities: Dict[int, float]
+
+
+class FragilityCurve(BaseModel):
+    """Fragility curve parameters for a single damage state"""
+    pga_mean: float = Field(..., description="Mean PGA for damage state", gt=0)
+    beta: float = Field(..., description="Beta parameter (standard deviation)", gt=0)
+    damage_state: str = Field("ds_i", description="Damage state identifier")
+
+
+class HazardConvolutionRequest(BaseModel):
+    """Site hazard curves and fragility curves to convolve"""
+    pga_levels: List[float] = Field(..., description="PGA levels shared by all hazard curves", min_length=2)
+    annual_rates: List[List[float]] = Field(..., description="Annual exceedance rate per PGA level, one row per site", min_length=1, max_length=10000)
+    site_ids: Optional[List[str]] = Field(None, description="Optional site identifiers, one per hazard curve")
+    fragility_curves: List[FragilityCurve] = Field(..., description="Fragility curves, one per damage state", min_length=1)
+    time_horizon: Optional[float] = Field(None, description="Years for Poisson exceedance probabilities", gt=0)
+
+
+class HazardConvolutionResult(BaseModel):
+    """Annual damage state rates per site (rows) and damage state (columns)"""
+    damage_states: List[str]
+    site_ids: List[str]
+    annual_rates: List[List[float]]
+    return_periods: List[List[Optional[float]]]
+    exceedance_probabilities: Optional[List[List[float]]] = None
+
+
+class FragilityLibraryEntry(BaseModel):
+    """Stored fragility parameters for one typology and damage state"""
+    pga_mean: float = Field(..., description="Mean PGA for damage state", gt=0)
+    beta: float = Field(..., description="Beta parameter (standard deviation)", gt=0)
+    description: Optional[str] = Field(None, description="Source or notes for the parameters")
+
+
+class LibraryEvaluationRequest(BaseModel):
+    """Batch of (typology, PGA) items evaluated against the parameter library"""
+    typologies: List[str] = Field(..., description="Typology id per item", min_length=1, max_length=100000)
+    pga: List[float] = Field(..., description="PGA per item, or a single PGA for all items", min_length=1)
+
+
+class LibraryEvaluation(BaseModel):
+    """Exceedance probabilities of every damage state for one item"""
+    typology: str
+    pga: float
+    probabilities: Dict[str, float]
+
+
+class LibraryEvaluationResult(BaseModel):
+    """Batch evaluation results in request order"""
+    results: List[LibraryEvaluation]
+
+
+class DamageObservationGroup(BaseModel):
+    """Observed damage for one typology and damage state"""
+    typology: str = Field("generic", description="Asset typology identifier")
+    damage_state: str = Field("ds_i", description="Damage state identifier")
+    pga: List[float] = Field(..., description="PGA experienced by each asset", min_length=1)
+    damaged: List[bool] = Field(..., description="Whether each asset reached the damage state", min_length=1)
+
+
+class FragilityFitRequest(BaseModel):
+    """Damage observations to fit lognormal fragility curves to"""
+    groups: List[DamageObservationGroup] = Field(..., description="Observation groups fitted together", min_length=1, max_length=1000)
+    bootstrap_samples: int = Field(200, description="Bootstrap resamples per group (0 disables intervals)", ge=0, le=5000)
+    confidence: float = Field(0.9, description="Confidence level of the bootstrap intervals", gt=0, lt=1)
+    seed: Optional[int] = Field(None, description="Random seed for reproducible intervals", ge=0)
+    save_to_library: bool = Field(False, description="Store converged fits in the fragility parameter library")
+
+
+class FittedFragility(BaseModel):
+    """Maximum-likelihood fragility parameters for one observation group"""
+    typology: str
+    damage_state: str
+    pga_mean: Optional[float] = None
+    beta: Optional[float] = None
+    log_likelihood: Optional[float] = None
+    observations: int
+    damaged: int
+    converged: bool
+    pga_mean_ci: Optional[List[float]] = None
+    beta_ci: Optional[List[float]] = None
+
+
+class FragilityFitResult(BaseModel):
+    """Fitted fragility parameters in request order"""
+    fits: List[FittedFragility]
+    saved: int = 0
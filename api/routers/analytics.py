@@ -1,19 +1,106 @@
 """
 Analytics router for statistical endpoints
 """
+from decimal import Decimal, ROUND_HALF_UP
 from fastapi import APIRouter, HTTPException, Query
-from typing import List
-from database import DatabaseManager
-from ..models import TestStats, YearlyStats, GradeDistribution, DatabaseSummary
+from typing import List, Optional
+from database import DatabaseManager, GradePartitioning, GradeDistributions, GradeSketches
+from database.grade_distributions import uniform_edges
+from database.grade_sketches import merge_groups, bucket_percentile, BUCKETS_PER_POINT
+from ..models import (
+    TestStats, YearlyStats, GradeDistribution, DatabaseSummary, HistogramBin, GradeHistogram,
+    PassRateGroup, PassRateSweep, TestYearPivot, GradePercentiles
+)
+from .rankings import get_rankings
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
+# Exact mode scans student_grades; approximate mode reads the
+# per-(test, year) sketches, which are exact except for distinct students
+MODE_QUERY = Query(
+    "exact",
+    description="exact, or approximate to answer from the trigger-maintained sketches",
+    pattern="^(exact|approximate)$"
+)
 
-@router.get("/summary", response_model=DatabaseSummary)
-async def get_database_summary():
+
+def _sketch_groups(db, key):
+    """Sketch groups collected per value of ``key`` ("test" or "year")"""
+    groups = GradeSketches.groups(db)
+    if groups is None:
+        raise HTTPException(status_code=500, detail="Failed to read the grade sketches")
+    
+    by_key = {}
+    for group in groups:
+        by_key.setdefault(group[key], []).append(group)
+    return by_key
+
+
+def _distinct_students(db, by=None):
+    estimates = GradeSketches.distinct_students(db, by=by)
+    if estimates is None:
+        raise HTTPException(status_code=500, detail="Failed to read the grade sketches")
+    return estimates
+
+
+def _approximate_summary(db) -> DatabaseSummary:
+    by_year = _sketch_groups(db, "year")
+    if not by_year:
+        raise HTTPException(status_code=404, detail="No data found")
+    
+    merged = merge_groups([group for groups in by_year.values() for group in groups])
+    students, stale_rows = _distinct_students(db).get(None, (0.0, 0))
+    return DatabaseSummary(
+        total_records=merged["count"],
+        unique_students=round(students),
+        years_covered=f"{min(by_year)}-{max(by_year)}",
+        available_tests=sorted({group["test"] for groups in by_year.values() for group in groups}),
+        average_grade=round(float(merged["average"]), 2),
+        min_grade=merged["min"],
+        max_grade=merged["max"],
+        unique_students_error=GradeSketches.error_bound(students, stale_rows)
+    )
+
+
+def _approximate_test_stats(db) -> List[TestStats]:
+    stats = []
+    for test, groups in _sketch_groups(db, "test").items():
+        merged = merge_groups(groups)
+        stats.append(TestStats(
+            test=test,
+            total_attempts=merged["count"],
+            average_grade=round(float(merged["average"]), 2),
+            pass_rate=merged["pass_count"] * 100.0 / merged["count"],
+            min_grade=merged["min"],
+            max_grade=merged["max"]
+        ))
+    return sorted(stats, key=lambda row: row.average_grade, reverse=True)
+
+
+def _approximate_yearly_stats(db) -> List[YearlyStats]:
+    students = _distinct_students(db, by="year")
+    stats = []
+    for year, groups in sorted(_sketch_groups(db, "year").items(), reverse=True):
+        merged = merge_groups(groups)
+        estimate, stale_rows = students.get(year, (0.0, 0))
+        stats.append(YearlyStats(
+            year=year,
+            total_records=merged["count"],
+            unique_students=round(estimate),
+            average_grade=round(float(merged["average"]), 2),
+            unique_students_error=GradeSketches.error_bound(estimate, stale_rows)
+        ))
+    return stats
+
+
+@router.get("/summary", response_model=DatabaseSummary, response_model_exclude_none=True)
+async def get_database_summary(mode: str = MODE_QUERY):
     """Get overall database summary statistics"""
     try:
         with DatabaseManager() as db:
+            if mode == "approximate":
+                return _approximate_summary(db)
+            
             # Total records and students
             total_query = """
                 SELECT 
@@ -54,15 +141,20 @@ async def get_database_summary():
             else:
                 raise HTTPException(status_code=404, detail="No data found")
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
 @router.get("/test-stats", response_model=List[TestStats])
-async def get_test_statistics():
+async def get_test_statistics(mode: str = MODE_QUERY):
     """Get statistics for each test"""
     try:
         with DatabaseManager() as db:
+            if mode == "approximate":
+                return _approximate_test_stats(db)
+            
             query = """
                 SELECT 
                     test,
@@ -92,33 +184,30 @@ async def get_test_statistics():
             else:
                 return []
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@router.get("/yearly-stats", response_model=List[YearlyStats])
-async def get_yearly_statistics():
+@router.get("/yearly-stats", response_model=List[YearlyStats], response_model_exclude_none=True)
+async def get_yearly_statistics(mode: str = MODE_QUERY):
     """Get statistics by year"""
     try:
         with DatabaseManager() as db:
-            query = """
-                SELECT 
-                    year,
-                    COUNT(*) as total_records,
-                    COUNT(DISTINCT aem) as unique_students,
-                    ROUND(AVG(grade), 2) as average_grade
-                FROM student_grades 
-                GROUP BY year 
-                ORDER BY year DESC;
-            """
+            if mode == "approximate":
+                return _approximate_yearly_stats(db)
             
-            results = db.execute_query(query)
+            # Frozen years come precomputed, the rest is aggregated live
+            results = GradePartitioning.yearly_stats(db)
             
             if results:
                 return [YearlyStats(**row) for row in results]
             else:
                 return []
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
@@ -128,40 +217,7 @@ async def get_grade_distribution():
     """Get grade distribution across all records"""
     try:
         with DatabaseManager() as db:
-            query = """
-                SELECT 
-                    CASE 
-                        WHEN grade < 1.0 THEN '0.0-0.9'
-                        WHEN grade < 2.0 THEN '1.0-1.9'
-                        WHEN grade < 3.0 THEN '2.0-2.9'
-                        WHEN grade < 4.0 THEN '3.0-3.9'
-                        WHEN grade < 5.0 THEN '4.0-4.9 (Fail)'
-                        WHEN grade < 6.0 THEN '5.0-5.9 (Pass)'
-                        WHEN grade < 7.0 THEN '6.0-6.9'
-                        WHEN grade < 8.0 THEN '7.0-7.9'
-                        WHEN grade < 9.0 THEN '8.0-8.9'
-                        ELSE '9.0-10.0 (Excellent)'
-                    END as grade_range,
-                    COUNT(*) as count,
-                    ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM student_grades), 1) as percentage
-                FROM student_grades 
-                GROUP BY 
-                    CASE 
-                        WHEN grade < 1.0 THEN '0.0-0.9'
-                        WHEN grade < 2.0 THEN '1.0-1.9'
-                        WHEN grade < 3.0 THEN '2.0-2.9'
-                        WHEN grade < 4.0 THEN '3.0-3.9'
-                        WHEN grade < 5.0 THEN '4.0-4.9 (Fail)'
-                        WHEN grade < 6.0 THEN '5.0-5.9 (Pass)'
-                        WHEN grade < 7.0 THEN '6.0-6.9'
-                        WHEN grade < 8.0 THEN '7.0-7.9'
-                        WHEN grade < 8.0 THEN '8.0-8.9'
-                        ELSE '9.0-10.0 (Excellent)'
-                    END
-                ORDER BY MIN(grade);
-            """
-            
-            results = db.execute_query(query)
+            results = GradeDistributions.grade_ranges(db)
             
             if results:
                 return [GradeDistribution(**row) for row in results]
@@ -172,45 +228,187 @@ async def get_grade_distribution():
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@router.get("/top-students")
-async def get_top_students(limit: int = Query(10, description="Number of top students", le=50)):
-    """Get top performing students"""
+@router.get("/histogram", response_model=GradeHistogram)
+async def get_grade_histogram(
+    bins: int = Query(10, ge=1, le=100, description="Number of equal-width bins over 0-10"),
+    edges: Optional[List[float]] = Query(None, description="Explicit bin edges (repeat the parameter); overrides bins"),
+    test: Optional[str] = Query(None, description="Filter by test"),
+    year: Optional[int] = Query(None, description="Filter by year")
+):
+    """Get a grade histogram with counts, percentages and cumulative percentages"""
+    if edges is not None:
+        if not 2 <= len(edges) <= 101:
+            raise HTTPException(status_code=400, detail="edges needs between 2 and 101 values")
+        if any(lower >= upper for lower, upper in zip(edges, edges[1:])):
+            raise HTTPException(status_code=400, detail="edges must be strictly increasing")
+    else:
+        edges = uniform_edges(bins)
+
     try:
         with DatabaseManager() as db:
-            query = """
-                SELECT 
-                    aem,
-                    COUNT(*) as total_tests,
-                    ROUND(AVG(grade), 2) as average_grade,
-                    ROUND(MIN(grade), 2) as min_grade,
-                    ROUND(MAX(grade), 2) as max_grade
-                FROM student_grades 
-                GROUP BY aem 
-                HAVING COUNT(*) >= 3
-                ORDER BY average_grade DESC 
-                LIMIT %s;
-            """
+            histogram = GradeDistributions.histogram(db, edges, test, year)
             
-            results = db.execute_query(query, (limit,))
+            if histogram is None:
+                raise HTTPException(status_code=500, detail="Failed to compute the histogram")
             
-            if results:
-                return {
-                    "top_students": [
-                        {
-                            "aem": row["aem"],
-                            "total_tests": row["total_tests"],
-                            "average_grade": float(row["average_grade"]),
-                            "min_grade": float(row["min_grade"]),
-                            "max_grade": float(row["max_grade"])
-                        } for row in results
-                    ]
-                }
+            total = histogram["total"]
+            cumulative = histogram["below"]
+            result_bins = []
+            for lower, upper, count in zip(edges, edges[1:], histogram["counts"]):
+                cumulative += count
+                result_bins.append(HistogramBin(
+                    lower=lower,
+                    upper=upper,
+                    count=count,
+                    percentage=round(count * 100.0 / total, 2) if total else 0.0,
+                    cumulative_percentage=round(cumulative * 100.0 / total, 2) if total else 0.0
+                ))
+            
+            return GradeHistogram(
+                test=test,
+                year=year,
+                total=total,
+                below=histogram["below"],
+                above=histogram["above"],
+                bins=result_bins
+            )
+                
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+MAX_THRESHOLDS = 201
+
+
+@router.get("/pass-rates", response_model=PassRateSweep)
+async def get_pass_rate_sweep(
+    thresholds: Optional[List[float]] = Query(None, description="Pass thresholds (repeat the parameter)"),
+    start: float = Query(4.0, ge=0, le=10, description="First threshold when no list is given"),
+    stop: float = Query(6.0, ge=0, le=10, description="Last threshold when no list is given"),
+    step: float = Query(0.5, gt=0, description="Threshold step when no list is given"),
+    test: Optional[str] = Query(None, description="Filter by test"),
+    year: Optional[int] = Query(None, description="Filter by year")
+):
+    """Get the pass rate of every test and year at each threshold, from a single scan"""
+    if thresholds is None:
+        if stop < start:
+            raise HTTPException(status_code=400, detail="stop must not be below start")
+        count = int(round((stop - start) / step, 9)) + 1
+        thresholds = [round(start + i * step, 10) for i in range(min(count, MAX_THRESHOLDS + 1))]
+    else:
+        thresholds = sorted(set(thresholds))
+    
+    if len(thresholds) > MAX_THRESHOLDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_THRESHOLDS} thresholds are allowed")
+
+    try:
+        with DatabaseManager() as db:
+            groups = GradeDistributions.pass_rates(db, thresholds, test, year)
+            
+            if groups is None:
+                raise HTTPException(status_code=500, detail="Failed to compute the pass rates")
+            
+            return PassRateSweep(
+                thresholds=thresholds,
+                groups=[
+                    PassRateGroup(
+                        **group,
+                        pass_rates=[round(passed * 100.0 / group["total"], 2) for passed in group["pass_counts"]]
+                    ) for group in groups
+                ]
+            )
+                
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.get("/pivot", response_model=TestYearPivot)
+async def get_test_year_pivot(
+    pass_threshold: float = Query(5.0, ge=0, le=10, description="Lowest passing grade"),
+    test: Optional[str] = Query(None, description="Filter by test"),
+    year: Optional[int] = Query(None, description="Filter by year")
+):
+    """Get count, average, standard deviation and pass rate for every test and year"""
+    try:
+        with DatabaseManager() as db:
+            pivot = GradeDistributions.pivot(db, pass_threshold, test, year)
+            
+            if pivot is None:
+                raise HTTPException(status_code=500, detail="Failed to compute the pivot")
+            
+            return TestYearPivot(pass_threshold=pass_threshold, **pivot)
+                
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.get("/percentiles", response_model=GradePercentiles)
+async def get_grade_percentiles(
+    fractions: List[float] = Query([0.1, 0.25, 0.5, 0.75, 0.9], description="Percentiles as fractions (repeat the parameter)"),
+    test: Optional[str] = Query(None, description="Filter by test"),
+    year: Optional[int] = Query(None, description="Filter by year"),
+    mode: str = MODE_QUERY
+):
+    """Get interpolated grade percentiles, exactly or from the bucket sketches"""
+    if not fractions or len(fractions) > 101 or any(not 0 <= fraction <= 1 for fraction in fractions):
+        raise HTTPException(status_code=400, detail="fractions needs 1 to 101 values between 0 and 1")
+
+    try:
+        with DatabaseManager() as db:
+            if mode == "approximate":
+                counts = GradeSketches.histogram(db, test, year)
+                if counts is None:
+                    raise HTTPException(status_code=500, detail="Failed to read the grade sketches")
+                count = sum(counts)
+                values = [bucket_percentile(counts, fraction) for fraction in fractions]
+                # Values are read back from their bucket of width 1/BUCKETS_PER_POINT
+                value_error = 0.5 / BUCKETS_PER_POINT
             else:
-                return {"top_students": []}
+                result = GradeDistributions.percentiles(db, fractions, test, year)
+                if result is None:
+                    raise HTTPException(status_code=500, detail="Failed to compute the percentiles")
+                count = result["count"]
+                values = result["values"]
+                value_error = 0.0
+            
+            return GradePercentiles(
+                mode=mode,
+                test=test,
+                year=year,
+                count=count,
+                fractions=fractions,
+                values=[round(value, 4) if value is not None else None for value in values],
+                value_error=value_error
+            )
                 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.get("/top-students")
+async def get_top_students(limit: int = Query(10, description="Number of top students", ge=1, le=50)):
+    """Get top performing students (at least 3 tests) from the ranking index"""
+    try:
+        scope = get_rankings().get(("global", None))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+    top_students = scope.top(limit, min_tests=3) if scope else []
+    for student in top_students:
+        # Half up, like ROUND() in SQL
+        student["average_grade"] = float(
+            Decimal(repr(student["average_grade"])).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        )
+    return {"top_students": top_students}
+
 
 @router.get("/perfect-scores")
 async def get_perfect_scores():
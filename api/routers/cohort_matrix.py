@@ -0,0 +1,203 @@
+"""
+Student x test grade matrices of one year's cohort, with vectorized statistics
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Sequence, Tuple
+
+import numpy as np
+
+PASS_GRADE = 5.0
+
+CohortKey = Tuple[int, Tuple[str, ...]]
+
+
+def test_sort_key(test: str):
+    """Order "Test 2" before "Test 10" """
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", test)]
+
+
+def _nan_to_none(values: np.ndarray, decimals: int = 4) -> list:
+    """Round and convert to lists with None in place of NaN, for JSON"""
+    rounded = np.round(values, decimals)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+class CohortMatrix:
+    """Grades of one year as a dense student x test matrix, NaN where missing.
+
+    Rows are AEMs in ascending order and columns follow ``tests``; every
+    statistic is computed over the whole matrix at once.
+    """
+
+    def __init__(self, year: int, tests: Sequence[str], rows: Sequence[dict]):
+        self.year = year
+        self.tests = list(tests)
+
+        aems = np.fromiter((row["aem"] for row in rows), dtype=np.int64, count=len(rows))
+        column = {test: i for i, test in enumerate(self.tests)}
+        columns = np.fromiter((column[row["test"]] for row in rows), dtype=np.int64, count=len(rows))
+        grades = np.fromiter((row["grade"] for row in rows), dtype=float, count=len(rows))
+
+        self.aems, student_rows = np.unique(aems, return_inverse=True)
+        self.grades = np.full((len(self.aems), len(self.tests)), np.nan)
+        self.grades[student_rows, columns] = grades
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.aems)
+
+    def test_summary(self) -> dict:
+        """Count, mean, sample stddev and pass rate per test"""
+        present = ~np.isnan(self.grades)
+        counts = present.sum(axis=0)
+        filled = np.where(present, self.grades, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = filled.sum(axis=0) / counts
+            squares = ((filled - means) ** 2 * present).sum(axis=0)
+            stddevs = np.sqrt(squares / (counts - 1))
+            stddevs[counts < 2] = np.nan
+            pass_rates = 100.0 * (filled >= PASS_GRADE).sum(axis=0) / counts
+        return {
+            "count": counts.tolist(),
+            "average": _nan_to_none(means, 2),
+            "stddev": _nan_to_none(stddevs, 2),
+            "pass_rate": _nan_to_none(pass_rates, 2)
+        }
+
+    def deltas(self) -> dict:
+        """Change between consecutive tests for students who sat both"""
+        if len(self.tests) < 2:
+            return {"from_test": [], "to_test": [], "count": [], "average": [], "stddev": [], "improved_share": []}
+
+        changes = self.grades[:, 1:] - self.grades[:, :-1]
+        present = ~np.isnan(changes)
+        counts = present.sum(axis=0)
+        filled = np.where(present, changes, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = filled.sum(axis=0) / counts
+            stddevs = np.sqrt(((filled - means) ** 2 * present).sum(axis=0) / (counts - 1))
+            stddevs[counts < 2] = np.nan
+            improved = 100.0 * (filled > 0).sum(axis=0) / counts
+        return {
+            "from_test": self.tests[:-1],
+            "to_test": self.tests[1:],
+            "count": counts.tolist(),
+            "average": _nan_to_none(means, 2),
+            "stddev": _nan_to_none(stddevs, 2),
+            "improved_share": _nan_to_none(improved, 2)
+        }
+
+    def correlations(self) -> list:
+        """Pearson correlation of every pair of tests over students who sat both.
+
+        Pairwise sums come from matrix products of the zero-filled grades
+        and the presence mask, so all pairs are computed together.
+        """
+        present = (~np.isnan(self.grades)).astype(float)
+        filled = np.where(present > 0, self.grades, 0.0)
+
+        n = present.T @ present
+        sums = filled.T @ present          # sums[i, j]: grades of i where j is present
+        squares = (filled ** 2).T @ present
+        cross = filled.T @ filled
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            covariance = n * cross - sums * sums.T
+            spread = (n * squares - sums ** 2) * (n * squares - sums ** 2).T
+            correlation = covariance / np.sqrt(spread)
+        correlation[n < 3] = np.nan
+        return _nan_to_none(np.clip(correlation, -1.0, 1.0))
+
+    def trajectories(self, limit: int, offset: int) -> dict:
+        """A page of students with their grade vector and first-to-last change"""
+        page = slice(offset, offset + limit)
+        grades = self.grades[page]
+        present = ~np.isnan(grades)
+
+        has_any = present.any(axis=1)
+        first = np.argmax(present, axis=1)
+        last = grades.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+        rows = np.arange(len(grades))
+        change = np.where(has_any, grades[rows, last] - grades[rows, first], np.nan)
+        # Every student in the matrix has at least one grade
+        averages = np.nanmean(grades, axis=1) if len(grades) else np.empty(0)
+
+        return {
+            "aems": self.aems[page].tolist(),
+            "grades": _nan_to_none(grades, 2),
+            "average": _nan_to_none(averages, 2),
+            "change": _nan_to_none(change, 2)
+        }
+
+    def cohort_summary(self) -> dict:
+        """Headline numbers of the cohort as a whole"""
+        present = ~np.isnan(self.grades)
+        tests_taken = present.sum(axis=1)
+        with np.errstate(invalid="ignore"):
+            averages = np.nansum(self.grades, axis=1) / tests_taken
+        complete = tests_taken == len(self.tests)
+        return {
+            "students": len(self),
+            "complete_students": int(complete.sum()),
+            "average": float(np.round(averages.mean(), 2)) if len(self) else None,
+            "passed_all_share": float(np.round(
+                100.0 * (complete & (np.where(present, self.grades, 0.0) >= PASS_GRADE).all(axis=1)).sum() / len(self), 2
+            )) if len(self) else None
+        }
+
+
+class CohortCache:
+    """LRU cache of cohort matrices keyed by (year, tests).
+
+    Writes invalidate the years they touch. Each invalidation bumps the
+    year's generation, and a matrix loaded before an invalidation of its
+    year is not stored, so a load racing a write never caches stale grades.
+    ``max_age`` bounds staleness from writes made outside the API.
+    """
+
+    def __init__(self, max_entries: int = 32, max_age: float = 300.0):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: "OrderedDict[CohortKey, CohortMatrix]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: CohortKey, loader: Callable[[], CohortMatrix]) -> CohortMatrix:
+        year = key[0]
+        with self._lock:
+            matrix = self._entries.get(key)
+            if matrix is not None and time.monotonic() - matrix.loaded_at <= self.max_age:
+                self._entries.move_to_end(key)
+                return matrix
+            generation = (self._epoch, self._generations.get(year, 0))
+
+        matrix = loader()
+
+        with self._lock:
+            if generation == (self._epoch, self._generations.get(year, 0)):
+                self._entries[key] = matrix
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return matrix
+
+    def invalidate(self, *years: int):
+        """Drop the matrices of the given years"""
+        with self._lock:
+            for year in years:
+                self._generations[year] = self._generations.get(year, 0) + 1
+                for key in [key for key in self._entries if key[0] == year]:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries}
@@ -0,0 +1,144 @@
+"""
+Cohort and grade trajectory router
+"""
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
+from database import DatabaseManager
+from ..models import CohortAnalysis, CohortDeltas, CohortTrajectories, CohortComparison
+from .cohort_matrix import CohortMatrix, CohortCache, test_sort_key
+
+router = APIRouter(prefix="/cohorts", tags=["cohorts"])
+
+MAX_COMPARED_YEARS = 20
+
+# Matrices keyed by (year, tests); the write handlers of the students
+# router invalidate the years they touch
+cohort_cache = CohortCache()
+
+
+def invalidate_cohorts(*years: int):
+    """Drop cached matrices of the given years, or of every year when none are given"""
+    if years:
+        cohort_cache.invalidate(*years)
+    else:
+        cohort_cache.clear()
+
+
+def _load_cohort(year: int, tests: Optional[List[str]]) -> CohortMatrix:
+    """Load one year's matrix through the cache, defaulting to every test of that year"""
+    with DatabaseManager() as db:
+        if not tests:
+            rows = db.execute_query("SELECT DISTINCT test FROM student_grades WHERE year = %s;", (year,))
+            if rows is None:
+                raise RuntimeError("Failed to read the tests of the year")
+            tests = [row["test"] for row in rows]
+        if not tests:
+            raise HTTPException(status_code=404, detail=f"No grades found for year {year}")
+
+        tests = sorted(set(tests), key=test_sort_key)
+
+        def load():
+            rows = db.execute_query("""
+                SELECT aem, test, grade
+                FROM student_grades
+                WHERE year = %s AND test = ANY(%s);
+            """, (year, tests))
+            if rows is None:
+                raise RuntimeError("Failed to load the cohort grades")
+            return CohortMatrix(year, tests, rows)
+
+        return cohort_cache.get_or_load((year, tuple(tests)), load)
+
+
+async def _get_cohort(year: int, tests: Optional[List[str]]) -> CohortMatrix:
+    try:
+        return await run_in_threadpool(_load_cohort, year, tests)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.get("/compare", response_model=CohortComparison)
+async def compare_cohorts(
+    years: List[int] = Query(..., description="Years to compare (repeat the parameter)"),
+    tests: Optional[List[str]] = Query(None, description="Tests to include (repeat the parameter); default all")
+):
+    """Compare the cohorts of several years on the same tests"""
+    years = sorted(set(years))
+    if len(years) > MAX_COMPARED_YEARS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_COMPARED_YEARS} years can be compared")
+
+    if not tests:
+        try:
+            with DatabaseManager() as db:
+                rows = db.execute_query(
+                    "SELECT DISTINCT test FROM student_grades WHERE year = ANY(%s);", (years,)
+                )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        if rows is None:
+            raise HTTPException(status_code=500, detail="Failed to read the tests of the years")
+        tests = [row["test"] for row in rows]
+    if not tests:
+        raise HTTPException(status_code=404, detail="No grades found for the requested years")
+
+    tests = sorted(set(tests), key=test_sort_key)
+    summaries = []
+    for year in years:
+        cohort = await _get_cohort(year, tests)
+        summaries.append((cohort.cohort_summary(), cohort.test_summary()))
+
+    return CohortComparison(
+        years=years,
+        tests=tests,
+        students=[summary["students"] for summary, _ in summaries],
+        complete_students=[summary["complete_students"] for summary, _ in summaries],
+        average=[summary["average"] for summary, _ in summaries],
+        passed_all_share=[summary["passed_all_share"] for summary, _ in summaries],
+        test_average=[per_test["average"] for _, per_test in summaries],
+        pass_rate=[per_test["pass_rate"] for _, per_test in summaries]
+    )
+
+
+@router.get("/{year}", response_model=CohortAnalysis)
+async def get_cohort_analysis(
+    year: int,
+    tests: Optional[List[str]] = Query(None, description="Tests to include (repeat the parameter); default all")
+):
+    """Get per-test statistics, test-to-test changes and correlations for one year"""
+    cohort = await _get_cohort(year, tests)
+    per_test = cohort.test_summary()
+
+    return CohortAnalysis(
+        year=year,
+        tests=cohort.tests,
+        **cohort.cohort_summary(),
+        count=per_test["count"],
+        test_average=per_test["average"],
+        stddev=per_test["stddev"],
+        pass_rate=per_test["pass_rate"],
+        deltas=CohortDeltas(**cohort.deltas()),
+        correlation=cohort.correlations()
+    )
+
+
+@router.get("/{year}/trajectories", response_model=CohortTrajectories)
+async def get_cohort_trajectories(
+    year: int,
+    tests: Optional[List[str]] = Query(None, description="Tests to include (repeat the parameter); default all"),
+    limit: int = Query(100, description="Limit results", ge=1, le=5000),
+    offset: int = Query(0, description="Offset for pagination", ge=0)
+):
+    """Get a page of students (by AEM) with their grades across the tests"""
+    cohort = await _get_cohort(year, tests)
+
+    return CohortTrajectories(
+        year=year,
+        tests=cohort.tests,
+        total=len(cohort),
+        limit=limit,
+        offset=offset,
+        **cohort.trajectories(limit, offset)
+    )
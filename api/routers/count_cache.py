@@ -0,0 +1,59 @@
+"""
+Cache of exact row counts for paginated listings, keyed by filter set
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+
+class CountCache:
+    """LRU cache of COUNT(*) results keyed by the filters of a listing.
+
+    Every write clears it. A count computed while a write committed is not
+    stored (the clear bumps a generation), and ``max_age`` bounds
+    staleness from writes made outside the API.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_age: float = 300.0):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: "OrderedDict[Hashable, Tuple[int, float]]" = OrderedDict()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_count(self, key: Hashable, counter: Callable[[], int]) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] <= self.max_age:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+            generation = self._generation
+
+        count = counter()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (count, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses
+            }
@@ -1,4 +1,7 @@
 """LaTeX equation router package"""
 from .fragility import router as fragility_router
+from .network import router as network_router
+from .library import router as library_router
+from .batch import router as batch_router
 
-__all__ = ["fragility_router"]
\ No newline at end of file
+__all__ = ["fragility_router", "network_router", "library_router", "batch_router"]
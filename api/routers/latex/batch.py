@@ -0,0 +1,206 @@
+"""
+Streaming batch evaluation of fragility probabilities
+"""
+import csv
+import json
+import math
+import tempfile
+from typing import BinaryIO, Iterator, List, Optional
+import numpy as np
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from fragility import fragility_probabilities
+from ..streaming import spool_request_body
+
+router = APIRouter(prefix="/latex", tags=["latex"])
+
+CSV_COLUMNS = ("pga", "pga_mean", "beta")
+
+# Request bodies above this size are spooled to a temporary file
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+# Largest accepted request body
+MAX_BATCH_BYTES = 200 * 1024 * 1024
+
+
+class _Chunk:
+    """Parsed rows of one chunk, with per-row errors kept in place"""
+
+    def __init__(self):
+        self.line_numbers: List[int] = []
+        self.ids: List[object] = []
+        self.values: List[tuple] = []
+        self.errors: List[Optional[str]] = []
+
+    def add(self, line_number, row_id, values=None, error=None):
+        self.line_numbers.append(line_number)
+        self.ids.append(row_id)
+        self.values.append(values if values is not None else (math.nan, math.nan, math.nan))
+        self.errors.append(error)
+
+    def __len__(self):
+        return len(self.line_numbers)
+
+
+def _parse_ndjson_line(chunk: _Chunk, line_number: int, line: bytes):
+    """Parse one {"pga", "pga_mean", "beta"[, "id"]} object"""
+    try:
+        row = json.loads(line)
+        row_id = row.get("id")
+        chunk.add(line_number, row_id, (float(row["pga"]), float(row["pga_mean"]), float(row["beta"])))
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        chunk.add(line_number, None, error=f"Invalid row: {e}")
+
+
+def _parse_csv_line(chunk: _Chunk, line_number: int, line: bytes, columns: dict):
+    """Parse one CSV row using the column positions from the header"""
+    try:
+        fields = next(csv.reader([line.decode("utf-8")]))
+        row_id = fields[columns["id"]] if "id" in columns else None
+        chunk.add(line_number, row_id, tuple(float(fields[columns[name]]) for name in CSV_COLUMNS))
+    except (ValueError, IndexError, UnicodeDecodeError) as e:
+        chunk.add(line_number, None, error=f"Invalid row: {e}")
+
+
+def _evaluate_chunk(chunk: _Chunk, output_csv: bool) -> bytes:
+    """Evaluate a chunk in one vectorized call and serialize the results"""
+    values = np.array(chunk.values, dtype=float).reshape(-1, 3)
+    pga, pga_mean, beta = values[:, 0], values[:, 1], values[:, 2]
+
+    valid = np.isfinite(values).all(axis=1) & (pga >= 0) & (pga_mean > 0) & (beta > 0)
+    probabilities = np.full(len(chunk), math.nan)
+    if valid.any():
+        probabilities[valid] = fragility_probabilities(pga[valid], pga_mean[valid], beta[valid])
+
+    # Python floats keep repr() free of numpy type names
+    pga, pga_mean, beta = pga.tolist(), pga_mean.tolist(), beta.tolist()
+    probabilities = probabilities.tolist()
+
+    lines = []
+    for i in range(len(chunk)):
+        error = chunk.errors[i]
+        if error is None and not valid[i]:
+            error = "PGA must be non-negative, pga_mean and beta must be positive and finite"
+
+        if output_csv:
+            if error is None:
+                lines.append(
+                    f"{chunk.line_numbers[i]},{_csv_field(chunk.ids[i])},"
+                    f"{pga[i]!r},{pga_mean[i]!r},{beta[i]!r},{probabilities[i]!r},"
+                )
+            else:
+                lines.append(f"{chunk.line_numbers[i]},{_csv_field(chunk.ids[i])},,,,,{_csv_field(error)}")
+        else:
+            id_field = f',"id":{json.dumps(chunk.ids[i])}' if chunk.ids[i] is not None else ""
+            if error is None:
+                lines.append(
+                    f'{{"line":{chunk.line_numbers[i]}{id_field},"pga":{pga[i]!r},'
+                    f'"pga_mean":{pga_mean[i]!r},"beta":{beta[i]!r},"probability":{probabilities[i]!r}}}'
+                )
+            else:
+                lines.append(f'{{"line":{chunk.line_numbers[i]}{id_field},"error":{json.dumps(error)}}}')
+
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _csv_field(value) -> str:
+    """Quote a CSV field when needed"""
+    if value is None:
+        return ""
+    value = str(value)
+    if any(char in value for char in ',"\n\r'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _stream_results(body: BinaryIO, input_csv: bool, output_csv: bool, chunk_size: int) -> Iterator[bytes]:
+    """Parse, evaluate and emit the spooled body in fixed-size chunks"""
+    columns = None
+    chunk = _Chunk()
+
+    try:
+        if output_csv:
+            yield b"line,id,pga,pga_mean,beta,probability,error\n"
+
+        for line_number, line in enumerate(body, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            if input_csv and columns is None:
+                header = [name.strip().lower() for name in next(csv.reader([line.decode("utf-8", "replace")]))]
+                columns = {name: i for i, name in enumerate(header)}
+                missing = [name for name in CSV_COLUMNS if name not in columns]
+                if missing:
+                    error = f"CSV header is missing columns: {', '.join(missing)}"
+                    yield (f",,,,,,{_csv_field(error)}\n" if output_csv else json.dumps({"error": error}) + "\n").encode("utf-8")
+                    return
+                continue
+
+            if input_csv:
+                _parse_csv_line(chunk, line_number, line, columns)
+            else:
+                _parse_ndjson_line(chunk, line_number, line)
+
+            if len(chunk) >= chunk_size:
+                yield _evaluate_chunk(chunk, output_csv)
+                chunk = _Chunk()
+
+        if len(chunk):
+            yield _evaluate_chunk(chunk, output_csv)
+    finally:
+        body.close()
+
+
+class _SpooledBodyResponse(StreamingResponse):
+    """StreamingResponse that closes the spooled request body however the response ends.
+
+    The generator closes it too, but a client that disconnects before the
+    first chunk means the generator never starts.
+    """
+
+    def __init__(self, body: BinaryIO, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._body = body
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._body.close()
+
+
+@router.post("/fragility/batch")
+async def stream_fragility_batch(
+    request: Request,
+    chunk_size: int = Query(10000, description="Rows evaluated per vectorized chunk", ge=1, le=100000),
+    output: Optional[str] = Query(
+        None, description="Output format: ndjson or csv (defaults to the input format)", pattern="^(ndjson|csv)$"
+    )
+):
+    """Evaluate fragility probabilities for an NDJSON or CSV body of up to MAX_BATCH_BYTES.
+
+    NDJSON rows are objects with pga, pga_mean, beta and an optional id;
+    CSV bodies need a header with pga, pga_mean, beta and optionally id.
+    Results are streamed back in input order, one line per row, with
+    invalid rows reported in place instead of aborting the stream.
+    """
+    input_csv = "csv" in request.headers.get("content-type", "").lower()
+    output_csv = input_csv if output is None else output == "csv"
+
+    # The body is spooled to disk before any output is sent: reading the
+    # request while a streaming response is in flight is not reliable
+    # across ASGI servers, and spooling keeps memory flat either way.
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    try:
+        await spool_request_body(request, body, MAX_BATCH_BYTES)
+    except BaseException:
+        body.close()
+        raise
+
+    # A sync generator is iterated in the threadpool by StreamingResponse
+    return _SpooledBodyResponse(
+        body,
+        _stream_results(body, input_csv, output_csv, chunk_size),
+        media_type="text/csv" if output_csv else "application/x-ndjson"
+    )
@@ -1,13 +1,54 @@
 """
 LaTeX equations router for structural engineering formulas
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import List, Optional
+from functools import lru_cache
 import math
-from ...models.latex_models import LatexEquation, ParameterizedEquation, FragilityParameters
+from fastapi.concurrency import run_in_threadpool
+from database import DatabaseManager, FragilityLibrary
+from fragility import (
+    damage_state_rates, exceedance_probability, fit_fragility_curves, fragility_probabilities, fragility_band
+)
+from ...models.latex_models import (
+    LatexEquation, ParameterizedEquation, FragilityParameters,
+    FragilityUncertainty, UncertaintyBand, FragilityCurveRequest, FragilityCurveResult,
+    HazardConvolutionRequest, HazardConvolutionResult,
+    FragilityFitRequest, FittedFragility, FragilityFitResult
+)
+from .library import load_index
+from .registry import EquationRegistry
 
 router = APIRouter(prefix="/latex", tags=["latex"])
 
+# Upper bound on samples x grid points evaluated for one uncertainty band
+MAX_UNCERTAINTY_EVALUATIONS = 20_000_000
+
+# Parameterized results are cached per parameter set rounded to the
+# precision shown in the LaTeX output
+DISPLAY_DECIMALS = 3
+EQUATION_CACHE_SIZE = 4096
+
+BASE_FRAGILITY_LATEX = r"P[ds \geq ds_i\;/\;PGA] = \Phi \left[ \frac{1}{\beta_{ds_i}} \ln \left( \frac{PGA}{\overline{PGA}_{ds_i}} \right) \right]"
+
+PARAMETERIZED_LATEX_TEMPLATE = (
+    "P[ds \\geq {ds}\\;/\\;PGA] = \\Phi \\left[ "
+    "\\frac{{1}}{{{beta:.3f}}} \\ln \\left( \\frac{{{pga:.3f}}}{{{pga_mean:.3f}}} \\right) \\right] "
+    "= \\Phi \\left[ {z:.3f} \\right] = {p:.4f}"
+)
+
+CALCULATION_LATEX_TEMPLATE = (
+    "P[ds \\geq {ds}\\;/\\;PGA] = \\Phi \\left[ "
+    "\\frac{{1}}{{{beta:.3f}}} \\ln \\left( \\frac{{{pga:.3f}}}{{{pga_mean:.3f}}} \\right) \\right]\\\\[0.5em]"
+    "= \\Phi \\left[ \\frac{{1}}{{{beta:.3f}}} \\times {log_ratio:.3f} \\right]\\\\[0.5em]"
+    "= \\Phi \\left[ {z:.3f} \\right]\\\\[0.5em]"
+    "= {p:.4f}"
+)
+
+# Static equations and examples never change between deploys, so they are
+# rendered once at import time (see the bottom of this module)
+equation_registry = EquationRegistry()
+
 
 def standard_normal_cdf(z: float) -> float:
     """Calculate standard normal cumulative distribution function using built-in math functions"""
@@ -49,9 +90,38 @@ def calculate_fragility_probability(pga: float, pga_mean: float, beta: float) ->
     return standard_normal_cdf(z)
 
 
-@router.get("/fragility/basic", response_model=LatexEquation)
-async def get_basic_fragility_equation():
-    """Get the basic fragility curve equation in LaTeX format"""
+def calculate_uncertainty_band(
+    pga_values: List[float], pga_mean: float, beta: float, uncertainty: FragilityUncertainty
+) -> UncertaintyBand:
+    """Evaluate Latin hypercube uncertainty bands of a fragility curve"""
+    if uncertainty.samples * len(pga_values) > MAX_UNCERTAINTY_EVALUATIONS:
+        raise ValueError(
+            f"samples x PGA points must not exceed {MAX_UNCERTAINTY_EVALUATIONS:,}"
+        )
+    if any(not 0 < p < 100 for p in uncertainty.percentiles):
+        raise ValueError("Percentiles must be between 0 and 100")
+    
+    band = fragility_band(
+        pga_values,
+        pga_mean,
+        beta,
+        pga_mean_distribution=uncertainty.pga_mean.model_dump() if uncertainty.pga_mean else None,
+        beta_distribution=uncertainty.beta.model_dump() if uncertainty.beta else None,
+        samples=uncertainty.samples,
+        percentiles=uncertainty.percentiles,
+        seed=uncertainty.seed
+    )
+    
+    return UncertaintyBand(
+        samples=band["samples"],
+        pga=list(pga_values),
+        mean=band["mean"].tolist(),
+        percentiles={key: values.tolist() for key, values in band["percentiles"].items()}
+    )
+
+
+def build_basic_fragility_equation() -> LatexEquation:
+    """Build the basic fragility curve equation"""
     return LatexEquation(
         name="Fragility Curve - Basic Form",
         category="fragility",
@@ -67,6 +137,94 @@ async def get_basic_fragility_equation():
     )
 
 
+@router.get("/fragility/basic", response_model=LatexEquation)
+async def get_basic_fragility_equation(request: Request):
+    """Get the basic fragility curve equation in LaTeX format"""
+    return equation_registry.respond("fragility/basic", request)
+
+
+def _quantize(value: float) -> Optional[float]:
+    """Round a parameter to display precision, or None if that would change it"""
+    quantized = round(value, DISPLAY_DECIMALS)
+    return quantized if abs(quantized - value) <= 1e-9 else None
+
+
+def _fragility_terms(pga: float, pga_mean: float, beta: float):
+    """Return ln(PGA/PGA_mean), z and the probability, computing the log once"""
+    if pga <= 0 or pga_mean <= 0 or beta <= 0:
+        raise ValueError("All parameters must be positive")
+    
+    log_ratio = math.log(pga / pga_mean)
+    z_value = log_ratio / beta
+    return log_ratio, z_value, standard_normal_cdf(z_value)
+
+
+@lru_cache(maxsize=EQUATION_CACHE_SIZE)
+def render_parameterized_equation(pga: float, pga_mean: float, beta: float, damage_state: str) -> ParameterizedEquation:
+    """Build the parameterized fragility equation for one set of parameters"""
+    log_ratio, z_value, probability = _fragility_terms(pga, pga_mean, beta)
+    
+    return ParameterizedEquation(
+        name=f"Fragility Curve - {damage_state}",
+        category="fragility",
+        latex=BASE_FRAGILITY_LATEX,
+        description=f"Fragility curve calculation for damage state {damage_state}",
+        parameters={
+            "PGA": pga,
+            "PGA_mean": pga_mean,
+            "beta": beta
+        },
+        latex_with_values=PARAMETERIZED_LATEX_TEMPLATE.format(
+            ds=damage_state, beta=beta, pga=pga, pga_mean=pga_mean, z=z_value, p=probability
+        ),
+        numerical_result=probability,
+        variables={
+            "P[ds ≥ ds_i / PGA]": f"Probability of exceeding {damage_state} given PGA = {probability:.4f}",
+            "Φ": "Standard normal CDF",
+            "β_{ds_i}": f"Log standard deviation = {beta}",
+            "PGA": f"Peak Ground Acceleration = {pga}",
+            "\\overline{PGA}_{ds_i}": f"Median capacity = {pga_mean}"
+        }
+    )
+
+
+@lru_cache(maxsize=EQUATION_CACHE_SIZE)
+def render_calculation_equation(pga: float, pga_mean: float, beta: float, damage_state: str) -> ParameterizedEquation:
+    """Build the step-by-step fragility analysis for one set of parameters"""
+    log_ratio, z_value, probability = _fragility_terms(pga, pga_mean, beta)
+    
+    return ParameterizedEquation(
+        name=f"Fragility Analysis - {damage_state}",
+        category="fragility",
+        latex=BASE_FRAGILITY_LATEX,
+        description=f"Complete fragility curve analysis for {damage_state}",
+        parameters={
+            "PGA": pga,
+            "PGA_mean": pga_mean,
+            "beta": beta,
+            "z_value": z_value
+        },
+        latex_with_values=CALCULATION_LATEX_TEMPLATE.format(
+            ds=damage_state, beta=beta, pga=pga, pga_mean=pga_mean, log_ratio=log_ratio, z=z_value, p=probability
+        ),
+        numerical_result=probability,
+        variables={
+            "P[ds ≥ ds_i / PGA]": f"Exceedance probability = {probability:.4f}",
+            "Φ(z)": f"Standard normal CDF of z = {z_value:.3f}",
+            "z": f"Standardized variable = {z_value:.3f}",
+            "ln(PGA/PGA_mean)": f"Natural log ratio = {log_ratio:.3f}"
+        }
+    )
+
+
+def _render_cached(render, pga: float, pga_mean: float, beta: float, damage_state: str) -> ParameterizedEquation:
+    """Serve repeated slider positions from the cache; off-grid values bypass it"""
+    key = (_quantize(pga), _quantize(pga_mean), _quantize(beta))
+    if None in key:
+        return render.__wrapped__(pga, pga_mean, beta, damage_state)
+    return render(*key, damage_state)
+
+
 @router.get("/fragility/parameterized", response_model=ParameterizedEquation)
 async def get_parameterized_fragility(
     pga: float = Query(..., description="Peak Ground Acceleration", gt=0),
@@ -77,36 +235,7 @@ async def get_parameterized_fragility(
     """Get fragility equation with specific parameter values and numerical result"""
     
     try:
-        # Calculate the probability
-        probability = calculate_fragility_probability(pga, pga_mean, beta)
-        
-        # Create LaTeX with substituted values
-        latex_with_values = (
-            f"P[ds \\geq {damage_state}\\;/\\;PGA] = \\Phi \\left[ "
-            f"\\frac{{1}}{{{beta:.3f}}} \\ln \\left( \\frac{{{pga:.3f}}}{{{pga_mean:.3f}}} \\right) \\right] "
-            f"= \\Phi \\left[ {(1/beta) * math.log(pga/pga_mean):.3f} \\right] = {probability:.4f}"
-        )
-        
-        return ParameterizedEquation(
-            name=f"Fragility Curve - {damage_state}",
-            category="fragility",
-            latex=r"P[ds \geq ds_i\;/\;PGA] = \Phi \left[ \frac{1}{\beta_{ds_i}} \ln \left( \frac{PGA}{\overline{PGA}_{ds_i}} \right) \right]",
-            description=f"Fragility curve calculation for damage state {damage_state}",
-            parameters={
-                "PGA": pga,
-                "PGA_mean": pga_mean,
-                "beta": beta
-            },
-            latex_with_values=latex_with_values,
-            numerical_result=probability,
-            variables={
-                "P[ds ≥ ds_i / PGA]": f"Probability of exceeding {damage_state} given PGA = {probability:.4f}",
-                "Φ": "Standard normal CDF",
-                "β_{ds_i}": f"Log standard deviation = {beta}",
-                "PGA": f"Peak Ground Acceleration = {pga}",
-                "\\overline{PGA}_{ds_i}": f"Median capacity = {pga_mean}"
-            }
-        )
+        return _render_cached(render_parameterized_equation, pga, pga_mean, beta, damage_state)
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -119,42 +248,117 @@ async def calculate_fragility_with_params(params: FragilityParameters):
     """Calculate fragility probability using POST with parameter object"""
     
     try:
-        probability = calculate_fragility_probability(
-            params.pga, 
-            params.pga_mean, 
-            params.beta
+        equation = _render_cached(
+            render_calculation_equation,
+            params.pga,
+            params.pga_mean,
+            params.beta,
+            params.damage_state
         )
         
-        # Create detailed LaTeX with step-by-step calculation
-        z_value = (1/params.beta) * math.log(params.pga / params.pga_mean)
+        if params.uncertainty:
+            uncertainty = await run_in_threadpool(
+                calculate_uncertainty_band,
+                [params.pga],
+                params.pga_mean,
+                params.beta,
+                params.uncertainty
+            )
+            # Cached equations are shared, so attach the band to a copy
+            equation = equation.model_copy(update={"uncertainty": uncertainty})
+        
+        return equation
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+
+
+@router.get("/fragility/cache-stats")
+async def get_equation_cache_stats():
+    """Get hit-rate statistics of the parameterized equation caches"""
+    stats = {}
+    for name, render in (
+        ("parameterized", render_parameterized_equation),
+        ("calculate", render_calculation_equation)
+    ):
+        info = render.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+            "size": info.currsize,
+            "max_size": info.maxsize
+        }
+    return stats
+
+
+@router.post("/fragility/curve", response_model=FragilityCurveResult)
+async def calculate_fragility_curve(request: FragilityCurveRequest):
+    """Evaluate a fragility curve over a PGA grid, optionally with uncertainty bands"""
+    
+    if request.pga_max <= request.pga_min:
+        raise HTTPException(status_code=400, detail="pga_max must be greater than pga_min")
+    
+    try:
+        step = (request.pga_max - request.pga_min) / (request.points - 1)
+        pga_values = [request.pga_min + i * step for i in range(request.points)]
+        
+        uncertainty = None
+        if request.uncertainty:
+            uncertainty = await run_in_threadpool(
+                calculate_uncertainty_band,
+                pga_values,
+                request.pga_mean,
+                request.beta,
+                request.uncertainty
+            )
         
-        latex_with_values = (
-            f"P[ds \\geq {params.damage_state}\\;/\\;PGA] = \\Phi \\left[ "
-            f"\\frac{{1}}{{{params.beta:.3f}}} \\ln \\left( \\frac{{{params.pga:.3f}}}{{{params.pga_mean:.3f}}} \\right) \\right]\\\\[0.5em]"
-            f"= \\Phi \\left[ \\frac{{1}}{{{params.beta:.3f}}} \\times {math.log(params.pga / params.pga_mean):.3f} \\right]\\\\[0.5em]"
-            f"= \\Phi \\left[ {z_value:.3f} \\right]\\\\[0.5em]"
-            f"= {probability:.4f}"
+        return FragilityCurveResult(
+            damage_state=request.damage_state,
+            pga=pga_values,
+            probability=fragility_probabilities(pga_values, request.pga_mean, request.beta).tolist(),
+            uncertainty=uncertainty
         )
         
-        return ParameterizedEquation(
-            name=f"Fragility Analysis - {params.damage_state}",
-            category="fragility",
-            latex=r"P[ds \geq ds_i\;/\;PGA] = \Phi \left[ \frac{1}{\beta_{ds_i}} \ln \left( \frac{PGA}{\overline{PGA}_{ds_i}} \right) \right]",
-            description=f"Complete fragility curve analysis for {params.damage_state}",
-            parameters={
-                "PGA": params.pga,
-                "PGA_mean": params.pga_mean,
-                "beta": params.beta,
-                "z_value": z_value
-            },
-            latex_with_values=latex_with_values,
-            numerical_result=probability,
-            variables={
-                "P[ds ≥ ds_i / PGA]": f"Exceedance probability = {probability:.4f}",
-                "Φ(z)": f"Standard normal CDF of z = {z_value:.3f}",
-                "z": f"Standardized variable = {z_value:.3f}",
-                "ln(PGA/PGA_mean)": f"Natural log ratio = {math.log(params.pga / params.pga_mean):.3f}"
-            }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+
+
+@router.post("/fragility/hazard-convolution", response_model=HazardConvolutionResult)
+async def convolve_hazard_curves(request: HazardConvolutionRequest):
+    """Combine site hazard curves with fragility curves into annual damage state rates"""
+    
+    site_ids = request.site_ids or [str(i) for i in range(len(request.annual_rates))]
+    if len(site_ids) != len(request.annual_rates):
+        raise HTTPException(status_code=400, detail="site_ids must have one entry per hazard curve")
+    if any(len(row) != len(request.pga_levels) for row in request.annual_rates):
+        raise HTTPException(status_code=400, detail="Each hazard curve must have one rate per PGA level")
+    
+    try:
+        rates = await run_in_threadpool(
+            damage_state_rates,
+            request.pga_levels,
+            request.annual_rates,
+            [curve.pga_mean for curve in request.fragility_curves],
+            [curve.beta for curve in request.fragility_curves]
+        )
+        
+        return HazardConvolutionResult(
+            damage_states=[curve.damage_state for curve in request.fragility_curves],
+            site_ids=site_ids,
+            annual_rates=rates.tolist(),
+            return_periods=[
+                [1 / rate if rate > 0 else None for rate in row] for row in rates.tolist()
+            ],
+            exceedance_probabilities=(
+                exceedance_probability(rates, request.time_horizon).tolist()
+                if request.time_horizon else None
+            )
         )
         
     except ValueError as e:
@@ -163,9 +367,59 @@ async def calculate_fragility_with_params(params: FragilityParameters):
         raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
 
-@router.get("/fragility/examples")
-async def get_fragility_examples():
-    """Get example fragility calculations for common scenarios"""
+@router.post("/fragility/fit", response_model=FragilityFitResult)
+async def fit_fragility(request: FragilityFitRequest):
+    """Estimate pga_mean and beta from observed damage by maximum likelihood"""
+    
+    for group in request.groups:
+        if len(group.pga) != len(group.damaged):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Group {group.typology}/{group.damage_state} needs one damage flag per PGA value"
+            )
+    
+    try:
+        fits = await run_in_threadpool(
+            fit_fragility_curves,
+            [group.pga for group in request.groups],
+            [group.damaged for group in request.groups],
+            bootstrap_samples=request.bootstrap_samples,
+            confidence=request.confidence,
+            seed=request.seed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+    
+    results = [
+        FittedFragility(typology=group.typology, damage_state=group.damage_state, **vars(fit))
+        for group, fit in zip(request.groups, fits)
+    ]
+    
+    saved = 0
+    if request.save_to_library:
+        try:
+            with DatabaseManager() as db:
+                for result in results:
+                    if result.converged and FragilityLibrary.upsert(
+                        db,
+                        result.typology,
+                        result.damage_state,
+                        round(result.pga_mean, 4),
+                        round(result.beta, 4),
+                        f"MLE fit from {result.observations} observations"
+                    ) is not None:
+                        saved += 1
+                load_index(db)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    return FragilityFitResult(fits=results, saved=saved)
+
+
+def build_fragility_examples() -> dict:
+    """Build the example fragility calculations for common scenarios"""
     
     examples = []
     
@@ -210,9 +464,8 @@ async def get_fragility_examples():
     }
 
 
-@router.get("/equations", response_model=List[LatexEquation])
-async def list_all_equations():
-    """Get a list of all available LaTeX equations"""
+def build_equation_catalog() -> List[LatexEquation]:
+    """Build the list of all available LaTeX equations"""
     
     equations = [
         LatexEquation(
@@ -235,4 +488,21 @@ async def list_all_equations():
         )
     ]
     
-    return equations
\ No newline at end of file
+    return equations
+
+
+@router.get("/fragility/examples")
+async def get_fragility_examples(request: Request):
+    """Get example fragility calculations for common scenarios"""
+    return equation_registry.respond("fragility/examples", request)
+
+
+@router.get("/equations", response_model=List[LatexEquation])
+async def list_all_equations(request: Request):
+    """Get a list of all available LaTeX equations"""
+    return equation_registry.respond("equations", request)
+
+
+equation_registry.register("fragility/basic", build_basic_fragility_equation())
+equation_registry.register("fragility/examples", build_fragility_examples())
+equation_registry.register("equations", build_equation_catalog())
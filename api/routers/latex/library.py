@@ -0,0 +1,168 @@
+"""
+Fragility parameter library router
+"""
+import threading
+from fastapi import APIRouter, HTTPException
+from database import DatabaseManager, FragilityLibrary
+from fragility import FragilityIndex
+from ...models import APIResponse
+from ...models.latex_models import (
+    FragilityLibraryEntry, LibraryEvaluationRequest, LibraryEvaluation, LibraryEvaluationResult
+)
+
+router = APIRouter(prefix="/latex/library", tags=["library"])
+
+# The index is rebuilt from the table after every write made through this
+# router and on explicit refresh; requests only ever read the current one.
+_index = None
+_index_lock = threading.Lock()
+
+
+def load_index(db=None) -> FragilityIndex:
+    """Rebuild the in-memory index from the fragility_parameters table"""
+    global _index
+
+    with _index_lock:
+        if db is None:
+            with DatabaseManager() as own_db:
+                rows = FragilityLibrary.load_all(own_db)
+        else:
+            rows = FragilityLibrary.load_all(db)
+
+        if rows is None:
+            raise RuntimeError("Failed to load fragility parameters")
+
+        _index = FragilityIndex(rows)
+        return _index
+
+
+def get_index() -> FragilityIndex:
+    """Return the current index, loading it on first use"""
+    return _index if _index is not None else load_index()
+
+
+@router.get("")
+async def get_library():
+    """Get all typologies and their damage state parameters"""
+    try:
+        index = get_index()
+        return {
+            "typologies": {typology: index.get(typology) for typology in index.typologies}
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.get("/{typology}")
+async def get_typology(typology: str):
+    """Get the damage state parameters of one typology"""
+    try:
+        index = get_index()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if typology not in index:
+        raise HTTPException(status_code=404, detail=f"Typology {typology} not found")
+
+    return {"typology": typology, "damage_states": index.get(typology)}
+
+
+@router.put("/{typology}/{damage_state}", response_model=APIResponse)
+async def upsert_parameters(typology: str, damage_state: str, entry: FragilityLibraryEntry):
+    """Create or update the parameters of one typology and damage state"""
+    try:
+        with DatabaseManager() as db:
+            entry_id = FragilityLibrary.upsert(
+                db, typology, damage_state, entry.pga_mean, entry.beta, entry.description
+            )
+
+            if entry_id is None:
+                raise HTTPException(status_code=400, detail="Failed to save fragility parameters")
+
+            load_index(db)
+
+            return APIResponse(
+                success=True,
+                message="Fragility parameters saved successfully",
+                data={"id": entry_id}
+            )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.delete("/{typology}/{damage_state}", response_model=APIResponse)
+async def delete_parameters(typology: str, damage_state: str):
+    """Delete the parameters of one typology and damage state"""
+    try:
+        with DatabaseManager() as db:
+            if not FragilityLibrary.delete(db, typology, damage_state):
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No parameters found for typology {typology}, damage state {damage_state}"
+                )
+
+            load_index(db)
+
+            return APIResponse(
+                success=True,
+                message="Fragility parameters deleted successfully"
+            )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.post("/refresh", response_model=APIResponse)
+async def refresh_library():
+    """Reload the in-memory index after out-of-band edits to the table"""
+    try:
+        index = load_index()
+        return APIResponse(
+            success=True,
+            message="Fragility library reloaded",
+            data={"typologies": len(index.typologies), "entries": len(index)}
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.post("/evaluate", response_model=LibraryEvaluationResult)
+async def evaluate_library(request: LibraryEvaluationRequest):
+    """Evaluate every damage state for a batch of (typology, PGA) items"""
+    if len(request.pga) not in (1, len(request.typologies)):
+        raise HTTPException(
+            status_code=400,
+            detail="pga must contain one value or one value per typology"
+        )
+
+    try:
+        index = get_index()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    unknown = sorted(set(request.typologies) - set(index.typologies))
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown typologies: {unknown}")
+
+    try:
+        probabilities = index.evaluate(request.typologies, request.pga)
+        pga = request.pga * len(request.typologies) if len(request.pga) == 1 else request.pga
+
+        return LibraryEvaluationResult(
+            results=[
+                LibraryEvaluation(typology=typology, pga=item_pga, probabilities=item_probs)
+                for typology, item_pga, item_probs in zip(request.typologies, pga, probabilities)
+            ]
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
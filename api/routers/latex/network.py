@@ -0,0 +1,161 @@
+"""
+Rail network seismic connectivity router
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from database import DatabaseManager, RailNetwork
+from fragility import fragility_probabilities, estimate_connectivity
+from ...models import APIResponse
+from ...models.latex_models import (
+    RailStationCreate, RailElementCreate, ConnectivityRequest, ConnectivityResult
+)
+
+router = APIRouter(prefix="/latex/network", tags=["network"])
+
+
+@router.get("/stations")
+async def get_stations():
+    """Get all stations of the rail network"""
+    try:
+        with DatabaseManager() as db:
+            results = RailNetwork.get_stations(db)
+            return {"stations": [dict(row) for row in results or []]}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.post("/stations", response_model=APIResponse)
+async def create_station(station: RailStationCreate):
+    """Create or update a rail network station"""
+    try:
+        with DatabaseManager() as db:
+            station_id = RailNetwork.add_station(
+                db, station.code, station.name, station.latitude, station.longitude
+            )
+
+            if station_id is not None:
+                return APIResponse(
+                    success=True,
+                    message="Station created/updated successfully",
+                    data={"id": station_id}
+                )
+            else:
+                raise HTTPException(status_code=400, detail="Failed to create station")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.get("/elements")
+async def get_elements():
+    """Get all segments and bridges with their fragility parameters"""
+    try:
+        with DatabaseManager() as db:
+            results = RailNetwork.get_elements(db)
+            return {
+                "elements": [
+                    {
+                        **row,
+                        "pga_mean": float(row["pga_mean"]),
+                        "beta": float(row["beta"])
+                    } for row in results or []
+                ]
+            }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.post("/elements", response_model=APIResponse)
+async def create_element(element: RailElementCreate):
+    """Create a segment or bridge between two stations"""
+    try:
+        with DatabaseManager() as db:
+            element_id = RailNetwork.add_element(
+                db,
+                element.name,
+                element.element_type,
+                element.from_station,
+                element.to_station,
+                element.pga_mean,
+                element.beta
+            )
+
+            if element_id is not None:
+                return APIResponse(
+                    success=True,
+                    message="Network element created successfully",
+                    data={"id": element_id}
+                )
+            else:
+                raise HTTPException(status_code=400, detail="Failed to create network element")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.post("/connectivity", response_model=ConnectivityResult)
+async def calculate_connectivity(request: ConnectivityRequest):
+    """Estimate the probability that two stations stay connected after an earthquake"""
+    try:
+        with DatabaseManager() as db:
+            graph = RailNetwork.load_graph(db)
+
+        if graph is None:
+            raise HTTPException(status_code=500, detail="Failed to load rail network")
+
+        node_index = graph["node_index"]
+        for station_id in (request.source_station, request.target_station):
+            if station_id not in node_index:
+                raise HTTPException(status_code=404, detail=f"Station {station_id} not found")
+
+        element_ids = [element["id"] for element in graph["elements"]]
+        overrides = request.element_pga or {}
+        unknown = set(overrides) - set(element_ids)
+        if unknown:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Unknown network elements: {sorted(unknown)}"
+            )
+
+        pga = [overrides.get(element_id, request.pga) for element_id in element_ids]
+        failure_prob = fragility_probabilities(pga, graph["pga_mean"], graph["beta"])
+
+        estimate = await run_in_threadpool(
+            estimate_connectivity,
+            len(node_index),
+            graph["edge_from"],
+            graph["edge_to"],
+            failure_prob,
+            node_index[request.source_station],
+            node_index[request.target_station],
+            realizations=request.realizations,
+            batch_size=request.batch_size,
+            seed=request.seed
+        )
+
+        return ConnectivityResult(
+            source_station=request.source_station,
+            target_station=request.target_station,
+            probability_connected=estimate.probability,
+            standard_error=estimate.standard_error,
+            ci_lower=estimate.ci_lower,
+            ci_upper=estimate.ci_upper,
+            realizations=estimate.realizations,
+            element_failure_probabilities={
+                element_id: round(float(prob), 6)
+                for element_id, prob in zip(element_ids, failure_prob)
+            }
+        )
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
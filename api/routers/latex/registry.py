@@ -0,0 +1,104 @@
+"""
+Registry of precomputed static equation responses
+"""
+import gzip
+import hashlib
+import json
+from typing import Dict, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+class PrecomputedResponse:
+    """A JSON payload serialized once, with compressed variants and an ETag"""
+
+    def __init__(self, payload, cache_control: str):
+        # Same serialization settings as FastAPI's JSONResponse
+        self.body = json.dumps(
+            jsonable_encoder(payload),
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":")
+        ).encode("utf-8")
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.cache_control = cache_control
+
+        self.variants: Dict[str, bytes] = {
+            "gzip": gzip.compress(self.body, compresslevel=9, mtime=0)
+        }
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(self.body, quality=11)
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {encoding: q}"""
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+    return accepted
+
+
+class EquationRegistry:
+    """Static equation payloads rendered once and served as byte lookups"""
+
+    def __init__(self, cache_control: str = "public, max-age=86400"):
+        self.cache_control = cache_control
+        self._responses: Dict[str, PrecomputedResponse] = {}
+
+    def register(self, name: str, payload) -> PrecomputedResponse:
+        """Serialize and compress a payload under a name"""
+        precomputed = PrecomputedResponse(payload, self.cache_control)
+        self._responses[name] = precomputed
+        return precomputed
+
+    def get(self, name: str) -> Optional[PrecomputedResponse]:
+        return self._responses.get(name)
+
+    def respond(self, name: str, request: Request) -> Response:
+        """Serve a registered payload, honouring If-None-Match and Accept-Encoding"""
+        precomputed = self._responses[name]
+
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = None
+        for candidate in ("br", "gzip"):
+            if candidate in precomputed.variants and accepted.get(candidate, accepted.get("*", 0)) > 0:
+                encoding = candidate
+                break
+
+        # Each encoding is a different representation, so it gets its own tag
+        etag = f'"{precomputed.etag}-{encoding}"' if encoding else f'"{precomputed.etag}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": precomputed.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or etag in tags:
+                return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            body = precomputed.variants[encoding]
+        else:
+            body = precomputed.body
+
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,177 @@
+"""
+In-memory rankings of students by average grade
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Scope keys: ("global", None), ("year", 2024) or ("test", "Test 1")
+ScopeKey = Tuple[str, object]
+
+# Averages are rounded before sorting so equal averages reached through
+# different sums (16.4 / 2 and 8.2 / 1) tie exactly; distinct averages of
+# two-decimal grades differ by far more than this
+AVERAGE_DECIMALS = 10
+
+
+class RankingScope:
+    """Students of one scope sorted by average grade (descending), then AEM.
+
+    The sort keys are kept as parallel arrays so the rank of any average
+    is a binary search, and a page of the leaderboard is a slice.
+    """
+
+    def __init__(self, aems, averages, counts, mins, maxs):
+        aems = np.asarray(aems, dtype=np.int64)
+        averages = np.round(np.asarray(averages, dtype=float), AVERAGE_DECIMALS)
+        order = np.lexsort((aems, -averages))
+
+        self._set(
+            aems[order], -averages[order], np.asarray(counts, dtype=np.int64)[order],
+            np.asarray(mins, dtype=float)[order], np.asarray(maxs, dtype=float)[order]
+        )
+
+    def _set(self, aems, negated, counts, mins, maxs):
+        self.aems = aems
+        self.negated = negated
+        self.counts = counts
+        self.mins = mins
+        self.maxs = maxs
+        self.averages: Dict[int, float] = dict(zip(self.aems.tolist(), (-self.negated).tolist()))
+
+    def __len__(self):
+        return len(self.aems)
+
+    def rank(self, aem: int) -> Optional[dict]:
+        """Competition rank and percentile of one student, or None if unranked"""
+        average = self.averages.get(aem)
+        if average is None:
+            return None
+
+        above = int(np.searchsorted(self.negated, -average, side="left"))
+        tied = int(np.searchsorted(self.negated, -average, side="right")) - above
+        position = above + int(np.searchsorted(self.aems[above:above + tied], aem))
+        n = len(self)
+
+        return {
+            "average_grade": average,
+            "total_tests": int(self.counts[position]),
+            "rank": above + 1,
+            "percentile": 100.0 * (n - above - tied + 0.5 * tied) / n,
+            "students": n
+        }
+
+    def page(self, limit: int, offset: int) -> List[dict]:
+        """Leaderboard entries [offset, offset + limit) with competition ranks"""
+        rows = slice(offset, offset + limit)
+        ranks = np.searchsorted(self.negated, self.negated[rows], side="left") + 1
+        return [
+            {
+                "rank": int(rank),
+                "aem": int(aem),
+                "average_grade": float(-negated),
+                "total_tests": int(count),
+                "min_grade": float(low),
+                "max_grade": float(high)
+            }
+            for rank, aem, negated, count, low, high in zip(
+                ranks, self.aems[rows], self.negated[rows], self.counts[rows], self.mins[rows], self.maxs[rows]
+            )
+        ]
+
+    def top(self, limit: int, min_tests: int = 1) -> List[dict]:
+        """The ``limit`` best students with at least ``min_tests`` grades, best first"""
+        rows = np.flatnonzero(self.counts >= min_tests)[:limit]
+        return [
+            {
+                "aem": int(self.aems[row]),
+                "total_tests": int(self.counts[row]),
+                "average_grade": float(-self.negated[row]),
+                "min_grade": float(self.mins[row]),
+                "max_grade": float(self.maxs[row])
+            }
+            for row in rows
+        ]
+
+    def replace(self, aem: int, entry: Optional[tuple]) -> "RankingScope":
+        """Copy of the scope with one student's (average, count, min, max) replaced or removed.
+
+        The arrays stay sorted: the old row is deleted and the new one is
+        inserted at its binary-searched position, so no re-sort is needed.
+        """
+        keep = self.aems != aem
+        aems, negated = self.aems[keep], self.negated[keep]
+        counts, mins, maxs = self.counts[keep], self.mins[keep], self.maxs[keep]
+
+        if entry is not None:
+            average, count, low, high = entry
+            key = -round(float(average), AVERAGE_DECIMALS)
+            start = int(np.searchsorted(negated, key, side="left"))
+            stop = int(np.searchsorted(negated, key, side="right"))
+            position = start + int(np.searchsorted(aems[start:stop], aem))
+
+            aems = np.insert(aems, position, aem)
+            negated = np.insert(negated, position, key)
+            counts = np.insert(counts, position, count)
+            mins = np.insert(mins, position, low)
+            maxs = np.insert(maxs, position, high)
+
+        scope = RankingScope.__new__(RankingScope)
+        scope._set(aems, negated, counts, mins, maxs)
+        return scope
+
+
+def scope_key(row: dict) -> ScopeKey:
+    """Scope of a grouping-sets aggregate row"""
+    if row["year"] is not None:
+        return ("year", row["year"])
+    if row["test"] is not None:
+        return ("test", row["test"])
+    return ("global", None)
+
+
+class RankingIndex:
+    """Global, per-year and per-test rankings built from per-AEM aggregates"""
+
+    def __init__(self, rows: Iterable[dict]):
+        grouped: Dict[ScopeKey, list] = {}
+        for row in rows:
+            grouped.setdefault(scope_key(row), []).append(row)
+
+        self.scopes: Dict[ScopeKey, RankingScope] = {
+            key: RankingScope(
+                [row["aem"] for row in scope_rows],
+                [float(row["total"]) / row["count"] for row in scope_rows],
+                [row["count"] for row in scope_rows],
+                [float(row["min_grade"]) for row in scope_rows],
+                [float(row["max_grade"]) for row in scope_rows]
+            )
+            for key, scope_rows in grouped.items()
+        }
+
+    def get(self, key: ScopeKey) -> Optional[RankingScope]:
+        return self.scopes.get(key)
+
+    def update_student(self, aem: int, rows: Iterable[dict]):
+        """Replace one student's entries in every scope from their fresh aggregates"""
+        entries = {
+            scope_key(row): (float(row["total"]) / row["count"], row["count"],
+                             float(row["min_grade"]), float(row["max_grade"]))
+            for row in rows
+        }
+
+        scopes = dict(self.scopes)
+        for key in set(scopes) | set(entries):
+            scope = scopes.get(key)
+            entry = entries.get(key)
+            if scope is None:
+                scopes[key] = RankingScope([aem], [entry[0]], [entry[1]], [entry[2]], [entry[3]])
+            elif entry is not None or aem in scope.averages:
+                updated = scope.replace(aem, entry)
+                if len(updated):
+                    scopes[key] = updated
+                else:
+                    del scopes[key]
+
+        # Readers keep using the previous mapping until this single swap
+        self.scopes = scopes
@@ -0,0 +1,161 @@
+"""
+Student rank, percentile and leaderboard router
+"""
+import threading
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from database import DatabaseManager
+from ..models import StudentRank, Leaderboard, APIResponse
+from .ranking_index import RankingIndex
+
+router = APIRouter(prefix="/rankings", tags=["rankings"])
+
+# Per-AEM aggregates for the global, per-year and per-test scopes in one scan
+AGGREGATES_QUERY = """
+    SELECT
+        aem,
+        CASE WHEN GROUPING(year) = 0 THEN year END as year,
+        CASE WHEN GROUPING(test) = 0 THEN test END as test,
+        COUNT(*) as count,
+        SUM(grade) as total,
+        MIN(grade) as min_grade,
+        MAX(grade) as max_grade
+    FROM student_grades
+    {where_clause}
+    GROUP BY GROUPING SETS ((aem), (aem, year), (aem, test));
+"""
+
+# The index is built on first use and patched per student by the write
+# handlers of the students router; /rankings/refresh rebuilds it after
+# out-of-band edits.
+_index = None
+_index_lock = threading.Lock()
+
+
+def load_rankings(db=None) -> RankingIndex:
+    """Rebuild the ranking index from the student_grades table"""
+    global _index
+
+    with _index_lock:
+        query = AGGREGATES_QUERY.format(where_clause="")
+        if db is None:
+            with DatabaseManager() as own_db:
+                rows = own_db.execute_query(query)
+        else:
+            rows = db.execute_query(query)
+
+        if rows is None:
+            raise RuntimeError("Failed to load student aggregates")
+
+        _index = RankingIndex(rows)
+        return _index
+
+
+def get_rankings() -> RankingIndex:
+    """Return the current index, loading it on first use"""
+    return _index if _index is not None else load_rankings()
+
+
+def update_student_rankings(db, *aems: int):
+    """Refresh the entries of the given students after a write; a no-op until the index is loaded"""
+    global _index
+
+    with _index_lock:
+        if _index is None or not aems:
+            return
+
+        rows = db.execute_query(AGGREGATES_QUERY.format(where_clause="WHERE aem = ANY(%s)"), (list(aems),))
+        if rows is None:
+            # Never serve a stale ranking: drop the index so the next read rebuilds it
+            _index = None
+            return
+
+        by_aem = {aem: [] for aem in aems}
+        for row in rows:
+            by_aem[row["aem"]].append(row)
+        for aem, student_rows in by_aem.items():
+            _index.update_student(aem, student_rows)
+
+
+def invalidate_rankings():
+    """Drop the index after bulk writes; the next read rebuilds it"""
+    global _index
+
+    with _index_lock:
+        _index = None
+
+
+def _scope_key(year: Optional[int], test: Optional[str]):
+    if year is not None and test is not None:
+        raise HTTPException(status_code=400, detail="Rank by year or by test, not both")
+    if year is not None:
+        return ("year", year)
+    if test is not None:
+        return ("test", test)
+    return ("global", None)
+
+
+@router.get("/leaderboard", response_model=Leaderboard)
+async def get_leaderboard(
+    year: Optional[int] = Query(None, description="Rank by average grade in this year"),
+    test: Optional[str] = Query(None, description="Rank by grade in this test"),
+    limit: int = Query(50, description="Limit results", ge=1, le=1000),
+    offset: int = Query(0, description="Offset for pagination", ge=0)
+):
+    """Get a page of students ordered by average grade"""
+    key = _scope_key(year, test)
+
+    try:
+        scope = get_rankings().get(key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    return Leaderboard(
+        year=year,
+        test=test,
+        total=len(scope) if scope else 0,
+        limit=limit,
+        offset=offset,
+        entries=scope.page(limit, offset) if scope else []
+    )
+
+
+@router.get("/students/{aem}", response_model=StudentRank)
+async def get_student_rank(
+    aem: int,
+    year: Optional[int] = Query(None, description="Rank by average grade in this year"),
+    test: Optional[str] = Query(None, description="Rank by grade in this test")
+):
+    """Get the rank and percentile of a student by average grade.
+
+    Ties share the same rank; the percentile is the share of students
+    ranked below, counting ties as half.
+    """
+    key = _scope_key(year, test)
+
+    try:
+        scope = get_rankings().get(key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    rank = scope.rank(aem) if scope else None
+    if rank is None:
+        raise HTTPException(status_code=404, detail=f"No grades found for student {aem} in this scope")
+
+    return StudentRank(aem=aem, year=year, test=test, **rank)
+
+
+@router.post("/refresh", response_model=APIResponse)
+async def refresh_rankings():
+    """Rebuild the rankings after out-of-band edits to student_grades"""
+    try:
+        index = load_rankings()
+        global_scope = index.get(("global", None))
+        return APIResponse(
+            success=True,
+            message="Rankings rebuilt",
+            data={"students": len(global_scope) if global_scope else 0, "scopes": len(index.scopes)}
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
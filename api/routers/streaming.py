@@ -0,0 +1,132 @@
+"""
+Bridge from blocking writer APIs to streaming responses
+"""
+import queue
+import threading
+from typing import BinaryIO, Callable, Iterator
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+
+# Bytes collected before a chunk is handed to the response
+CHUNK_BYTES = 256 * 1024
+
+# Chunks buffered between the producer and the client; bounds memory and
+# applies backpressure to the database side when the client reads slowly
+MAX_PENDING_CHUNKS = 8
+
+# Request bytes gathered before one write to a spool file
+SPOOL_WRITE_BYTES = 1024 * 1024
+
+_DONE = object()
+
+
+class StreamCancelled(Exception):
+    """Raised inside the producer when the client went away"""
+
+
+class QueueWriter:
+    """File-like sink that batches small writes into chunks on a bounded queue"""
+
+    def __init__(self, chunks: "queue.Queue", cancelled: threading.Event):
+        self._chunks = chunks
+        self._cancelled = cancelled
+        self._buffer = bytearray()
+        self._position = 0
+
+    def write(self, data) -> int:
+        if self._cancelled.is_set():
+            raise StreamCancelled()
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._buffer += data
+        self._position += len(data)
+        if len(self._buffer) >= CHUNK_BYTES:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            self.put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def put(self, item):
+        while True:
+            if self._cancelled.is_set():
+                raise StreamCancelled()
+            try:
+                self._chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def tell(self) -> int:
+        return self._position
+
+    @property
+    def closed(self) -> bool:
+        return False
+
+    def close(self):
+        pass
+
+
+def stream_writer_output(produce: Callable[[QueueWriter], None]) -> Iterator[bytes]:
+    """Run ``produce(writer)`` on a thread and yield what it writes as it arrives.
+
+    Memory stays bounded by MAX_PENDING_CHUNKS chunks. An exception in the
+    producer is re-raised in the consumer, and closing the iterator early
+    (client disconnect) stops the producer at its next write.
+    """
+    chunks: "queue.Queue" = queue.Queue(maxsize=MAX_PENDING_CHUNKS)
+    cancelled = threading.Event()
+    writer = QueueWriter(chunks, cancelled)
+    failure = []
+
+    def run():
+        try:
+            produce(writer)
+            writer.flush()
+        except StreamCancelled:
+            return
+        except BaseException as e:
+            failure.append(e)
+        try:
+            writer.put(_DONE)
+        except StreamCancelled:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _DONE:
+                break
+            yield chunk
+        if failure:
+            raise failure[0]
+    finally:
+        cancelled.set()
+
+
+async def spool_request_body(request: Request, spool: BinaryIO, max_bytes: int):
+    """Copy the request body into ``spool`` and rewind it.
+
+    Writes are batched and run on the threadpool, so a spool that has
+    rolled over to disk never blocks the event loop. Raises a 413 once
+    the body exceeds ``max_bytes``.
+    """
+    size = 0
+    pending = bytearray()
+    async for data in request.stream():
+        size += len(data)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+        pending += data
+        if len(pending) >= SPOOL_WRITE_BYTES:
+            await run_in_threadpool(spool.write, bytes(pending))
+            pending.clear()
+    if pending:
+        await run_in_threadpool(spool.write, bytes(pending))
+    await run_in_threadpool(spool.seek, 0)
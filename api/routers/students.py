@@ -1,48 +1,159 @@
 """
 Student grades router
 """
-from fastapi import APIRouter, HTTPException, Query
+import tempfile
+import threading
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from database import DatabaseManager
-from ..models import StudentGrade, StudentGradeCreate, StudentGradeUpdate, StudentStats, APIResponse
+from database import (
+    DatabaseManager, StudentAggregates, GradeExport, GradeImport, GradePartitioning, GradeNormalization,
+    GradeSketches
+)
+from .transcript_cache import TranscriptCache, NOT_FOUND, serialize_transcript
+from .rankings import update_student_rankings, invalidate_rankings
+from .cohorts import invalidate_cohorts
+from .count_cache import CountCache
+from .streaming import stream_writer_output, spool_request_body
+from ..models import (
+    StudentGrade, StudentGradeFields, StudentGradeCreate, StudentGradeUpdate, StudentStats, APIResponse,
+    StudentGradesBatchRequest, StudentTranscript, StudentTranscriptBatch,
+    StudentGradeKey, StudentGradeBatchUpdate, StudentGradeBatchDelete, StudentGradeBatchResult,
+    GradeUploadReport
+)
 
 router = APIRouter(prefix="/students", tags=["students"])
 
+# Serialized /grades/{aem} responses; every write handler below evicts the
+# AEM it touched
+transcript_cache = TranscriptCache()
 
-@router.get("/grades", response_model=List[StudentGrade])
+# Exact /grades totals per filter set, cleared by every write handler below
+grade_counts = CountCache()
+
+
+# Most values accepted by one multi-valued filter of /grades
+MAX_FILTER_VALUES = 1000
+
+# Columns /grades can return, in response order
+GRADE_FIELDS = ("id", "aem", "test", "grade", "year", "created_at", "updated_at")
+
+
+def _grade_fields(fields: Optional[str]) -> List[str]:
+    """Validate a comma-separated ``fields`` value against GRADE_FIELDS"""
+    if fields is None:
+        return list(GRADE_FIELDS)
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(GRADE_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}; allowed: {', '.join(GRADE_FIELDS)}"
+        )
+    if not requested:
+        raise HTTPException(status_code=400, detail="At least one field is required")
+    return [name for name in GRADE_FIELDS if name in requested]
+
+
+def _grade_filters(aems=None, tests=None, years=None, year_from=None, year_to=None,
+                   grade_min=None, grade_max=None):
+    """WHERE clause and parameters for the /grades filters.
+
+    Lists become ``= ANY(...)`` and bounds become range predicates, so
+    AEMs use the (aem, test, year) index and years prune partitions.
+    """
+    where_conditions = []
+    params = []
+
+    for column, values in (("aem", aems), ("test", tests), ("year", years)):
+        if values:
+            if len(values) > MAX_FILTER_VALUES:
+                raise HTTPException(status_code=400, detail=f"At most {MAX_FILTER_VALUES} {column} values are allowed")
+            where_conditions.append(f"{column} = ANY(%s)")
+            params.append(sorted(set(values)))
+
+    for condition, value in (("year >= %s", year_from), ("year <= %s", year_to),
+                             ("grade >= %s", grade_min), ("grade <= %s", grade_max)):
+        if value is not None:
+            where_conditions.append(condition)
+            params.append(value)
+
+    where_clause = ""
+    if where_conditions:
+        where_clause = "WHERE " + " AND ".join(where_conditions)
+
+    return where_clause, params
+
+
+def _count_grades(db, where_clause: str, params: list, mode: str) -> Optional[int]:
+    """Total rows matching the /grades filters: exact, estimated by the planner, or None"""
+    if mode == "estimate":
+        # The planner's row estimate, from pg_class.reltuples and the column
+        # statistics, without reading the table
+        rows = db.execute_query(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM student_grades {where_clause};", params)
+        if rows is None:
+            raise RuntimeError("Failed to estimate the grade count")
+        return int(rows[0]["QUERY PLAN"][0]["Plan"]["Plan Rows"])
+
+    if mode == "exact":
+        def count():
+            rows = db.execute_query(f"SELECT COUNT(*) as total FROM student_grades {where_clause};", params)
+            if rows is None:
+                raise RuntimeError("Failed to count the grades")
+            return rows[0]["total"]
+
+        key = (where_clause, tuple(tuple(value) if isinstance(value, list) else value for value in params))
+        return grade_counts.get_or_count(key, count)
+
+    return None
+
+
+# Only the selected fields (and z_score, when normalized scores were
+# requested) are present in each item
+@router.get("/grades", response_model=List[StudentGradeFields], response_model_exclude_unset=True)
 async def get_student_grades(
-    aem: Optional[int] = Query(None, description="Filter by student AEM"),
-    test: Optional[str] = Query(None, description="Filter by test name"),
-    year: Optional[int] = Query(None, description="Filter by year"),
+    response: Response,
+    aem: Optional[List[int]] = Query(None, description="Filter by student AEM (repeat for several)"),
+    test: Optional[List[str]] = Query(None, description="Filter by test name (repeat for several)"),
+    year: Optional[List[int]] = Query(None, description="Filter by year (repeat for several)"),
+    year_from: Optional[int] = Query(None, description="Earliest year, inclusive"),
+    year_to: Optional[int] = Query(None, description="Latest year, inclusive"),
+    grade_min: Optional[float] = Query(None, description="Lowest grade, inclusive"),
+    grade_max: Optional[float] = Query(None, description="Highest grade, inclusive"),
+    normalized: bool = Query(False, description="Include each grade's z-score within its test and year"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. aem,test,grade; default all"),
+    count: str = Query("none", description="Total in X-Total-Count: exact, estimate or none", pattern="^(exact|estimate|none)$"),
     limit: int = Query(100, description="Limit results", le=1000),
     offset: int = Query(0, description="Offset for pagination")
 ):
-    """Get student grades with optional filters"""
+    """Get student grades with optional filters.
+
+    With ``count=exact`` the total is counted once per filter set and
+    cached until the next write; ``count=estimate`` uses the planner's
+    row estimate instead.
+    """
     try:
         with DatabaseManager() as db:
-            # Build query based on filters
-            where_conditions = []
-            params = []
-            
-            if aem:
-                where_conditions.append("aem = %s")
-                params.append(aem)
+            columns = ", ".join(_grade_fields(fields))
+            where_clause, params = _grade_filters(aem, test, year, year_from, year_to, grade_min, grade_max)
             
-            if test:
-                where_conditions.append("test = %s")
-                params.append(test)
+            total = _count_grades(db, where_clause, params, count)
+            if total is not None:
+                response.headers["X-Total-Count"] = str(total)
             
-            if year:
-                where_conditions.append("year = %s")
-                params.append(year)
-            
-            where_clause = ""
-            if where_conditions:
-                where_clause = "WHERE " + " AND ".join(where_conditions)
+            if normalized:
+                # Groups whose refresh failed after a write are recomputed first
+                if not GradeNormalization.refresh_dirty(db):
+                    raise HTTPException(status_code=500, detail="Z-scores are out of date and could not be recomputed")
+                columns += """,
+                    (SELECT z.z_score FROM grade_zscores z
+                     WHERE z.aem = g.aem AND z.test = g.test AND z.year = g.year) as z_score"""
             
             query = f"""
-                SELECT id, aem, test, grade, year, created_at, updated_at
-                FROM student_grades
+                SELECT {columns}
+                FROM student_grades g
                 {where_clause}
                 ORDER BY year DESC, aem, test
                 LIMIT %s OFFSET %s;
@@ -53,18 +164,53 @@ async def get_student_grades(
             results = db.execute_query(query, tuple(params))
             
             if results:
-                return [StudentGrade(**row) for row in results]
+                return [StudentGradeFields(**row) for row in results]
             else:
                 return []
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@router.get("/export")
+async def export_student_grades(
+    format: str = Query("csv", description="Export format: csv or parquet", pattern="^(csv|parquet)$"),
+    aem: Optional[int] = Query(None, description="Filter by student AEM"),
+    test: Optional[str] = Query(None, description="Filter by test name"),
+    year: Optional[int] = Query(None, description="Filter by year")
+):
+    """Stream all matching grade records as CSV or Parquet.
+
+    CSV is produced by COPY ... TO STDOUT and Parquet from a server-side
+    cursor in row-group batches; either way the export is streamed to the
+    client as it is produced, so memory use does not grow with the table.
+    """
+    if format == "parquet" and not GradeExport.parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow on the server")
+
+    def produce(out):
+        with DatabaseManager() as db:
+            if format == "csv":
+                success = GradeExport.copy_csv(db, out, aem, test, year)
+            else:
+                success = GradeExport.write_parquet(db, out, aem, test, year)
+            if not success:
+                raise RuntimeError("Grade export failed")
+
+    media_type = "text/csv" if format == "csv" else "application/vnd.apache.parquet"
+    return StreamingResponse(
+        stream_writer_output(produce),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="student_grades.{format}"'}
+    )
+
+
 @router.get("/grades/{aem}", response_model=List[StudentGrade])
 async def get_student_grades_by_aem(aem: int):
     """Get all grades for a specific student"""
-    try:
+    def load_transcript():
         with DatabaseManager() as db:
             query = """
                 SELECT id, aem, test, grade, year, created_at, updated_at
@@ -75,10 +221,21 @@ async def get_student_grades_by_aem(aem: int):
             
             results = db.execute_query(query, (aem,))
             
-            if results:
-                return [StudentGrade(**row) for row in results]
-            else:
-                raise HTTPException(status_code=404, detail=f"No grades found for student {aem}")
+            if results is None:
+                return None
+            if not results:
+                return NOT_FOUND
+            return serialize_transcript([StudentGrade(**row) for row in results])
+
+    try:
+        body = transcript_cache.get_or_load(aem, load_transcript)
+        
+        if body is None:
+            raise HTTPException(status_code=500, detail="Failed to fetch student grades")
+        if body == NOT_FOUND:
+            raise HTTPException(status_code=404, detail=f"No grades found for student {aem}")
+        
+        return Response(content=body, media_type="application/json")
                 
     except HTTPException:
         raise
@@ -86,34 +243,134 @@ async def get_student_grades_by_aem(aem: int):
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@router.post("/grades/batch", response_model=StudentTranscriptBatch)
+async def get_student_grades_batch(request: StudentGradesBatchRequest):
+    """Get all grades for several students in one query.
+
+    Students are returned in request order (duplicates removed), each with
+    the same grade ordering as /grades/{aem}. AEMs without grades are
+    listed in ``missing`` instead of failing the whole batch.
+    """
+    aems = list(dict.fromkeys(request.aems))
+
+    try:
+        with DatabaseManager() as db:
+            query = """
+                SELECT id, aem, test, grade, year, created_at, updated_at
+                FROM student_grades
+                WHERE aem = ANY(%s)
+                ORDER BY aem, year DESC, test;
+            """
+            
+            results = db.execute_query(query, (aems,))
+            
+            if results is None:
+                raise HTTPException(status_code=500, detail="Failed to fetch student grades")
+            
+            grouped = {aem: [] for aem in aems}
+            for row in results:
+                grouped[row["aem"]].append(StudentGrade(**row))
+            
+            return StudentTranscriptBatch(
+                students=[
+                    StudentTranscript(aem=aem, grades=grades)
+                    for aem, grades in grouped.items() if grades
+                ],
+                missing=[aem for aem, grades in grouped.items() if not grades]
+            )
+                
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+# Largest accepted grade upload
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+
+# Columns returned by every write, so callers get the values as written
+RETURNING_COLUMNS = "id, aem, test, grade, year, created_at, updated_at"
+
+# Rows written between rescans of stale sketch registers. Reads widen the
+# distinct-student error bound by the stale rows in between, so single-row
+# writes do not each pay for a rescan
+SKETCH_REFRESH_ROWS = 100
+_sketch_rows = 0
+_sketch_rows_lock = threading.Lock()
+
+
+def _sketch_refresh_due(rows: int) -> bool:
+    """Count written rows; True once enough have accumulated for a rescan"""
+    global _sketch_rows
+    with _sketch_rows_lock:
+        _sketch_rows += rows
+        if _sketch_rows < SKETCH_REFRESH_ROWS:
+            return False
+        _sketch_rows = 0
+        return True
+
+
+def _after_write(db, *aems: int, groups=(), rows: int = 1):
+    """Keep the in-process caches and derived tables in step with a committed write.
+
+    ``groups`` are the (test, year) pairs the write touched and ``rows``
+    the number of rows it wrote.
+    """
+    for aem in aems:
+        transcript_cache.invalidate(aem)
+    grade_counts.clear()
+    update_student_rankings(db, *aems)
+    if groups:
+        invalidate_cohorts(*sorted({year for _, year in groups}))
+        # A failed refresh leaves the groups dirty for the next read or write
+        GradeNormalization.refresh(db, groups)
+        # Deletes and key changes leave sketch registers to rescan, in batches
+        if _sketch_refresh_due(rows):
+            GradeSketches.refresh_stale(db)
+
+
 @router.post("/grades", response_model=APIResponse)
 async def create_student_grade(grade_data: StudentGradeCreate):
     """Create a new student grade record"""
     try:
         with DatabaseManager() as db:
-            query = """
+            # A new year gets its partition before the row lands in the default one
+            GradePartitioning.ensure_partitions(db, [grade_data.year])
+
+            # Both timestamps default to the transaction time on insert, while
+            # an update moves only updated_at (xmax is not available on a
+            # partitioned table)
+            query = f"""
                 INSERT INTO student_grades (aem, test, grade, year)
                 VALUES (%s, %s, %s, %s)
                 ON CONFLICT (aem, test, year) DO UPDATE SET
                     grade = EXCLUDED.grade,
                     updated_at = CURRENT_TIMESTAMP
-                RETURNING id;
+                RETURNING {RETURNING_COLUMNS}, (created_at = updated_at) as created;
             """
             
-            result = db.execute_query(
+            result = db.execute_returning(
                 query, 
                 (grade_data.aem, grade_data.test, grade_data.grade, grade_data.year)
             )
             
             if result:
+                _after_write(db, grade_data.aem, groups=[(grade_data.test, grade_data.year)])
                 return APIResponse(
                     success=True,
                     message="Grade record created/updated successfully",
-                    data={"id": result[0]["id"]}
+                    data={
+                        "id": result[0]["id"],
+                        "created": result[0]["created"],
+                        "rows_affected": db.rowcount,
+                        "grade": StudentGrade(**result[0]).model_dump(mode="json")
+                    }
                 )
             else:
                 raise HTTPException(status_code=400, detail="Failed to create grade record")
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
@@ -128,35 +385,38 @@ async def update_student_grade(
     """Update a specific student grade"""
     try:
         with DatabaseManager() as db:
-            # Check if record exists
-            check_query = "SELECT id FROM student_grades WHERE aem = %s AND test = %s AND year = %s;"
-            existing = db.execute_query(check_query, (aem, test, year))
-            
-            if not existing:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"No grade record found for student {aem}, test {test}, year {year}"
-                )
-            
-            # Update the record
-            update_query = """
+            # One statement: a missing record simply returns no rows, and a
+            # grade left out of the body keeps its current value
+            update_query = f"""
                 UPDATE student_grades 
-                SET grade = %s, updated_at = CURRENT_TIMESTAMP
-                WHERE aem = %s AND test = %s AND year = %s;
+                SET grade = COALESCE(%s, grade), updated_at = CURRENT_TIMESTAMP
+                WHERE aem = %s AND test = %s AND year = %s
+                RETURNING {RETURNING_COLUMNS};
             """
             
-            success = db.execute_command(
+            result = db.execute_returning(
                 update_query, 
                 (grade_update.grade, aem, test, year)
             )
             
-            if success:
-                return APIResponse(
-                    success=True,
-                    message="Grade updated successfully"
-                )
-            else:
+            if result is None:
                 raise HTTPException(status_code=400, detail="Failed to update grade")
+            
+            if not result:
+                raise HTTPException(
+                    status_code=404, 
+                    detail=f"No grade record found for student {aem}, test {test}, year {year}"
+                )
+            
+            _after_write(db, aem, groups=[(test, year)])
+            return APIResponse(
+                success=True,
+                message="Grade updated successfully",
+                data={
+                    "rows_affected": db.rowcount,
+                    "grade": StudentGrade(**result[0]).model_dump(mode="json")
+                }
+            )
                 
     except HTTPException:
         raise
@@ -169,27 +429,87 @@ async def delete_student_grade(aem: int, test: str, year: int):
     """Delete a specific student grade"""
     try:
         with DatabaseManager() as db:
-            # Check if record exists
-            check_query = "SELECT id FROM student_grades WHERE aem = %s AND test = %s AND year = %s;"
-            existing = db.execute_query(check_query, (aem, test, year))
+            delete_query = f"""
+                DELETE FROM student_grades
+                WHERE aem = %s AND test = %s AND year = %s
+                RETURNING {RETURNING_COLUMNS};
+            """
+            result = db.execute_returning(delete_query, (aem, test, year))
             
-            if not existing:
+            if result is None:
+                raise HTTPException(status_code=400, detail="Failed to delete grade")
+            
+            if not result:
                 raise HTTPException(
                     status_code=404, 
                     detail=f"No grade record found for student {aem}, test {test}, year {year}"
                 )
             
-            # Delete the record
-            delete_query = "DELETE FROM student_grades WHERE aem = %s AND test = %s AND year = %s;"
-            success = db.execute_command(delete_query, (aem, test, year))
+            _after_write(db, aem, groups=[(test, year)])
+            return APIResponse(
+                success=True,
+                message="Grade deleted successfully",
+                data={
+                    "rows_affected": db.rowcount,
+                    "grade": StudentGrade(**result[0]).model_dump(mode="json")
+                }
+            )
+                
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+def _batch_result(db, rows, keys) -> StudentGradeBatchResult:
+    """Build a batch result, listing the requested keys no row matched"""
+    found = {(row["aem"], row["test"], row["year"]) for row in rows}
+    _after_write(
+        db, *sorted({row["aem"] for row in rows}), groups={(row["test"], row["year"]) for row in rows}, rows=len(rows)
+    )
+    
+    return StudentGradeBatchResult(
+        rows_affected=db.rowcount,
+        grades=[StudentGrade(**row) for row in rows],
+        missing=[
+            StudentGradeKey(aem=aem, test=test, year=year)
+            for aem, test, year in keys if (aem, test, year) not in found
+        ]
+    )
+
+
+@router.post("/grades/batch-update", response_model=StudentGradeBatchResult)
+async def update_student_grades_batch(request: StudentGradeBatchUpdate):
+    """Update many grades in one statement.
+
+    Items are joined against student_grades through unnest(), so the whole
+    batch is one round trip and one transaction. Later items win when a
+    key repeats.
+    """
+    items = {(item.aem, item.test, item.year): item.grade for item in request.items}
+    keys = list(items)
+    
+    try:
+        with DatabaseManager() as db:
+            query = """
+                UPDATE student_grades g
+                SET grade = v.grade, updated_at = CURRENT_TIMESTAMP
+                FROM unnest(%s::int[], %s::varchar[], %s::int[], %s::numeric[]) as v(aem, test, year, grade)
+                WHERE g.aem = v.aem AND g.test = v.test AND g.year = v.year
+                RETURNING g.id, g.aem, g.test, g.grade, g.year, g.created_at, g.updated_at;
+            """
+            
+            result = db.execute_returning(query, (
+                [key[0] for key in keys],
+                [key[1] for key in keys],
+                [key[2] for key in keys],
+                list(items.values())
+            ))
             
-            if success:
-                return APIResponse(
-                    success=True,
-                    message="Grade deleted successfully"
-                )
-            else:
-                raise HTTPException(status_code=400, detail="Failed to delete grade")
+            if result is None:
+                raise HTTPException(status_code=400, detail="Failed to update grades")
+            
+            return _batch_result(db, result, keys)
                 
     except HTTPException:
         raise
@@ -197,29 +517,105 @@ async def delete_student_grade(aem: int, test: str, year: int):
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@router.post("/grades/batch-delete", response_model=StudentGradeBatchResult)
+async def delete_student_grades_batch(request: StudentGradeBatchDelete):
+    """Delete many grades in one statement, returning the deleted records"""
+    keys = list(dict.fromkeys((key.aem, key.test, key.year) for key in request.keys))
+    
+    try:
+        with DatabaseManager() as db:
+            query = """
+                DELETE FROM student_grades g
+                USING unnest(%s::int[], %s::varchar[], %s::int[]) as k(aem, test, year)
+                WHERE g.aem = k.aem AND g.test = k.test AND g.year = k.year
+                RETURNING g.id, g.aem, g.test, g.grade, g.year, g.created_at, g.updated_at;
+            """
+            
+            result = db.execute_returning(query, (
+                [key[0] for key in keys],
+                [key[1] for key in keys],
+                [key[2] for key in keys]
+            ))
+            
+            if result is None:
+                raise HTTPException(status_code=400, detail="Failed to delete grades")
+            
+            return _batch_result(db, result, keys)
+                
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.post("/grades/upload", response_model=GradeUploadReport)
+async def upload_student_grades(
+    request: Request,
+    dry_run: bool = Query(False, description="Validate only, without loading any rows"),
+    allow_new_tests: bool = Query(False, description="Accept test names not yet in the database")
+):
+    """Validate and bulk-load a CSV file of grades sent as the request body.
+
+    The file needs a header with aem, test, grade and year; ';' and tab
+    delimited exports with decimal commas are accepted as well. Valid rows
+    are loaded with COPY and upserted in one transaction (the last row wins
+    for repeated keys); invalid rows are reported by line number.
+    """
+    with tempfile.TemporaryFile() as upload:
+        await spool_request_body(request, upload, MAX_UPLOAD_BYTES)
+
+        def run_import():
+            with DatabaseManager() as db:
+                report = GradeImport.import_file(db, upload, allow_new_tests=allow_new_tests, dry_run=dry_run)
+                if report.inserted:
+                    # Rows of years without a partition went to the default one
+                    GradePartitioning.ensure_partitions(db)
+                if report.groups:
+                    # A failed refresh leaves the groups dirty for the next read or write
+                    GradeNormalization.refresh(db, report.groups)
+                return report
+
+        try:
+            report = await run_in_threadpool(run_import)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if report.header_error:
+        raise HTTPException(status_code=400, detail=report.header_error)
+
+    if report.inserted or report.updated:
+        transcript_cache.clear()
+        grade_counts.clear()
+        invalidate_rankings()
+        invalidate_cohorts()
+
+    return GradeUploadReport(
+        rows=report.rows,
+        valid=report.valid,
+        invalid=report.invalid,
+        inserted=report.inserted,
+        updated=report.updated,
+        dry_run=dry_run,
+        errors=report.errors,
+        errors_truncated=report.errors_truncated
+    )
+
+
+@router.get("/cache-stats")
+async def get_transcript_cache_stats():
+    """Get hit, miss and memory statistics of the transcript cache"""
+    return transcript_cache.stats()
+
+
 @router.get("/stats", response_model=List[StudentStats])
 async def get_student_stats(
     limit: int = Query(50, description="Limit results", le=100),
     min_tests: int = Query(1, description="Minimum number of tests", ge=1)
 ):
-    """Get student statistics"""
+    """Get student statistics from the trigger-maintained aggregates"""
     try:
         with DatabaseManager() as db:
-            query = """
-                SELECT 
-                    aem,
-                    COUNT(*) as total_tests,
-                    ROUND(AVG(grade), 2) as average_grade,
-                    ROUND(MIN(grade), 2) as min_grade,
-                    ROUND(MAX(grade), 2) as max_grade
-                FROM student_grades
-                GROUP BY aem
-                HAVING COUNT(*) >= %s
-                ORDER BY average_grade DESC
-                LIMIT %s;
-            """
-            
-            results = db.execute_query(query, (min_tests, limit))
+            results = StudentAggregates.get_stats(db, min_tests=min_tests, limit=limit)
             
             if results:
                 return [StudentStats(**row) for row in results]
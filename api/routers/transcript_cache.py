@@ -0,0 +1,139 @@
+"""
+Read-through cache of serialized per-student transcripts
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+
+# Marker cached for students without any grades, so repeated lookups of an
+# unknown AEM do not reach the database either
+NOT_FOUND = b""
+
+# Approximate per-entry bookkeeping cost charged against the memory cap, so
+# NOT_FOUND entries are bounded as well
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def serialize_transcript(grades) -> bytes:
+    """Serialize grade models exactly as FastAPI's JSONResponse would"""
+    return json.dumps(
+        jsonable_encoder(grades),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class TranscriptCache:
+    """LRU cache of transcript bodies keyed by AEM, bounded by total bytes.
+
+    Writes evict only the AEM they touch. An eviction while a fill of the
+    same AEM is in flight bumps that AEM's generation, and the fill is
+    then discarded, so a read racing a write can never cache stale grades.
+    Generations are only kept while fills are in flight, so bookkeeping
+    stays bounded by concurrent reads, not by students ever written. The
+    cache lives in process memory; ``max_age`` bounds staleness from
+    writes made outside the API (imports, psql).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_age: float = 300.0):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries: "OrderedDict[int, Tuple[bytes, float]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._loading: Dict[int, int] = {}
+        self._epoch = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, aem: int) -> Optional[bytes]:
+        """Return the cached body for an AEM, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(aem)
+            if entry is None or time.monotonic() - entry[1] > self.max_age:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(aem)
+            self.hits += 1
+            return entry[0]
+
+    def get_or_load(self, aem: int, loader: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """Return the cached body, calling ``loader`` and caching its result on a miss.
+
+        ``loader`` returns the serialized body, NOT_FOUND for an AEM without
+        grades, or None on failure (which is not cached).
+        """
+        body = self.get(aem)
+        if body is not None:
+            return body
+
+        with self._lock:
+            generation = (self._epoch, self._generations.get(aem, 0))
+            self._loading[aem] = self._loading.get(aem, 0) + 1
+
+        body = None
+        try:
+            body = loader()
+        finally:
+            with self._lock:
+                if body is not None and (self._epoch, self._generations.get(aem, 0)) == generation:
+                    self._put(aem, body)
+                self._loading[aem] -= 1
+                if not self._loading[aem]:
+                    del self._loading[aem]
+                    self._generations.pop(aem, None)
+        return body
+
+    def _put(self, aem: int, body: bytes):
+        """Store a body; the caller holds the lock"""
+        size = len(body) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        self._remove(aem)
+        self._entries[aem] = (body, time.monotonic())
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted) + ENTRY_OVERHEAD_BYTES
+            self.evictions += 1
+
+    def _remove(self, aem: int):
+        entry = self._entries.pop(aem, None)
+        if entry is not None:
+            self._bytes -= len(entry[0]) + ENTRY_OVERHEAD_BYTES
+
+    def invalidate(self, aem: int):
+        """Drop the cached transcript of one student after a write"""
+        with self._lock:
+            self._remove(aem)
+            if aem in self._loading:
+                self._generations[aem] = self._generations.get(aem, 0) + 1
+
+    def clear(self):
+        """Drop every cached transcript"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._bytes = 0
+            # In-flight fills are discarded by the epoch; their generations
+            # are dropped when they finish
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -5,14 +5,41 @@ This package contains all database-related functionality including:
 - Connection management
 - Data import utilities
 - Analytics and reporting
+- Single-pass grade histograms
+- Sketches for approximate analytics
+- Per-(test, year) z-score normalization
+- Trigger-maintained per-student aggregates
+- Bulk CSV/Parquet export
+- Validated bulk CSV import
+- Year partitioning of student grades
+- Rail network graph storage
+- Fragility parameter library
 - Test functions
 """
 
 from .connection import DatabaseConnection, DatabaseManager
 from .analytics import StudentAnalytics
+from .student_aggregates import StudentAggregates
+from .grade_distributions import GradeDistributions
+from .grade_sketches import GradeSketches
+from .normalization import GradeNormalization
+from .export import GradeExport
+from .grade_import import GradeImport
+from .partitioning import GradePartitioning
+from .network import RailNetwork
+from .fragility_library import FragilityLibrary
 
 __all__ = [
     'DatabaseConnection',
     'DatabaseManager', 
-    'StudentAnalytics'
+    'StudentAnalytics',
+    'StudentAggregates',
+    'GradeDistributions',
+    'GradeSketches',
+    'GradeNormalization',
+    'GradeExport',
+    'GradeImport',
+    'GradePartitioning',
+    'RailNetwork',
+    'FragilityLibrary'
 ]
\ No newline at end of file
@@ -13,6 +13,8 @@ class DatabaseConnection:
     def __init__(self):
         self.connection = None
         self.cursor = None
+        # Rows affected by the last execute_command / execute_returning call
+        self.rowcount = 0
     
     def connect(self):
         """Connect to the PostgreSQL database using DATABASE_URL or individual components"""
@@ -83,15 +85,41 @@ class DatabaseConnection:
             return None
     
     def execute_command(self, command, params=None):
-        """Execute an INSERT, UPDATE, or DELETE command"""
+        """Execute an INSERT, UPDATE, or DELETE command.
+
+        Returns True on success; the number of affected rows is left in
+        ``rowcount``.
+        """
+        self.rowcount = 0
         try:
             self.cursor.execute(command, params)
+            self.rowcount = self.cursor.rowcount
             self.connection.commit()
             return True
         except psycopg2.Error as e:
             print(f"❌ Error executing command: {e}")
             self.connection.rollback()
+            self.rowcount = 0
             return False
+    
+    def execute_returning(self, command, params=None):
+        """Execute an INSERT, UPDATE, or DELETE command with RETURNING and return the rows.
+
+        The rows carry the values as written, so no follow-up SELECT is
+        needed; an empty list means no row matched. Returns None on error.
+        """
+        self.rowcount = 0
+        try:
+            self.cursor.execute(command, params)
+            rows = self.cursor.fetchall()
+            self.rowcount = self.cursor.rowcount
+            self.connection.commit()
+            return rows
+        except psycopg2.Error as e:
+            print(f"❌ Error executing command: {e}")
+            self.connection.rollback()
+            self.rowcount = 0
+            return None
 
 # Context manager for automatic connection handling
 class DatabaseManager:
@@ -0,0 +1,154 @@
+"""
+Bulk export of student grades as CSV (COPY) or Parquet
+"""
+import psycopg2
+from .connection import DatabaseManager
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, CSV export is always available
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = ("id", "aem", "test", "grade", "year", "created_at", "updated_at")
+
+
+class GradeExport:
+    """Class to stream student_grades out of PostgreSQL without buffering it.
+
+    Both formats write to any object with a ``write(bytes)`` method. CSV
+    goes through ``COPY ... TO STDOUT`` and runs at COPY speed; Parquet
+    reads a server-side cursor and writes one row group per batch. Rows
+    are exported in storage order, which avoids a sort over the table.
+    """
+
+    @staticmethod
+    def parquet_available():
+        return pq is not None
+
+    @staticmethod
+    def build_select(db, aem=None, test=None, year=None):
+        """SELECT for the export with the filters bound as literals.
+
+        COPY does not accept query parameters, so values are inlined
+        through the driver's own quoting.
+        """
+        where_conditions = []
+        params = []
+
+        if aem is not None:
+            where_conditions.append("aem = %s")
+            params.append(aem)
+
+        if test is not None:
+            where_conditions.append("test = %s")
+            params.append(test)
+
+        if year is not None:
+            where_conditions.append("year = %s")
+            params.append(year)
+
+        where_clause = ""
+        if where_conditions:
+            where_clause = " WHERE " + " AND ".join(where_conditions)
+
+        query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM student_grades{where_clause}"
+        return db.cursor.mogrify(query, params).decode("utf-8")
+
+    @staticmethod
+    def copy_csv(db, out, aem=None, test=None, year=None):
+        """Write the filtered grades as CSV with a header row. Returns True on success."""
+        select = GradeExport.build_select(db, aem, test, year)
+        try:
+            db.cursor.copy_expert(f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER true)", out)
+            db.connection.commit()
+            return True
+        except psycopg2.Error as e:
+            print(f"❌ Error exporting grades: {e}")
+            db.connection.rollback()
+            return False
+
+    @staticmethod
+    def write_parquet(db, out, aem=None, test=None, year=None, batch_rows=50000):
+        """Write the filtered grades as Parquet, one row group per batch. Returns True on success.
+
+        Raises RuntimeError if pyarrow is not installed.
+        """
+        if pq is None:
+            raise RuntimeError("Parquet export requires pyarrow")
+
+        schema = pa.schema([
+            ("id", pa.int32()),
+            ("aem", pa.int32()),
+            ("test", pa.string()),
+            ("grade", pa.decimal128(4, 2)),
+            ("year", pa.int32()),
+            ("created_at", pa.timestamp("us")),
+            ("updated_at", pa.timestamp("us"))
+        ])
+
+        select = GradeExport.build_select(db, aem, test, year)
+        cursor = db.connection.cursor(name="grades_export")
+        cursor.itersize = batch_rows
+
+        try:
+            cursor.execute(select)
+            with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+                while True:
+                    rows = cursor.fetchmany(batch_rows)
+                    if not rows:
+                        break
+                    columns = list(zip(*rows))
+                    writer.write_batch(pa.record_batch(
+                        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                        schema=schema
+                    ))
+            cursor.close()
+            db.connection.commit()
+            return True
+        except psycopg2.Error as e:
+            print(f"❌ Error exporting grades: {e}")
+            db.connection.rollback()
+            return False
+
+
+def export_grades_interactive():
+    """Prompt for filters and a format, then export grades to a file"""
+    print("\n📤 EXPORT STUDENT GRADES")
+    print("-" * 40)
+
+    def ask(prompt, cast=str):
+        value = input(prompt).strip()
+        return cast(value) if value else None
+
+    try:
+        aem = ask("AEM filter (blank for all): ", int)
+        test = ask("Test filter (blank for all): ")
+        year = ask("Year filter (blank for all): ", int)
+        file_format = (ask("Format [csv/parquet] (default csv): ") or "csv").lower()
+
+        if file_format not in ("csv", "parquet"):
+            print("❌ Format must be csv or parquet")
+            return
+        if file_format == "parquet" and not GradeExport.parquet_available():
+            print("❌ Parquet export requires pyarrow (pip install pyarrow)")
+            return
+
+        path = ask(f"Output file (default student_grades.{file_format}): ") or f"student_grades.{file_format}"
+
+        with DatabaseManager() as db, open(path, "wb") as out:
+            if file_format == "csv":
+                success = GradeExport.copy_csv(db, out, aem, test, year)
+            else:
+                success = GradeExport.write_parquet(db, out, aem, test, year)
+
+        if success:
+            print(f"✅ Grades exported to {path}")
+        else:
+            print("❌ Export failed")
+
+    except ValueError:
+        print("❌ AEM and year must be numbers")
+    except Exception as e:
+        print(f"❌ Error exporting grades: {e}")
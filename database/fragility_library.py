@@ -0,0 +1,79 @@
+"""
+Fragility parameter library storage keyed by asset typology and damage state
+"""
+
+
+class FragilityLibrary:
+    """Class to handle the fragility_parameters table"""
+
+    # Same scenarios as /latex/fragility/examples, stored as a generic typology
+    EXAMPLE_PARAMETERS = [
+        ("generic", "Light", 0.2, 0.5),
+        ("generic", "Moderate", 0.4, 0.6),
+        ("generic", "Heavy", 0.8, 0.7),
+        ("generic", "Complete", 1.2, 0.8)
+    ]
+
+    @staticmethod
+    def create_tables(db):
+        """Create the fragility_parameters table"""
+        return db.execute_command("""
+        CREATE TABLE IF NOT EXISTS fragility_parameters (
+            id SERIAL PRIMARY KEY,
+            typology VARCHAR(50) NOT NULL,
+            damage_state VARCHAR(50) NOT NULL,
+            pga_mean DECIMAL(8, 4) NOT NULL CHECK (pga_mean > 0),
+            beta DECIMAL(8, 4) NOT NULL CHECK (beta > 0),
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (typology, damage_state)
+        );
+        """)
+
+    @staticmethod
+    def seed_examples(db):
+        """Add the example damage states without overwriting existing rows"""
+        insert_parameters = """
+        INSERT INTO fragility_parameters (typology, damage_state, pga_mean, beta)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (typology, damage_state) DO NOTHING;
+        """
+        return all(
+            db.execute_command(insert_parameters, row)
+            for row in FragilityLibrary.EXAMPLE_PARAMETERS
+        )
+
+    @staticmethod
+    def load_all(db):
+        """Return every parameter row ordered by typology and increasing median"""
+        return db.execute_query("""
+            SELECT typology, damage_state, pga_mean, beta, description
+            FROM fragility_parameters
+            ORDER BY typology, pga_mean, damage_state;
+        """)
+
+    @staticmethod
+    def upsert(db, typology, damage_state, pga_mean, beta, description=None):
+        """Insert or update the parameters of one typology and damage state"""
+        result = db.execute_returning("""
+            INSERT INTO fragility_parameters (typology, damage_state, pga_mean, beta, description)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (typology, damage_state) DO UPDATE SET
+                pga_mean = EXCLUDED.pga_mean,
+                beta = EXCLUDED.beta,
+                description = EXCLUDED.description,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING id;
+        """, (typology, damage_state, pga_mean, beta, description))
+        return result[0]["id"] if result else None
+
+    @staticmethod
+    def delete(db, typology, damage_state):
+        """Delete one typology and damage state, returning True if a row was removed"""
+        result = db.execute_returning("""
+            DELETE FROM fragility_parameters
+            WHERE typology = %s AND damage_state = %s
+            RETURNING id;
+        """, (typology, damage_state))
+        return bool(result)
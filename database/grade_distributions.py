@@ -0,0 +1,208 @@
+"""
+Grade distributions computed in a single pass over student_grades
+"""
+from bisect import bisect_left
+from decimal import Decimal
+from itertools import accumulate, groupby
+from typing import List, Optional, Sequence
+
+MIN_GRADE = 0.0
+MAX_GRADE = 10.0
+
+# Labels of the one-point grade ranges used by the distribution reports
+GRADE_RANGE_LABELS = [
+    "0.0-0.9", "1.0-1.9", "2.0-2.9", "3.0-3.9", "4.0-4.9 (Fail)",
+    "5.0-5.9 (Pass)", "6.0-6.9", "7.0-7.9", "8.0-8.9", "9.0-10.0 (Excellent)"
+]
+
+
+def uniform_edges(bins: int, low: float = MIN_GRADE, high: float = MAX_GRADE) -> List[float]:
+    """Edges of ``bins`` equal-width bins spanning [low, high]"""
+    width = (high - low) / bins
+    return [round(low + i * width, 10) for i in range(bins)] + [high]
+
+
+def _filters(test=None, year=None, alias=""):
+    """WHERE clause and parameters for the optional test/year filters"""
+    prefix = f"{alias}." if alias else ""
+    where_conditions = []
+    params = []
+
+    if test is not None:
+        where_conditions.append(f"{prefix}test = %s")
+        params.append(test)
+
+    if year is not None:
+        where_conditions.append(f"{prefix}year = %s")
+        params.append(year)
+
+    where_clause = ""
+    if where_conditions:
+        where_clause = "WHERE " + " AND ".join(where_conditions)
+
+    return where_clause, params
+
+
+class GradeDistributions:
+    """Class to compute grade histograms without per-bin CASE ladders"""
+
+    @staticmethod
+    def histogram(db, edges: Sequence[float], test=None, year=None) -> Optional[dict]:
+        """Count grades per bin in one scan with width_bucket.
+
+        ``edges`` must be strictly increasing; bins are half-open
+        [edge, next edge) except the last, which also includes its upper
+        edge. Returns ``counts`` per bin plus the grades ``below`` the
+        first and ``above`` the last edge, or None if the query failed.
+        """
+        edges = [float(edge) for edge in edges]
+        bins = len(edges) - 1
+        where_clause, params = _filters(test, year)
+
+        # width_bucket gives 0 below the first edge and len(edges) from the
+        # last edge up; a grade equal to the last edge is folded back into
+        # the last bin
+        rows = db.execute_query(f"""
+            SELECT
+                width_bucket(grade, %s::numeric[]) - (grade = %s)::int as bucket,
+                COUNT(*) as count
+            FROM student_grades
+            {where_clause}
+            GROUP BY 1;
+        """, [edges, edges[-1]] + params)
+
+        if rows is None:
+            return None
+
+        counts = [0] * (bins + 2)
+        for row in rows:
+            counts[row["bucket"]] = row["count"]
+
+        return {
+            "edges": edges,
+            "counts": counts[1:-1],
+            "below": counts[0],
+            "above": counts[-1],
+            "total": sum(counts)
+        }
+
+    @staticmethod
+    def grade_ranges(db) -> Optional[List[dict]]:
+        """Count and percentage of grades per one-point range, skipping empty ranges"""
+        histogram = GradeDistributions.histogram(db, uniform_edges(len(GRADE_RANGE_LABELS)))
+        if histogram is None:
+            return None
+
+        total = histogram["total"]
+        return [
+            {
+                "grade_range": label,
+                "count": count,
+                "percentage": round(count * 100.0 / total, 1)
+            }
+            for label, count in zip(GRADE_RANGE_LABELS, histogram["counts"]) if count
+        ]
+
+    @staticmethod
+    def pass_rates(db, thresholds: Sequence[float], test=None, year=None) -> Optional[List[dict]]:
+        """Share of grades at or above each threshold, per (test, year).
+
+        One scan collapses each group to its distinct grades and their
+        counts (grades have two decimals, so at most 1001 per group); every
+        threshold is then answered from the cumulative counts with a binary
+        search. Thresholds are compared as decimals, like the NUMERIC
+        grades, so a grade equal to a threshold passes. Returns one dict
+        per group with ``total`` and ``pass_counts`` aligned with
+        ``thresholds``, or None if the query failed.
+        """
+        where_clause, params = _filters(test, year)
+
+        rows = db.execute_query(f"""
+            SELECT test, year, grade, COUNT(*) as count
+            FROM student_grades
+            {where_clause}
+            GROUP BY test, year, grade
+            ORDER BY test, year, grade;
+        """, params)
+
+        if rows is None:
+            return None
+
+        cutoffs = [Decimal(str(threshold)) for threshold in thresholds]
+        groups = []
+        for (group_test, group_year), group_rows in groupby(rows, key=lambda row: (row["test"], row["year"])):
+            group_rows = list(group_rows)
+            grades = [row["grade"] for row in group_rows]
+            below = [0] + list(accumulate(row["count"] for row in group_rows))
+            total = below[-1]
+            groups.append({
+                "test": group_test,
+                "year": group_year,
+                "total": total,
+                "pass_counts": [total - below[bisect_left(grades, cutoff)] for cutoff in cutoffs]
+            })
+
+        return groups
+
+    @staticmethod
+    def pivot(db, pass_threshold=5.0, test=None, year=None) -> Optional[dict]:
+        """Test x year matrices of count, average, stddev and pass rate.
+
+        Computed with one grouped query. Each matrix has a row per test
+        and a column per year, with None for cells without grades.
+        Returns None if the query failed.
+        """
+        where_clause, params = _filters(test, year)
+
+        rows = db.execute_query(f"""
+            SELECT
+                test,
+                year,
+                COUNT(*) as count,
+                ROUND(AVG(grade), 2) as average,
+                ROUND(STDDEV_SAMP(grade), 2) as stddev,
+                ROUND(COUNT(*) FILTER (WHERE grade >= %s) * 100.0 / COUNT(*), 2) as pass_rate
+            FROM student_grades
+            {where_clause}
+            GROUP BY test, year;
+        """, [pass_threshold] + params)
+
+        if rows is None:
+            return None
+
+        tests = sorted({row["test"] for row in rows})
+        years = sorted({row["year"] for row in rows})
+        test_index = {name: i for i, name in enumerate(tests)}
+        year_index = {value: i for i, value in enumerate(years)}
+
+        matrices = {
+            name: [[None] * len(years) for _ in tests]
+            for name in ("count", "average", "stddev", "pass_rate")
+        }
+        for row in rows:
+            i, j = test_index[row["test"]], year_index[row["year"]]
+            matrices["count"][i][j] = row["count"]
+            for name in ("average", "stddev", "pass_rate"):
+                if row[name] is not None:
+                    matrices[name][i][j] = float(row[name])
+
+        return {"tests": tests, "years": years, **matrices}
+
+    @staticmethod
+    def percentiles(db, fractions: Sequence[float], test=None, year=None) -> Optional[dict]:
+        """Exact continuous percentiles (percentile_cont) of the selected grades.
+
+        Returns ``count`` and ``values`` aligned with ``fractions`` (None
+        when there are no grades), or None if the query failed.
+        """
+        where_clause, params = _filters(test, year)
+        rows = db.execute_query(f"""
+            SELECT COUNT(grade) as count, percentile_cont(%s::float8[]) WITHIN GROUP (ORDER BY grade) as values
+            FROM student_grades
+            {where_clause};
+        """, [list(fractions)] + params)
+        if rows is None:
+            return None
+
+        values = rows[0]["values"] or [None] * len(fractions)
+        return {"count": rows[0]["count"], "values": values}
@@ -0,0 +1,309 @@
+"""
+Bulk import of student grades from CSV exports of instructor spreadsheets
+"""
+import csv
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import BinaryIO, FrozenSet, List, Optional, Tuple
+
+import psycopg2
+
+IMPORT_COLUMNS = ("aem", "test", "grade", "year")
+
+# Rows validated per task; small enough to keep in-flight memory low, large
+# enough that process hand-off costs are negligible
+CHUNK_LINES = 10000
+
+# Errors kept in the report; counts stay exact beyond this
+MAX_REPORTED_ERRORS = 1000
+
+# One validation pool for the whole process, started on first use. Workers
+# come from a forkserver rather than fork(), so they never inherit the
+# server's threads, locks or open database connections.
+POOL_WORKERS = os.cpu_count() or 1
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _validation_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=POOL_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return _pool
+
+
+@dataclass
+class ImportReport:
+    """Outcome of validating (and possibly loading) one uploaded file"""
+    rows: int = 0
+    valid: int = 0
+    invalid: int = 0
+    inserted: int = 0
+    updated: int = 0
+    groups: List[Tuple[str, int]] = field(default_factory=list)
+    errors: List[dict] = field(default_factory=list)
+    header_error: Optional[str] = None
+
+    @property
+    def errors_truncated(self) -> bool:
+        return self.invalid > len(self.errors)
+
+
+def _parse_header(line: bytes) -> Tuple[str, dict]:
+    """Detect the delimiter and map column names to positions.
+
+    Spreadsheets saved as CSV in locales with a decimal comma use ';' (or
+    tabs) as the delimiter, so the header decides which one is in use.
+    """
+    text = line.decode("utf-8-sig").strip()
+    delimiter = max((";", "\t", ","), key=text.count)
+    names = [name.strip().strip('"').lower() for name in text.split(delimiter)]
+    return delimiter, {name: i for i, name in enumerate(names)}
+
+
+def _validate_chunk(args) -> Tuple[str, List[dict], int]:
+    """Validate one chunk of lines; returns (valid rows as CSV, errors, row count).
+
+    Valid rows are written as ``line,aem,test,grade,year`` ready for COPY.
+    Runs in a worker process, so it only touches its arguments.
+    """
+    first_line, lines, delimiter, columns, known_tests = args
+    decimal_comma = delimiter != ","
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    errors = []
+    rows = 0
+
+    for line_number, raw in enumerate(lines, start=first_line):
+        if not raw.strip():
+            continue
+        rows += 1
+        problems = []
+
+        try:
+            fields = next(csv.reader([raw.decode("utf-8").rstrip("\r\n")], delimiter=delimiter))
+        except (UnicodeDecodeError, csv.Error) as e:
+            errors.append({"line": line_number, "errors": [f"Unreadable row: {e}"]})
+            continue
+
+        # Spreadsheets often export trailing rows of empty cells
+        if not any(value.strip() for value in fields):
+            rows -= 1
+            continue
+
+        values = {}
+        for name in IMPORT_COLUMNS:
+            position = columns[name]
+            values[name] = fields[position].strip() if position < len(fields) else ""
+
+        try:
+            aem = int(values["aem"])
+            if aem <= 0:
+                problems.append("aem must be a positive integer")
+        except ValueError:
+            problems.append(f"aem '{values['aem']}' is not an integer")
+
+        test = values["test"]
+        if not test:
+            problems.append("test is required")
+        elif len(test) > 50:
+            problems.append("test must be at most 50 characters")
+        elif known_tests is not None and test not in known_tests:
+            problems.append(f"unknown test '{test}'")
+
+        grade_text = values["grade"].replace(",", ".") if decimal_comma else values["grade"]
+        try:
+            grade = float(grade_text)
+            if not 0 <= grade <= 10:
+                problems.append("grade must be between 0 and 10")
+            elif round(grade, 2) != grade:
+                problems.append("grade must have at most two decimals")
+        except ValueError:
+            problems.append(f"grade '{values['grade']}' is not a number")
+
+        try:
+            year = int(values["year"])
+        except ValueError:
+            problems.append(f"year '{values['year']}' is not an integer")
+
+        if problems:
+            errors.append({"line": line_number, "errors": problems})
+        else:
+            writer.writerow((line_number, aem, test, grade_text, year))
+
+    return out.getvalue(), errors, rows
+
+
+def _chunks(source: BinaryIO, first_line: int, delimiter, columns, known_tests):
+    """Yield validation tasks of CHUNK_LINES lines each"""
+    line_number = first_line
+    while True:
+        lines = list(islice(source, CHUNK_LINES))
+        if not lines:
+            return
+        yield line_number, lines, delimiter, columns, known_tests
+        line_number += len(lines)
+
+
+class GradeImport:
+    """Class to validate uploaded grade files and bulk-load them through COPY"""
+
+    @staticmethod
+    def known_tests(db) -> Optional[FrozenSet[str]]:
+        """Tests that already exist in student_grades"""
+        rows = db.execute_query("SELECT DISTINCT test FROM student_grades;")
+        return None if rows is None else frozenset(row["test"] for row in rows)
+
+    @staticmethod
+    def validate_file(source: BinaryIO, valid_out, known_tests=None, max_workers=None) -> ImportReport:
+        """Validate a CSV file, writing valid rows to ``valid_out`` for load().
+
+        ``source`` is read line by line; chunks are validated on the shared
+        process pool with at most twice ``max_workers`` (default: the pool
+        size) chunks in flight, so memory does not grow with the file.
+        ``max_workers`` of 1 validates in the calling thread. ``known_tests``
+        of None accepts any test name.
+        """
+        report = ImportReport()
+
+        header = source.readline()
+        try:
+            delimiter, columns = _parse_header(header)
+        except UnicodeDecodeError:
+            report.header_error = "Header is not valid UTF-8"
+            return report
+
+        missing = [name for name in IMPORT_COLUMNS if name not in columns]
+        if missing:
+            report.header_error = f"Header is missing columns: {', '.join(missing)}"
+            return report
+
+        tasks = _chunks(source, 2, delimiter, columns, known_tests)
+
+        if max_workers == 1:
+            for task in tasks:
+                GradeImport._collect(_validate_chunk(task), valid_out, report)
+            return report
+
+        executor = _validation_pool()
+        in_flight = 2 * (max_workers or POOL_WORKERS)
+        pending = []
+        try:
+            for task in tasks:
+                pending.append(executor.submit(_validate_chunk, task))
+                if len(pending) >= in_flight:
+                    GradeImport._collect(pending.pop(0).result(), valid_out, report)
+            for future in pending:
+                GradeImport._collect(future.result(), valid_out, report)
+        finally:
+            for future in pending:
+                future.cancel()
+
+        return report
+
+    @staticmethod
+    def shutdown():
+        """Stop the validation pool; the next import starts a new one"""
+        global _pool
+        with _pool_lock:
+            if _pool is not None:
+                _pool.shutdown(cancel_futures=True)
+                _pool = None
+
+    @staticmethod
+    def _collect(result, valid_out, report: ImportReport):
+        valid_csv, errors, rows = result
+        valid_out.write(valid_csv.encode("utf-8"))
+        report.rows += rows
+        report.invalid += len(errors)
+        report.valid += rows - len(errors)
+        room = MAX_REPORTED_ERRORS - len(report.errors)
+        if room > 0:
+            report.errors.extend(errors[:room])
+
+    @staticmethod
+    def load(db, valid_in: BinaryIO, report: ImportReport):
+        """COPY validated rows into a staging table and upsert them in one transaction.
+
+        When a key appears more than once in the file the last row wins.
+        Fills in ``report.inserted``, ``report.updated`` and the (test,
+        year) ``report.groups`` loaded into; returns True on success.
+        """
+        try:
+            db.cursor.execute("""
+                CREATE TEMP TABLE grade_import_staging (
+                    line INTEGER,
+                    aem INTEGER,
+                    test VARCHAR(50),
+                    grade DECIMAL(4, 2),
+                    year INTEGER
+                ) ON COMMIT DROP;
+            """)
+            db.cursor.copy_expert(
+                "COPY grade_import_staging (line, aem, test, grade, year) FROM STDIN WITH (FORMAT csv)",
+                valid_in
+            )
+            db.cursor.execute("""
+                WITH upserted AS (
+                    INSERT INTO student_grades (aem, test, grade, year)
+                    SELECT DISTINCT ON (aem, test, year) aem, test, grade, year
+                    FROM grade_import_staging
+                    ORDER BY aem, test, year, line DESC
+                    ON CONFLICT (aem, test, year) DO UPDATE SET
+                        grade = EXCLUDED.grade,
+                        updated_at = CURRENT_TIMESTAMP
+                    RETURNING (created_at = updated_at) as inserted
+                )
+                SELECT
+                    COUNT(*) FILTER (WHERE inserted) as inserted,
+                    COUNT(*) FILTER (WHERE NOT inserted) as updated
+                FROM upserted;
+            """)
+            counts = db.cursor.fetchone()
+            db.cursor.execute("SELECT DISTINCT test, year FROM grade_import_staging ORDER BY test, year;")
+            groups = [(row["test"], row["year"]) for row in db.cursor.fetchall()]
+            db.connection.commit()
+            report.inserted = counts["inserted"]
+            report.updated = counts["updated"]
+            report.groups = groups
+            return True
+        except psycopg2.Error as e:
+            print(f"❌ Error loading grades: {e}")
+            db.connection.rollback()
+            return False
+
+    @staticmethod
+    def import_file(db, source: BinaryIO, allow_new_tests=False, dry_run=False, max_workers=None) -> ImportReport:
+        """Validate a CSV file and load its valid rows; returns the report.
+
+        Raises RuntimeError if the known tests cannot be read or the load
+        fails.
+        """
+        known_tests = None
+        if not allow_new_tests:
+            known_tests = GradeImport.known_tests(db)
+            if known_tests is None:
+                raise RuntimeError("Failed to read the known tests")
+
+        with tempfile.TemporaryFile() as valid_rows:
+            report = GradeImport.validate_file(source, valid_rows, known_tests, max_workers)
+
+            if report.header_error or dry_run or report.valid == 0:
+                return report
+
+            valid_rows.seek(0)
+            if not GradeImport.load(db, valid_rows, report):
+                raise RuntimeError("Failed to load the validated rows")
+
+        return report
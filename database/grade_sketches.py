@@ -0,0 +1,441 @@
+"""
+Mergeable per-(test, year) sketches of student_grades for approximate analytics
+"""
+import math
+from typing import List, Optional, Sequence
+
+import psycopg2
+
+from .grade_distributions import _filters
+
+# HyperLogLog precision: 2^12 registers give a relative standard error of
+# 1.04 / sqrt(4096), about 1.6%
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+RELATIVE_STANDARD_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+# Grades are DECIMAL(4, 2) between 0 and 10, so one bucket per hundredth
+# holds every possible value exactly
+BUCKETS_PER_POINT = 100
+MAX_BUCKET = 10 * BUCKETS_PER_POINT
+
+# Serializes register rescans; a rescan finding the lock taken is skipped
+REFRESH_LOCK_KEY = 20450001
+
+
+def _apply_sql(source: str, sign: int) -> str:
+    """Statements that add (sign 1) or remove (sign -1) the rows of a transition table"""
+    return f"""
+        INSERT INTO grade_sketches AS s (test, year, grade_count, grade_sum, grade_sumsq)
+        SELECT test, year, {sign} * COUNT(grade), {sign} * SUM(grade), {sign} * SUM(grade * grade)
+        FROM {source}
+        GROUP BY test, year
+        ORDER BY test, year
+        ON CONFLICT (test, year) DO UPDATE SET
+            grade_count = s.grade_count + EXCLUDED.grade_count,
+            grade_sum = s.grade_sum + EXCLUDED.grade_sum,
+            grade_sumsq = s.grade_sumsq + EXCLUDED.grade_sumsq,
+            updated_at = CURRENT_TIMESTAMP;
+
+        INSERT INTO grade_sketch_buckets AS b (test, year, bucket, grade_count)
+        SELECT test, year, grade_sketch_bucket(grade), {sign} * COUNT(*)
+        FROM {source}
+        WHERE grade IS NOT NULL
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+        ON CONFLICT (test, year, bucket) DO UPDATE SET
+            grade_count = b.grade_count + EXCLUDED.grade_count;
+    """
+
+
+def _registers_sql(source: str) -> str:
+    """Statement that folds the AEMs of a transition table into the registers"""
+    return f"""
+        INSERT INTO grade_sketch_registers AS r (test, year, register, rho)
+        SELECT test, year, grade_sketch_register(aem), MAX(grade_sketch_rho(aem))
+        FROM {source}
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+        ON CONFLICT (test, year, register) DO UPDATE SET
+            rho = GREATEST(r.rho, EXCLUDED.rho);
+    """
+
+
+def estimate_distinct(registers: Sequence[int]) -> float:
+    """HyperLogLog cardinality estimate from a full list of register values"""
+    alpha = 0.7213 / (1 + 1.079 / REGISTERS)
+    estimate = alpha * REGISTERS * REGISTERS / sum(2.0 ** -rho for rho in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * REGISTERS and zeros:
+        # Linear counting is more accurate while many registers are empty
+        estimate = REGISTERS * math.log(REGISTERS / zeros)
+    return estimate
+
+
+def bucket_percentile(counts: Sequence[int], fraction: float) -> Optional[float]:
+    """percentile_cont over a bucket histogram, interpolating between neighbouring ranks"""
+    total = sum(counts)
+    if total == 0:
+        return None
+
+    position = fraction * (total - 1)
+    lower_rank, upper_rank = math.floor(position), math.ceil(position)
+    values = {}
+    seen = 0
+    for bucket, count in enumerate(counts):
+        if not count:
+            continue
+        for rank in (lower_rank, upper_rank):
+            if seen <= rank < seen + count:
+                values[rank] = bucket / BUCKETS_PER_POINT
+        seen += count
+        if seen > upper_rank:
+            break
+
+    return values[lower_rank] + (position - lower_rank) * (values[upper_rank] - values[lower_rank])
+
+
+def merge_groups(groups: Sequence[dict]) -> dict:
+    """Combine the exact parts of several (test, year) groups"""
+    count = sum(group["grade_count"] for group in groups)
+    grade_sum = sum(group["grade_sum"] for group in groups)
+    grade_sumsq = sum(group["grade_sumsq"] for group in groups)
+    variance = (grade_sumsq - grade_sum * grade_sum / count) / (count - 1) if count > 1 else None
+    return {
+        "count": count,
+        "average": grade_sum / count,
+        "stddev": math.sqrt(variance) if variance is not None else None,
+        "min": min(group["min_bucket"] for group in groups) / BUCKETS_PER_POINT,
+        "max": max(group["max_bucket"] for group in groups) / BUCKETS_PER_POINT,
+        "pass_count": int(sum(group["pass_count"] for group in groups))
+    }
+
+
+class GradeSketches:
+    """Class to handle trigger-maintained sketches of student_grades.
+
+    Every (test, year) keeps exact count, sum and sum of squares, a
+    histogram with one bucket per possible grade, and HyperLogLog registers
+    over the AEMs. All of them merge across groups (sums add, registers
+    take the maximum), so any combination of tests and years is answered
+    without touching student_grades. Statement-level triggers fold each
+    write in as one aggregated delta.
+
+    HyperLogLog cannot forget an AEM, so deletes and key changes add the
+    rows removed from a group to its ``stale_rows``. Reads never rescan:
+    they widen the error bound by the stale rows (each removes at most
+    one AEM), and refresh_stale(), run after batches of writes, rescans
+    the registers of those groups.
+    """
+
+    TABLES_SQL = """
+    CREATE TABLE IF NOT EXISTS grade_sketches (
+        test VARCHAR(50) NOT NULL,
+        year INTEGER NOT NULL,
+        grade_count BIGINT NOT NULL,
+        grade_sum NUMERIC NOT NULL,
+        grade_sumsq NUMERIC NOT NULL,
+        stale_rows BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (test, year)
+    );
+
+    CREATE TABLE IF NOT EXISTS grade_sketch_buckets (
+        test VARCHAR(50) NOT NULL,
+        year INTEGER NOT NULL,
+        bucket SMALLINT NOT NULL,
+        grade_count BIGINT NOT NULL,
+        PRIMARY KEY (test, year, bucket)
+    );
+
+    CREATE TABLE IF NOT EXISTS grade_sketch_registers (
+        test VARCHAR(50) NOT NULL,
+        year INTEGER NOT NULL,
+        register SMALLINT NOT NULL,
+        rho SMALLINT NOT NULL,
+        PRIMARY KEY (test, year, register)
+    );
+    """
+
+    FUNCTIONS_SQL = f"""
+    CREATE OR REPLACE FUNCTION grade_sketch_bucket(grade NUMERIC) RETURNS SMALLINT AS $$
+        SELECT LEAST(GREATEST(ROUND(grade * {BUCKETS_PER_POINT}), 0), {MAX_BUCKET})::smallint;
+    $$ LANGUAGE sql IMMUTABLE;
+
+    -- The low {PRECISION} bits of a 64-bit hash pick the register, the
+    -- position of the lowest set bit among the rest is its rank
+    CREATE OR REPLACE FUNCTION grade_sketch_register(aem INTEGER) RETURNS SMALLINT AS $$
+        SELECT (hashint4extended(aem, 0) & {REGISTERS - 1})::smallint;
+    $$ LANGUAGE sql IMMUTABLE;
+
+    CREATE OR REPLACE FUNCTION grade_sketch_rho(aem INTEGER) RETURNS SMALLINT AS $$
+        SELECT (LEAST(bit_count(((rest & -rest) - 1)::bit(64)), {64 - PRECISION}) + 1)::smallint
+        FROM (SELECT (hashint4extended(aem, 0) >> {PRECISION})
+                     & ((1::bigint << {64 - PRECISION}) - 1) as rest) hashed;
+    $$ LANGUAGE sql IMMUTABLE;
+
+    CREATE OR REPLACE FUNCTION grade_sketches_insert() RETURNS trigger AS $$
+    BEGIN
+        IF current_setting('rail_db.skip_aggregates', true) = 'on' THEN
+            RETURN NULL;
+        END IF;
+        {_apply_sql("new_rows", 1)}
+        {_registers_sql("new_rows")}
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION grade_sketches_delete() RETURNS trigger AS $$
+    BEGIN
+        IF current_setting('rail_db.skip_aggregates', true) = 'on' THEN
+            RETURN NULL;
+        END IF;
+        {_apply_sql("old_rows", -1)}
+        UPDATE grade_sketches s SET stale_rows = s.stale_rows + removed.count
+        FROM (SELECT test, year, COUNT(*) as count FROM old_rows GROUP BY test, year) removed
+        WHERE s.test = removed.test AND s.year = removed.year;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION grade_sketches_update() RETURNS trigger AS $$
+    BEGIN
+        IF current_setting('rail_db.skip_aggregates', true) = 'on' THEN
+            RETURN NULL;
+        END IF;
+        {_apply_sql("old_rows", -1)}
+        {_apply_sql("new_rows", 1)}
+        {_registers_sql("new_rows")}
+        -- Only a changed key can take an AEM out of a group
+        UPDATE grade_sketches s SET stale_rows = s.stale_rows + removed.count
+        FROM (
+            SELECT test, year, COUNT(*) as count FROM (
+                SELECT aem, test, year FROM old_rows
+                EXCEPT
+                SELECT aem, test, year FROM new_rows
+            ) changed
+            GROUP BY test, year
+        ) removed
+        WHERE s.test = removed.test AND s.year = removed.year;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION grade_sketches_truncate() RETURNS trigger AS $$
+    BEGIN
+        TRUNCATE grade_sketches, grade_sketch_buckets, grade_sketch_registers;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+
+    TRIGGER_NAMES = (
+        "grade_sketches_insert",
+        "grade_sketches_update",
+        "grade_sketches_delete",
+        "grade_sketches_truncate"
+    )
+
+    TRIGGERS_SQL = """
+    DROP TRIGGER IF EXISTS grade_sketches_insert ON student_grades;
+    CREATE TRIGGER grade_sketches_insert
+        AFTER INSERT ON student_grades
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION grade_sketches_insert();
+
+    DROP TRIGGER IF EXISTS grade_sketches_update ON student_grades;
+    CREATE TRIGGER grade_sketches_update
+        AFTER UPDATE ON student_grades
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION grade_sketches_update();
+
+    DROP TRIGGER IF EXISTS grade_sketches_delete ON student_grades;
+    CREATE TRIGGER grade_sketches_delete
+        AFTER DELETE ON student_grades
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION grade_sketches_delete();
+
+    DROP TRIGGER IF EXISTS grade_sketches_truncate ON student_grades;
+    CREATE TRIGGER grade_sketches_truncate
+        AFTER TRUNCATE ON student_grades
+        FOR EACH STATEMENT EXECUTE FUNCTION grade_sketches_truncate();
+    """
+
+    @staticmethod
+    def create_tables(db):
+        """Create the sketch tables and their triggers, building them on first creation"""
+        existed = db.execute_query("SELECT to_regclass('grade_sketches') IS NOT NULL as existed;")
+        if existed is None:
+            return False
+
+        if not (
+            db.execute_command(GradeSketches.TABLES_SQL)
+            and db.execute_command(GradeSketches.FUNCTIONS_SQL)
+            and db.execute_command(GradeSketches.TRIGGERS_SQL)
+        ):
+            return False
+
+        if not existed[0]["existed"]:
+            return GradeSketches.rebuild(db)
+        return True
+
+    @staticmethod
+    def rebuild(db):
+        """Recompute every sketch from student_grades in one transaction"""
+        return db.execute_command("""
+            LOCK TABLE student_grades IN SHARE MODE;
+            TRUNCATE grade_sketches, grade_sketch_buckets, grade_sketch_registers;
+
+            INSERT INTO grade_sketches (test, year, grade_count, grade_sum, grade_sumsq)
+            SELECT test, year, COUNT(grade), SUM(grade), SUM(grade * grade)
+            FROM student_grades
+            GROUP BY test, year;
+
+            INSERT INTO grade_sketch_buckets (test, year, bucket, grade_count)
+            SELECT test, year, grade_sketch_bucket(grade), COUNT(*)
+            FROM student_grades
+            WHERE grade IS NOT NULL
+            GROUP BY 1, 2, 3;
+
+            INSERT INTO grade_sketch_registers (test, year, register, rho)
+            SELECT test, year, grade_sketch_register(aem), MAX(grade_sketch_rho(aem))
+            FROM student_grades
+            GROUP BY 1, 2, 3;
+        """)
+
+    @staticmethod
+    def refresh_stale(db):
+        """Rescan the registers of groups with stale rows.
+
+        A maintenance step for after writes, not for reads. Takes no table
+        lock: inserts racing the rescan merge into the rebuilt registers,
+        and only the stale rows seen at the start are cleared, so removals
+        racing it stay counted. Returns True on success, also when another
+        rescan is already running.
+        """
+        cursor = db.cursor
+        try:
+            cursor.execute("SELECT pg_try_advisory_xact_lock(%s) as locked;", (REFRESH_LOCK_KEY,))
+            if not cursor.fetchone()["locked"]:
+                db.connection.rollback()
+                return True
+
+            cursor.execute("SELECT test, year, stale_rows FROM grade_sketches WHERE stale_rows > 0;")
+            stale = cursor.fetchall()
+            if not stale:
+                db.connection.commit()
+                return True
+
+            params = (
+                [row["test"] for row in stale],
+                [row["year"] for row in stale],
+                [row["stale_rows"] for row in stale]
+            )
+            target = "unnest(%s::varchar[], %s::int[], %s::bigint[]) as t(test, year, stale_rows)"
+            cursor.execute(f"""
+                DELETE FROM grade_sketch_registers r
+                USING {target}
+                WHERE r.test = t.test AND r.year = t.year;
+            """, params)
+            cursor.execute(f"""
+                INSERT INTO grade_sketch_registers AS r (test, year, register, rho)
+                SELECT g.test, g.year, grade_sketch_register(g.aem), MAX(grade_sketch_rho(g.aem))
+                FROM student_grades g
+                JOIN {target} ON g.test = t.test AND g.year = t.year
+                GROUP BY 1, 2, 3
+                ON CONFLICT (test, year, register) DO UPDATE SET
+                    rho = GREATEST(r.rho, EXCLUDED.rho);
+            """, params)
+            cursor.execute(f"""
+                UPDATE grade_sketches s SET stale_rows = s.stale_rows - t.stale_rows
+                FROM {target}
+                WHERE s.test = t.test AND s.year = t.year;
+            """, params)
+            cursor.execute("""
+                DELETE FROM grade_sketches WHERE grade_count = 0 AND stale_rows = 0;
+                DELETE FROM grade_sketch_buckets WHERE grade_count = 0;
+            """)
+            db.connection.commit()
+            return True
+
+        except psycopg2.Error as e:
+            print(f"❌ Error refreshing grade sketches: {e}")
+            db.connection.rollback()
+            return False
+
+    @staticmethod
+    def groups(db, pass_threshold=5.0, test=None, year=None) -> Optional[List[dict]]:
+        """Exact count, sum, sum of squares, min, max and passing count per (test, year)"""
+        where_clause, params = _filters(test, year, alias="s")
+        return db.execute_query(f"""
+            SELECT
+                s.test, s.year, s.grade_count, s.grade_sum, s.grade_sumsq,
+                MIN(b.bucket) FILTER (WHERE b.grade_count > 0) as min_bucket,
+                MAX(b.bucket) FILTER (WHERE b.grade_count > 0) as max_bucket,
+                COALESCE(SUM(b.grade_count) FILTER (WHERE b.bucket >= grade_sketch_bucket(%s)), 0) as pass_count
+            FROM grade_sketches s
+            JOIN grade_sketch_buckets b ON b.test = s.test AND b.year = s.year
+            {where_clause}
+            GROUP BY s.test, s.year
+            HAVING s.grade_count > 0
+            ORDER BY s.test, s.year;
+        """, [pass_threshold] + params)
+
+    @staticmethod
+    def histogram(db, test=None, year=None) -> Optional[List[int]]:
+        """Merged counts per bucket (index = grade * 100) over the selected groups"""
+        where_clause, params = _filters(test, year)
+        rows = db.execute_query(f"""
+            SELECT bucket, SUM(grade_count) as grade_count
+            FROM grade_sketch_buckets
+            {where_clause}
+            GROUP BY bucket;
+        """, params)
+        if rows is None:
+            return None
+
+        counts = [0] * (MAX_BUCKET + 1)
+        for row in rows:
+            counts[row["bucket"]] = int(row["grade_count"])
+        return counts
+
+    @staticmethod
+    def distinct_students(db, by=None, test=None, year=None) -> Optional[dict]:
+        """Estimated distinct AEMs, merged over the selected groups.
+
+        With ``by`` set to "test" or "year" there is one entry per value of
+        that column, otherwise a single entry under the key None. Each
+        entry is ``(estimate, stale_rows)``: the estimate may count up to
+        ``stale_rows`` AEMs that have since been removed. Returns None if
+        the sketches could not be read.
+        """
+        where_clause, params = _filters(test, year)
+        key = {"test": "test", "year": "year", None: "NULL"}[by]
+        rows = db.execute_query(f"""
+            SELECT {key} as key, register, MAX(rho) as rho
+            FROM grade_sketch_registers
+            {where_clause}
+            GROUP BY 1, 2;
+        """, params)
+        stale = db.execute_query(f"""
+            SELECT {key} as key, SUM(stale_rows) as stale_rows
+            FROM grade_sketches
+            {where_clause}
+            GROUP BY 1;
+        """, params)
+        if rows is None or stale is None:
+            return None
+
+        stale_rows = {row["key"]: int(row["stale_rows"]) for row in stale}
+        registers = {}
+        for row in rows:
+            registers.setdefault(row["key"], [0] * REGISTERS)[row["register"]] = row["rho"]
+        return {k: (estimate_distinct(values), stale_rows.get(k, 0)) for k, values in registers.items()}
+
+    @staticmethod
+    def error_bound(estimate: float, stale_rows: int = 0) -> int:
+        """About 95% (two standard errors) absolute bound on a distinct estimate.
+
+        Widened by the rows removed since the registers were last rescanned.
+        """
+        return math.ceil(2 * RELATIVE_STANDARD_ERROR * estimate) + stale_rows
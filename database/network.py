@@ -0,0 +1,115 @@
+"""
+Rail network graph storage (stations, segments and bridges)
+"""
+
+
+class RailNetwork:
+    """Class to handle the rail network graph stored in PostgreSQL"""
+
+    ELEMENT_TYPES = ("segment", "bridge")
+
+    @staticmethod
+    def create_tables(db):
+        """Create the stations and network elements tables"""
+        create_stations = """
+        CREATE TABLE IF NOT EXISTS rail_stations (
+            id SERIAL PRIMARY KEY,
+            code VARCHAR(20) UNIQUE NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            latitude DECIMAL(9, 6),
+            longitude DECIMAL(9, 6),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+
+        # Each element is an undirected edge between two stations carrying
+        # its own lognormal fragility parameters
+        create_elements = """
+        CREATE TABLE IF NOT EXISTS rail_elements (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            element_type VARCHAR(20) NOT NULL CHECK (element_type IN ('segment', 'bridge')),
+            from_station INTEGER NOT NULL REFERENCES rail_stations(id) ON DELETE CASCADE,
+            to_station INTEGER NOT NULL REFERENCES rail_stations(id) ON DELETE CASCADE,
+            pga_mean DECIMAL(8, 4) NOT NULL CHECK (pga_mean > 0),
+            beta DECIMAL(8, 4) NOT NULL CHECK (beta > 0),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+
+        return (
+            db.execute_command(create_stations)
+            and db.execute_command(create_elements)
+        )
+
+    @staticmethod
+    def get_stations(db):
+        """Return all stations ordered by id"""
+        return db.execute_query("""
+            SELECT id, code, name, latitude, longitude
+            FROM rail_stations
+            ORDER BY id;
+        """)
+
+    @staticmethod
+    def get_elements(db):
+        """Return all network elements ordered by id"""
+        return db.execute_query("""
+            SELECT id, name, element_type, from_station, to_station, pga_mean, beta
+            FROM rail_elements
+            ORDER BY id;
+        """)
+
+    @staticmethod
+    def load_graph(db):
+        """Load the network as index arrays ready for connectivity analysis.
+
+        Returns a dict with the station id -> node index mapping, the edge
+        endpoints as node indices and the element fragility parameters, or
+        None if the tables could not be read.
+        """
+        stations = RailNetwork.get_stations(db)
+        elements = RailNetwork.get_elements(db)
+
+        if stations is None or elements is None:
+            return None
+
+        node_index = {station["id"]: i for i, station in enumerate(stations)}
+
+        return {
+            "stations": stations,
+            "elements": elements,
+            "node_index": node_index,
+            "edge_from": [node_index[e["from_station"]] for e in elements],
+            "edge_to": [node_index[e["to_station"]] for e in elements],
+            "pga_mean": [float(e["pga_mean"]) for e in elements],
+            "beta": [float(e["beta"]) for e in elements]
+        }
+
+    @staticmethod
+    def add_station(db, code, name, latitude=None, longitude=None):
+        """Insert or update a station and return its id"""
+        result = db.execute_returning("""
+            INSERT INTO rail_stations (code, name, latitude, longitude)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (code) DO UPDATE SET
+                name = EXCLUDED.name,
+                latitude = EXCLUDED.latitude,
+                longitude = EXCLUDED.longitude
+            RETURNING id;
+        """, (code, name, latitude, longitude))
+        return result[0]["id"] if result else None
+
+    @staticmethod
+    def add_element(db, name, element_type, from_station, to_station, pga_mean, beta):
+        """Insert a segment or bridge between two stations and return its id"""
+        if element_type not in RailNetwork.ELEMENT_TYPES:
+            raise ValueError(f"Element type must be one of {', '.join(RailNetwork.ELEMENT_TYPES)}")
+
+        result = db.execute_returning("""
+            INSERT INTO rail_elements (name, element_type, from_station, to_station, pga_mean, beta)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING id;
+        """, (name, element_type, from_station, to_station, pga_mean, beta))
+        return result[0]["id"] if result else None
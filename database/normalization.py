@@ -0,0 +1,127 @@
+"""
+Per-(test, year) z-score normalization of student grades
+"""
+import threading
+from typing import Iterable, Optional, Tuple
+
+# Serializes refreshes, so a slower refresh can never overwrite the scores
+# of a newer one with an older snapshot
+REFRESH_LOCK_KEY = 20470001
+
+GroupKey = Tuple[str, int]
+
+
+class GradeNormalization:
+    """Class to handle the materialized z-scores of student_grades.
+
+    grade_zscore_groups holds the mean and sample standard deviation of
+    every (test, year); grade_zscores holds (grade - mean) / stddev for
+    every grade, NULL where the group has no spread. Both are recomputed
+    per group with set-based statements, only for the groups a write
+    touched. Groups whose refresh failed stay dirty in this process and
+    are retried with the next refresh (see refresh_dirty()).
+    """
+
+    _dirty = set()
+    _dirty_lock = threading.Lock()
+
+    @staticmethod
+    def create_tables(db):
+        """Create the z-score tables, computing them on first creation"""
+        existed = db.execute_query("SELECT to_regclass('grade_zscores') IS NOT NULL as existed;")
+        if existed is None:
+            return False
+
+        if not db.execute_command("""
+            CREATE TABLE IF NOT EXISTS grade_zscore_groups (
+                test VARCHAR(50) NOT NULL,
+                year INTEGER NOT NULL,
+                grade_count INTEGER NOT NULL,
+                mean NUMERIC NOT NULL,
+                stddev NUMERIC,
+                computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (test, year)
+            );
+
+            CREATE TABLE IF NOT EXISTS grade_zscores (
+                aem INTEGER NOT NULL,
+                test VARCHAR(50) NOT NULL,
+                year INTEGER NOT NULL,
+                z_score DOUBLE PRECISION,
+                PRIMARY KEY (aem, test, year)
+            );
+        """):
+            return False
+
+        if not existed[0]["existed"]:
+            return GradeNormalization.refresh(db)
+        return True
+
+    @staticmethod
+    def refresh(db, groups: Optional[Iterable[GroupKey]] = None):
+        """Recompute the statistics and z-scores of ``groups`` ((test, year) pairs), or of all groups.
+
+        Runs as one transaction: scores of grades that no longer exist are
+        deleted, then every score of the groups is upserted by a single
+        INSERT ... SELECT against freshly computed group statistics.
+        Dirty groups are included. Returns True on success; on failure the
+        groups are marked dirty.
+        """
+        with GradeNormalization._dirty_lock:
+            dirty = set(GradeNormalization._dirty)
+
+        if groups is None:
+            target = "SELECT DISTINCT test, year FROM student_grades"
+            params = []
+        else:
+            groups = sorted(set(groups) | dirty)
+            if not groups:
+                return True
+            target = "SELECT * FROM unnest(%s::varchar[], %s::int[]) as t(test, year)"
+            params = [[test for test, _ in groups], [year for _, year in groups]]
+
+        refreshed = db.execute_command(f"""
+            SELECT pg_advisory_xact_lock({REFRESH_LOCK_KEY});
+
+            DELETE FROM grade_zscore_groups z
+            USING ({target}) t
+            WHERE z.test = t.test AND z.year = t.year;
+
+            INSERT INTO grade_zscore_groups (test, year, grade_count, mean, stddev)
+            SELECT g.test, g.year, COUNT(*), AVG(g.grade), STDDEV_SAMP(g.grade)
+            FROM student_grades g
+            JOIN ({target}) t ON g.test = t.test AND g.year = t.year
+            GROUP BY g.test, g.year;
+
+            DELETE FROM grade_zscores z
+            USING ({target}) t
+            WHERE z.test = t.test AND z.year = t.year
+              AND NOT EXISTS (
+                  SELECT 1 FROM student_grades g
+                  WHERE g.aem = z.aem AND g.test = z.test AND g.year = z.year
+              );
+
+            INSERT INTO grade_zscores AS z (aem, test, year, z_score)
+            SELECT g.aem, g.test, g.year, ((g.grade - s.mean) / NULLIF(s.stddev, 0))::double precision
+            FROM student_grades g
+            JOIN grade_zscore_groups s ON s.test = g.test AND s.year = g.year
+            JOIN ({target}) t ON g.test = t.test AND g.year = t.year
+            ON CONFLICT (aem, test, year) DO UPDATE SET z_score = EXCLUDED.z_score;
+        """, params * 4)
+
+        with GradeNormalization._dirty_lock:
+            if refreshed:
+                GradeNormalization._dirty -= dirty if groups is None else set(groups)
+            elif groups is not None:
+                GradeNormalization._dirty |= set(groups)
+        if not refreshed:
+            print(f"⚠️ Z-scores of {len(groups) if groups is not None else 'all'} groups are stale")
+        return refreshed
+
+    @staticmethod
+    def refresh_dirty(db):
+        """Retry the groups whose last refresh failed; True when none are left"""
+        with GradeNormalization._dirty_lock:
+            if not GradeNormalization._dirty:
+                return True
+        return GradeNormalization.refresh(db, ())
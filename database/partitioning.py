@@ -0,0 +1,303 @@
+"""
+Year partitioning of student_grades and precomputed stats for frozen years
+"""
+import datetime
+
+import psycopg2
+
+from .student_aggregates import StudentAggregates
+from .grade_sketches import GradeSketches
+
+DEFAULT_PARTITION = "student_grades_default"
+
+# Classes whose triggers on student_grades keep derived tables in step
+MAINTAINED_BY = (StudentAggregates, GradeSketches)
+
+
+def partition_name(year: int) -> str:
+    return f"student_grades_y{int(year)}"
+
+
+class GradePartitioning:
+    """Class to handle the RANGE (year) partitioning of student_grades.
+
+    Each year lives in its own partition, so filters and GROUP BYs on year
+    prune to the partitions involved. A DEFAULT partition catches years
+    without one; ensure_partitions() moves such rows into a new partition
+    for their year. The (aem, test, year) unique constraint includes the
+    partition key, so the existing upserts keep working unchanged.
+    """
+
+    # Years already known to have a partition in this process
+    _known_years = set()
+
+    # Whether student_grades is partitioned, once checked in this process;
+    # a table migrated by another process is seen after a restart
+    _partitioned = None
+
+    @staticmethod
+    def is_partitioned(db):
+        if GradePartitioning._partitioned is not None:
+            return GradePartitioning._partitioned
+
+        result = db.execute_query("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_partitioned_table
+                WHERE partrelid = to_regclass('student_grades')
+            ) as partitioned;
+        """)
+        if result is None:
+            return False
+        GradePartitioning._partitioned = bool(result[0]["partitioned"])
+        return GradePartitioning._partitioned
+
+    @staticmethod
+    def partition_years(db):
+        """Years that have their own partition, or None if the query failed"""
+        rows = db.execute_query("""
+            SELECT child.relname as name
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass('student_grades');
+        """)
+        if rows is None:
+            return None
+        return sorted(
+            int(row["name"][len("student_grades_y"):])
+            for row in rows if row["name"].startswith("student_grades_y")
+        )
+
+    @staticmethod
+    def migrate(db, keep_old=True):
+        """Convert a plain student_grades table into a year-partitioned one.
+
+        Runs in a single transaction holding an exclusive lock: the table is
+        renamed, a partitioned table with the same columns, defaults, id
+        sequence and triggers takes its name, one partition is created per
+        year present (plus the current and next year and a DEFAULT
+        partition) and the rows are copied over. With ``keep_old`` the
+        original table stays as student_grades_unpartitioned.
+        Returns True on success, also when already partitioned.
+        """
+        GradePartitioning._partitioned = None
+        if GradePartitioning.is_partitioned(db):
+            return True
+
+        current_year = datetime.date.today().year
+        cursor = db.cursor
+
+        try:
+            cursor.execute("LOCK TABLE student_grades IN ACCESS EXCLUSIVE MODE;")
+            cursor.execute("SELECT pg_get_serial_sequence('student_grades', 'id') as sequence;")
+            sequence = cursor.fetchone()["sequence"]
+            cursor.execute("SELECT DISTINCT year FROM student_grades;")
+            years = {row["year"] for row in cursor.fetchall()} | {current_year, current_year + 1}
+
+            cursor.execute("ALTER TABLE student_grades RENAME TO student_grades_unpartitioned;")
+
+            # Free the constraint (and index) names for the new table
+            cursor.execute("""
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = 'student_grades_unpartitioned'::regclass
+                  AND contype IN ('p', 'u');
+            """)
+            for row in cursor.fetchall():
+                if not row["conname"].startswith("student_grades_"):
+                    continue
+                renamed = "student_grades_unpartitioned_" + row["conname"][len("student_grades_"):]
+                cursor.execute(
+                    f'ALTER TABLE student_grades_unpartitioned RENAME CONSTRAINT "{row["conname"]}" TO "{renamed}";'
+                )
+            cursor.execute("""
+                CREATE TABLE student_grades (
+                    LIKE student_grades_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+                ) PARTITION BY RANGE (year);
+            """)
+            cursor.execute("""
+                ALTER TABLE student_grades
+                    ADD PRIMARY KEY (id, year),
+                    ADD UNIQUE (aem, test, year);
+            """)
+            if sequence:
+                # The id sequence must outlive the old table
+                cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY student_grades.id;")
+
+            for year in sorted(years):
+                cursor.execute(f"""
+                    CREATE TABLE {partition_name(year)} PARTITION OF student_grades
+                        FOR VALUES FROM ({int(year)}) TO ({int(year) + 1});
+                """)
+            cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF student_grades DEFAULT;")
+
+            # Rows are copied before the maintenance triggers exist on the
+            # new table, so the derived tables are left untouched
+            cursor.execute("INSERT INTO student_grades SELECT * FROM student_grades_unpartitioned;")
+            # Move the maintenance triggers that were installed to the new table
+            cursor.execute("""
+                SELECT tgname FROM pg_trigger
+                WHERE tgrelid = 'student_grades_unpartitioned'::regclass AND NOT tgisinternal;
+            """)
+            installed = {row["tgname"] for row in cursor.fetchall()}
+            for maintained in MAINTAINED_BY:
+                if installed & set(maintained.TRIGGER_NAMES):
+                    for trigger in maintained.TRIGGER_NAMES:
+                        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger} ON student_grades_unpartitioned;")
+                    cursor.execute(maintained.TRIGGERS_SQL)
+
+            if not keep_old:
+                cursor.execute("DROP TABLE student_grades_unpartitioned;")
+
+            db.connection.commit()
+            GradePartitioning._known_years = set(years)
+            GradePartitioning._partitioned = True
+            return True
+
+        except psycopg2.Error as e:
+            print(f"❌ Error partitioning student_grades: {e}")
+            db.connection.rollback()
+            return False
+
+    @staticmethod
+    def ensure_partitions(db, years=()):
+        """Give every year in ``years`` and in the DEFAULT partition its own partition.
+
+        Rows that already landed in the DEFAULT partition are moved into
+        the new partition in the same transaction. A no-op for years known
+        to be partitioned and for a table that is not partitioned. Returns
+        True on success.
+        """
+        missing = {int(year) for year in years} - GradePartitioning._known_years
+        if not missing and years:
+            return True
+
+        if not GradePartitioning.is_partitioned(db):
+            return True
+
+        existing = GradePartitioning.partition_years(db)
+        stray = db.execute_query(f"SELECT DISTINCT year FROM {DEFAULT_PARTITION};")
+        if existing is None or stray is None:
+            return False
+
+        GradePartitioning._known_years.update(existing)
+        missing = (missing | {row["year"] for row in stray}) - set(existing)
+
+        for year in sorted(missing):
+            name = partition_name(year)
+            try:
+                # Moving rows between partitions must not count them twice
+                db.cursor.execute("SET LOCAL rail_db.skip_aggregates = 'on';")
+                db.cursor.execute(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE;")
+                db.cursor.execute(f"CREATE TABLE {name} (LIKE student_grades INCLUDING DEFAULTS INCLUDING CONSTRAINTS);")
+                db.cursor.execute(f"""
+                    WITH moved AS (
+                        DELETE FROM {DEFAULT_PARTITION} WHERE year = %s RETURNING *
+                    )
+                    INSERT INTO {name} SELECT * FROM moved;
+                """, (year,))
+                db.cursor.execute(f"""
+                    ALTER TABLE student_grades ATTACH PARTITION {name}
+                        FOR VALUES FROM ({year}) TO ({year + 1});
+                """)
+                db.connection.commit()
+                GradePartitioning._known_years.add(year)
+            except psycopg2.Error as e:
+                # Another process may have created it first
+                print(f"❌ Error creating partition {name}: {e}")
+                db.connection.rollback()
+                if year not in (GradePartitioning.partition_years(db) or []):
+                    return False
+                GradePartitioning._known_years.add(year)
+
+        return True
+
+    @staticmethod
+    def create_tables(db):
+        """Create the frozen-year stats table"""
+        return db.execute_command("""
+            CREATE TABLE IF NOT EXISTS frozen_year_stats (
+                year INTEGER PRIMARY KEY,
+                total_records INTEGER NOT NULL,
+                unique_students INTEGER NOT NULL,
+                average_grade NUMERIC NOT NULL,
+                frozen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            -- Any write to a frozen year drops its stats so they are recomputed
+            CREATE OR REPLACE FUNCTION frozen_year_stats_invalidate() RETURNS trigger AS $$
+            BEGIN
+                DELETE FROM frozen_year_stats WHERE year = TG_ARGV[0]::integer;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+
+    @staticmethod
+    def freeze_year(db, year):
+        """Precompute the yearly stats of a closed year.
+
+        The stats are dropped again by a trigger on the year's partition as
+        soon as any of its rows changes. Returns True on success.
+        """
+        year = int(year)
+        if not GradePartitioning.ensure_partitions(db, [year]):
+            return False
+
+        name = partition_name(year)
+        return db.execute_command(f"""
+            INSERT INTO frozen_year_stats (year, total_records, unique_students, average_grade)
+            SELECT %s, COUNT(*), COUNT(DISTINCT aem), COALESCE(AVG(grade), 0)
+            FROM {name}
+            ON CONFLICT (year) DO UPDATE SET
+                total_records = EXCLUDED.total_records,
+                unique_students = EXCLUDED.unique_students,
+                average_grade = EXCLUDED.average_grade,
+                frozen_at = CURRENT_TIMESTAMP;
+
+            DROP TRIGGER IF EXISTS frozen_year_stats_invalidate ON {name};
+            CREATE TRIGGER frozen_year_stats_invalidate
+                AFTER INSERT OR UPDATE OR DELETE ON {name}
+                FOR EACH ROW EXECUTE FUNCTION frozen_year_stats_invalidate({year});
+
+            DROP TRIGGER IF EXISTS frozen_year_stats_truncate ON {name};
+            CREATE TRIGGER frozen_year_stats_truncate
+                AFTER TRUNCATE ON {name}
+                FOR EACH STATEMENT EXECUTE FUNCTION frozen_year_stats_invalidate({year});
+        """, (year,))
+
+    @staticmethod
+    def yearly_stats(db):
+        """Per-year record count, unique students and average grade.
+
+        Frozen years are read from frozen_year_stats; only the remaining
+        years are aggregated, and with partitioning only their partitions
+        are scanned. Without frozen_year_stats (e.g. create_tables failed)
+        every year is aggregated live.
+        """
+        results = db.execute_query("""
+            SELECT year, total_records, unique_students, ROUND(average_grade, 2) as average_grade
+            FROM frozen_year_stats
+            UNION ALL
+            SELECT
+                year,
+                COUNT(*) as total_records,
+                COUNT(DISTINCT aem) as unique_students,
+                ROUND(AVG(grade), 2) as average_grade
+            FROM student_grades
+            WHERE year NOT IN (SELECT year FROM frozen_year_stats)
+            GROUP BY year
+            ORDER BY year DESC;
+        """)
+        if results is not None:
+            return results
+
+        db.connection.rollback()
+        return db.execute_query("""
+            SELECT
+                year,
+                COUNT(*) as total_records,
+                COUNT(DISTINCT aem) as unique_students,
+                ROUND(AVG(grade), 2) as average_grade
+            FROM student_grades
+            GROUP BY year
+            ORDER BY year DESC;
+        """)
@@ -0,0 +1,204 @@
+"""
+Per-student grade aggregates maintained by triggers on student_grades
+"""
+
+
+class StudentAggregates:
+    """Class to handle the trigger-maintained student_aggregates table.
+
+    Every insert, update, delete and truncate on student_grades adjusts
+    the touched student's row in the same transaction, so readers never
+    see aggregates that disagree with committed grades. Sums are NUMERIC
+    and therefore exact; min and max are recomputed for the student only
+    when the removed grade was one of the extremes.
+    """
+
+    FUNCTIONS_SQL = """
+    CREATE OR REPLACE FUNCTION student_aggregates_apply() RETURNS trigger AS $$
+    BEGIN
+        -- Set for the transaction by maintenance code that moves rows
+        -- without changing them (partition splits)
+        IF current_setting('rail_db.skip_aggregates', true) = 'on' THEN
+            RETURN NULL;
+        END IF;
+
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.grade IS NOT NULL THEN
+            -- The last grade removes the row, before the average index
+            -- would ever see a zero count
+            DELETE FROM student_aggregates WHERE aem = OLD.aem AND grade_count <= 1;
+
+            UPDATE student_aggregates SET
+                grade_count = grade_count - 1,
+                grade_sum = grade_sum - OLD.grade,
+                grade_sumsq = grade_sumsq - OLD.grade * OLD.grade,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE aem = OLD.aem;
+
+            -- Extremes cannot be decremented, so rescan this student's
+            -- grades only when the removed grade was one of them. Row
+            -- triggers fire after the whole statement, so the rescan may
+            -- already find no grades; the row is then deleted by the
+            -- student's last pending trigger and keeps its values until then
+            UPDATE student_aggregates a SET
+                min_grade = COALESCE(s.min_grade, a.min_grade),
+                max_grade = COALESCE(s.max_grade, a.max_grade)
+            FROM (
+                SELECT MIN(grade) as min_grade, MAX(grade) as max_grade
+                FROM student_grades
+                WHERE aem = OLD.aem
+            ) s
+            WHERE a.aem = OLD.aem
+              AND (OLD.grade <= a.min_grade OR OLD.grade >= a.max_grade);
+        END IF;
+
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.grade IS NOT NULL THEN
+            INSERT INTO student_aggregates AS a
+                (aem, grade_count, grade_sum, grade_sumsq, min_grade, max_grade)
+            VALUES (NEW.aem, 1, NEW.grade, NEW.grade * NEW.grade, NEW.grade, NEW.grade)
+            ON CONFLICT (aem) DO UPDATE SET
+                grade_count = a.grade_count + 1,
+                grade_sum = a.grade_sum + EXCLUDED.grade_sum,
+                grade_sumsq = a.grade_sumsq + EXCLUDED.grade_sumsq,
+                min_grade = LEAST(a.min_grade, EXCLUDED.min_grade),
+                max_grade = GREATEST(a.max_grade, EXCLUDED.max_grade),
+                updated_at = CURRENT_TIMESTAMP;
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION student_aggregates_truncate() RETURNS trigger AS $$
+    BEGIN
+        TRUNCATE student_aggregates;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+
+    TRIGGER_NAMES = (
+        "student_aggregates_insert_delete",
+        "student_aggregates_update",
+        "student_aggregates_truncate"
+    )
+
+    TRIGGERS_SQL = """
+    DROP TRIGGER IF EXISTS student_aggregates_insert_delete ON student_grades;
+    CREATE TRIGGER student_aggregates_insert_delete
+        AFTER INSERT OR DELETE ON student_grades
+        FOR EACH ROW EXECUTE FUNCTION student_aggregates_apply();
+
+    DROP TRIGGER IF EXISTS student_aggregates_update ON student_grades;
+    CREATE TRIGGER student_aggregates_update
+        AFTER UPDATE OF aem, grade ON student_grades
+        FOR EACH ROW
+        WHEN (OLD.aem IS DISTINCT FROM NEW.aem OR OLD.grade IS DISTINCT FROM NEW.grade)
+        EXECUTE FUNCTION student_aggregates_apply();
+
+    DROP TRIGGER IF EXISTS student_aggregates_truncate ON student_grades;
+    CREATE TRIGGER student_aggregates_truncate
+        AFTER TRUNCATE ON student_grades
+        FOR EACH STATEMENT EXECUTE FUNCTION student_aggregates_truncate();
+    """
+
+    @staticmethod
+    def create_tables(db):
+        """Create the aggregates table and its triggers, backfilling on first creation"""
+        existed = db.execute_query("SELECT to_regclass('student_aggregates') IS NOT NULL as existed;")
+        if existed is None:
+            return False
+
+        create_table = """
+        CREATE TABLE IF NOT EXISTS student_aggregates (
+            aem INTEGER PRIMARY KEY,
+            grade_count INTEGER NOT NULL,
+            grade_sum NUMERIC NOT NULL,
+            grade_sumsq NUMERIC NOT NULL,
+            min_grade DECIMAL(4, 2) NOT NULL,
+            max_grade DECIMAL(4, 2) NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Serves ORDER BY average DESC with early termination under LIMIT
+        CREATE INDEX IF NOT EXISTS idx_student_aggregates_average
+            ON student_aggregates ((grade_sum / grade_count) DESC, aem);
+        """
+
+        if not (
+            db.execute_command(create_table)
+            and db.execute_command(StudentAggregates.FUNCTIONS_SQL)
+            and db.execute_command(StudentAggregates.TRIGGERS_SQL)
+        ):
+            return False
+
+        if not existed[0]["existed"]:
+            return StudentAggregates.rebuild(db)
+        return True
+
+    @staticmethod
+    def rebuild(db):
+        """Recompute every row from student_grades in one transaction"""
+        return db.execute_command("""
+            LOCK TABLE student_grades IN SHARE MODE;
+            DELETE FROM student_aggregates;
+            INSERT INTO student_aggregates
+                (aem, grade_count, grade_sum, grade_sumsq, min_grade, max_grade)
+            SELECT aem, COUNT(grade), SUM(grade), SUM(grade * grade), MIN(grade), MAX(grade)
+            FROM student_grades
+            WHERE grade IS NOT NULL
+            GROUP BY aem;
+        """)
+
+    @staticmethod
+    def check_consistency(db, repair=False):
+        """Diff the table against aggregates recomputed from scratch.
+
+        Returns the mismatching AEMs with both versions of their values
+        (an empty list when consistent), or None if the check failed. With
+        ``repair``, the table is rebuilt when differences are found.
+        """
+        differences = db.execute_query("""
+            WITH expected AS (
+                SELECT aem, COUNT(grade) as grade_count, SUM(grade) as grade_sum,
+                       SUM(grade * grade) as grade_sumsq, MIN(grade) as min_grade, MAX(grade) as max_grade
+                FROM student_grades
+                WHERE grade IS NOT NULL
+                GROUP BY aem
+            )
+            SELECT
+                COALESCE(e.aem, a.aem) as aem,
+                e.grade_count as expected_count, a.grade_count as actual_count,
+                e.grade_sum as expected_sum, a.grade_sum as actual_sum,
+                e.grade_sumsq as expected_sumsq, a.grade_sumsq as actual_sumsq,
+                e.min_grade as expected_min, a.min_grade as actual_min,
+                e.max_grade as expected_max, a.max_grade as actual_max
+            FROM expected e
+            FULL OUTER JOIN student_aggregates a ON a.aem = e.aem
+            WHERE (e.grade_count, e.grade_sum, e.grade_sumsq, e.min_grade, e.max_grade)
+                IS DISTINCT FROM (a.grade_count, a.grade_sum, a.grade_sumsq, a.min_grade, a.max_grade)
+            ORDER BY 1;
+        """)
+
+        if differences is None:
+            return None
+
+        if differences and repair and not StudentAggregates.rebuild(db):
+            return None
+
+        return differences
+
+    @staticmethod
+    def get_stats(db, min_tests=1, limit=50):
+        """Per-student statistics ordered by average grade"""
+        return db.execute_query("""
+            SELECT
+                aem,
+                grade_count as total_tests,
+                ROUND(grade_sum / grade_count, 2) as average_grade,
+                ROUND(min_grade, 2) as min_grade,
+                ROUND(max_grade, 2) as max_grade
+            FROM student_aggregates
+            WHERE grade_count >= %s
+            ORDER BY grade_sum / grade_count DESC, aem
+            LIMIT %s;
+        """, (min_tests, limit))
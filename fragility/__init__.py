@@ -0,0 +1,33 @@
+"""
+Fragility analysis package for rail_db project.
+
+This package contains the numerical side of the seismic fragility tools:
+- Vectorized lognormal fragility curve evaluation
+- Monte Carlo connectivity analysis of rail networks
+- Hazard curve convolution for annual damage state rates
+- In-memory index over the fragility parameter library
+- Maximum-likelihood fitting from observed damage data
+- Latin hypercube uncertainty bands on fragility curves
+"""
+
+from .core import standard_normal_cdf_array, fragility_probabilities
+from .network import ConnectivityEstimate, estimate_connectivity, shutdown_pool
+from .hazard import damage_state_rates, exceedance_probability
+from .library import FragilityIndex
+from .fitting import FragilityFit, fit_fragility_curves
+from .uncertainty import latin_hypercube, fragility_band
+
+__all__ = [
+    'standard_normal_cdf_array',
+    'fragility_probabilities',
+    'ConnectivityEstimate',
+    'estimate_connectivity',
+    'shutdown_pool',
+    'damage_state_rates',
+    'exceedance_probability',
+    'FragilityIndex',
+    'FragilityFit',
+    'fit_fragility_curves',
+    'latin_hypercube',
+    'fragility_band'
+]
@@ -0,0 +1,85 @@
+"""
+Vectorized fragility curve evaluation
+"""
+import numpy as np
+
+# Abramowitz and Stegun formula 7.1.26 constants, same as the scalar
+# implementation in api/routers/latex/fragility.py
+_A1 = 0.254829592
+_A2 = -0.284496736
+_A3 = 1.421413741
+_A4 = -1.453152027
+_A5 = 1.061405429
+_P = 0.3275911
+
+
+def standard_normal_cdf_pdf_array(z):
+    """Standard normal CDF and PDF element-wise, sharing one exponential.
+
+    float32 inputs are evaluated in float32; anything else in float64.
+    """
+    z = np.asarray(z)
+    if z.dtype != np.float32:
+        z = z.astype(float)
+    gauss = np.exp(-0.5 * z * z)
+    t = 1.0 / (1.0 + _P * np.abs(z) / np.sqrt(2.0))
+    # Half the complementary error function, computed directly so the
+    # lower tail keeps its relative precision instead of cancelling to 0
+    tail = 0.5 * (((((_A5 * t + _A4) * t) + _A3) * t + _A2) * t + _A1) * t * gauss
+    return np.where(z >= 0, 1.0 - tail, tail), gauss / np.sqrt(2.0 * np.pi)
+
+
+def standard_normal_cdf_array(z):
+    """Standard normal CDF evaluated element-wise over an array"""
+    return standard_normal_cdf_pdf_array(z)[0]
+
+
+# Acklam's rational approximation to the inverse normal CDF
+_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+          1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+          6.680131188771972e+01, -1.328068155288572e+01)
+_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+          -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+          3.754408661907416e+00)
+_PPF_LOW = 0.02425
+
+
+def standard_normal_ppf_array(p):
+    """Inverse standard normal CDF element-wise for probabilities in (0, 1)"""
+    p = np.asarray(p, dtype=float)
+    a, b, c, d = _PPF_A, _PPF_B, _PPF_C, _PPF_D
+
+    # Central region
+    q = p - 0.5
+    r = q * q
+    central = (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * q / \
+        (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1)
+
+    # Tails, using the symmetry of the lower tail formula
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.sqrt(-2 * np.log(np.minimum(p, 1 - p)))
+    tail = (((((c[0] * t + c[1]) * t + c[2]) * t + c[3]) * t + c[4]) * t + c[5]) / \
+        ((((d[0] * t + d[1]) * t + d[2]) * t + d[3]) * t + 1)
+
+    in_tail = (p < _PPF_LOW) | (p > 1 - _PPF_LOW)
+    return np.where(in_tail, np.where(p < 0.5, tail, -tail), central)
+
+
+def fragility_probabilities(pga, pga_mean, beta):
+    """Lognormal fragility probabilities, broadcasting over all arguments.
+
+    A PGA of zero maps to a probability of zero instead of raising, so
+    hazard grids and element PGAs can start at the origin.
+    """
+    pga = np.asarray(pga, dtype=float)
+    pga_mean = np.asarray(pga_mean, dtype=float)
+    beta = np.asarray(beta, dtype=float)
+
+    if np.any(pga < 0) or np.any(pga_mean <= 0) or np.any(beta <= 0):
+        raise ValueError("PGA must be non-negative, pga_mean and beta must be positive")
+
+    with np.errstate(divide="ignore"):
+        z = np.log(pga / pga_mean) / beta
+    return np.where(pga > 0, standard_normal_cdf_array(z), 0.0)
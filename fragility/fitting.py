@@ -0,0 +1,243 @@
+"""
+Maximum-likelihood fitting of lognormal fragility curves from damage observations
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .core import standard_normal_cdf_array, standard_normal_cdf_pdf_array, standard_normal_ppf_array
+
+# Probabilities are clipped away from 0 and 1 inside the likelihood
+_EPS = 1e-12
+
+# Upper bound on padded observations per bootstrap chunk (rows x columns)
+_CHUNK_ELEMENTS = 2_000_000
+
+
+@dataclass
+class FragilityFit:
+    """Fitted lognormal fragility parameters for one group of observations"""
+    pga_mean: Optional[float]
+    beta: Optional[float]
+    log_likelihood: Optional[float]
+    observations: int
+    damaged: int
+    converged: bool
+    pga_mean_ci: Optional[List[float]] = None
+    beta_ci: Optional[List[float]] = None
+
+
+def _pad(groups_pga: Sequence[np.ndarray], groups_damaged: Sequence[np.ndarray]):
+    """Stack ragged groups into padded (groups, max_size) arrays plus a mask"""
+    width = max(len(pga) for pga in groups_pga)
+    log_pga = np.zeros((len(groups_pga), width))
+    damaged = np.zeros((len(groups_pga), width))
+    mask = np.zeros((len(groups_pga), width))
+    for i, (pga, hits) in enumerate(zip(groups_pga, groups_damaged)):
+        log_pga[i, :len(pga)] = np.log(pga)
+        damaged[i, :len(pga)] = hits
+        mask[i, :len(pga)] = 1.0
+    return log_pga, damaged, mask
+
+
+def _log_likelihood(intercept, slope, log_pga, damaged, mask):
+    """Probit log-likelihood of every row"""
+    cdf = np.clip(standard_normal_cdf_array(intercept[:, None] + slope[:, None] * log_pga), _EPS, 1 - _EPS)
+    return (mask * (damaged * np.log(cdf) + (1 - damaged) * np.log(1 - cdf))).sum(axis=1)
+
+
+def _fit_probit(log_pga, damaged, mask, max_iter=50, tol=1e-7, max_halvings=30):
+    """Fit P = Phi(a + b * ln PGA) for every row at once by Fisher scoring.
+
+    Returns intercepts, slopes, log-likelihoods and a convergence flag per
+    row. Rows without both damaged and undamaged observations, or with
+    perfectly separated data, do not converge and are returned as NaN.
+    """
+    rows = log_pga.shape[0]
+    n = mask.sum(axis=1)
+    hits = (damaged * mask).sum(axis=1)
+    identifiable = (hits > 0) & (hits < n)
+
+    # Start from beta = 0.6 with the damaged fraction reached at the mean
+    # log PGA of each row; a start far from the data makes plain Fisher
+    # scoring oscillate
+    mean_x = (log_pga * mask).sum(axis=1) / np.maximum(n, 1)
+    fraction = np.clip(hits / np.maximum(n, 1), 0.01, 0.99)
+    slope = np.full(rows, 1 / 0.6)
+    intercept = standard_normal_ppf_array(fraction) - slope * mean_x
+    converged = np.zeros(rows, dtype=bool)
+    active = np.flatnonzero(identifiable)
+
+    for _ in range(max_iter):
+        if len(active) == 0:
+            break
+
+        # Only rows still iterating are recomputed
+        x = log_pga[active]
+        d = damaged[active]
+        m = mask[active]
+        z = intercept[active, None] + slope[active, None] * x
+        cdf, pdf = standard_normal_cdf_pdf_array(z)
+        cdf = np.clip(cdf, _EPS, 1 - _EPS)
+        variance = cdf * (1 - cdf)
+        current = (m * (d * np.log(cdf) + (1 - d) * np.log(1 - cdf))).sum(axis=1)
+
+        weight = pdf / variance * m
+        score = (d - cdf) * weight
+        weight *= pdf
+
+        g0 = score.sum(axis=1)
+        g1 = (score * x).sum(axis=1)
+        wx = weight * x
+        i00 = weight.sum(axis=1)
+        i01 = wx.sum(axis=1)
+        i11 = (wx * x).sum(axis=1)
+
+        det = i00 * i11 - i01 * i01
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step0 = (i11 * g0 - i01 * g1) / det
+            step1 = (i00 * g1 - i01 * g0) / det
+
+        # Damp large steps so poorly conditioned rows do not overshoot
+        size = np.sqrt(step0 * step0 + step1 * step1)
+        finite = np.isfinite(size)
+        scale = np.where(size > 5.0, 5.0 / size, 1.0)
+
+        # Halve steps that would lower the likelihood until they do not
+        for _ in range(max_halvings):
+            with np.errstate(invalid="ignore"):
+                trial = _log_likelihood(
+                    intercept[active] + scale * step0, slope[active] + scale * step1, x, d, m
+                )
+                worse = finite & (trial < current - 1e-10 * np.abs(current))
+            if not np.any(worse):
+                break
+            scale = np.where(worse, scale / 2, scale)
+
+        intercept[active[finite]] += scale[finite] * step0[finite]
+        slope[active[finite]] += scale[finite] * step1[finite]
+
+        converged[active[finite & (size < tol)]] = True
+        active = active[finite & (size >= tol)]
+
+    with np.errstate(invalid="ignore"):
+        log_likelihood = _log_likelihood(intercept, slope, log_pga, damaged, mask)
+
+    valid = converged & (slope > 0)
+    intercept = np.where(valid, intercept, np.nan)
+    slope = np.where(valid, slope, np.nan)
+    log_likelihood = np.where(valid, log_likelihood, np.nan)
+    return intercept, slope, log_likelihood, valid
+
+
+def _to_lognormal(intercept, slope):
+    """Convert probit coefficients to (pga_mean, beta)"""
+    with np.errstate(invalid="ignore"):
+        return np.exp(-intercept / slope), 1 / slope
+
+
+def _bootstrap_chunk(log_pga, damaged, mask, n, group_ids, seed_sequence):
+    """Fit one chunk of bootstrap resamples, one row per resample"""
+    rng = np.random.default_rng(seed_sequence)
+    n_rows = n[group_ids]
+    width = n_rows.max()
+    # Draw column indices uniformly within each row's own observation count
+    picks = (rng.random((len(group_ids), width)) * n_rows[:, None]).astype(int)
+    rows = group_ids[:, None]
+    sample_mask = mask[group_ids, :width]
+    intercept, slope, _, valid = _fit_probit(
+        log_pga[rows, picks] * sample_mask, damaged[rows, picks] * sample_mask, sample_mask
+    )
+    pga_mean, beta = _to_lognormal(intercept, slope)
+    return pga_mean, beta, valid
+
+
+def fit_fragility_curves(
+    groups_pga: Sequence[Sequence[float]],
+    groups_damaged: Sequence[Sequence[bool]],
+    bootstrap_samples: int = 0,
+    confidence: float = 0.9,
+    seed: int = None,
+    max_workers: int = None
+) -> List[FragilityFit]:
+    """Fit lognormal fragility parameters to several groups of observations.
+
+    Each group holds the PGA at each asset and whether the asset reached
+    the damage state. All groups are fitted together in one batched Fisher
+    scoring loop. With ``bootstrap_samples`` > 0, percentile confidence
+    intervals are computed from resamples fitted in parallel chunks.
+    """
+    groups_pga = [np.asarray(pga, dtype=float) for pga in groups_pga]
+    groups_damaged = [np.asarray(hits, dtype=float) for hits in groups_damaged]
+
+    if not groups_pga:
+        raise ValueError("At least one group of observations is required")
+    for pga, hits in zip(groups_pga, groups_damaged):
+        if len(pga) == 0 or len(pga) != len(hits):
+            raise ValueError("Each group needs the same, non-zero number of PGA values and damage flags")
+        if np.any(pga <= 0):
+            raise ValueError("Observed PGA values must be positive")
+    if not 0 < confidence < 1:
+        raise ValueError("Confidence must be between 0 and 1")
+
+    log_pga, damaged, mask = _pad(groups_pga, groups_damaged)
+    intercept, slope, log_likelihood, valid = _fit_probit(log_pga, damaged, mask)
+    pga_mean, beta = _to_lognormal(intercept, slope)
+
+    fits = [
+        FragilityFit(
+            pga_mean=float(pga_mean[i]) if valid[i] else None,
+            beta=float(beta[i]) if valid[i] else None,
+            log_likelihood=float(log_likelihood[i]) if valid[i] else None,
+            observations=len(groups_pga[i]),
+            damaged=int(groups_damaged[i].sum()),
+            converged=bool(valid[i])
+        )
+        for i in range(len(groups_pga))
+    ]
+
+    if bootstrap_samples <= 0 or not np.any(valid):
+        return fits
+
+    n = mask.sum(axis=1).astype(int)
+    fitted = np.flatnonzero(valid)
+
+    # Resamples are ordered by group size and chunked so each chunk is
+    # only padded to its own largest group
+    order = fitted[np.argsort(n[fitted], kind="stable")]
+    group_ids = np.repeat(order, bootstrap_samples)
+    widths = n[group_ids]
+    chunks = []
+    start = 0
+    while start < len(group_ids):
+        end = start + 1
+        while end < len(group_ids) and (end + 1 - start) * widths[end] <= _CHUNK_ELEMENTS:
+            end += 1
+        chunks.append(group_ids[start:end])
+        start = end
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+
+    # numpy releases the GIL inside the heavy array operations, so threads
+    # are enough to fit chunks in parallel without copying the data
+    workers = min(max_workers or os.cpu_count() or 1, len(chunks))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda args: _bootstrap_chunk(log_pga, damaged, mask, n, *args),
+            zip(chunks, seeds)
+        ))
+
+    boot_mean = np.concatenate([r[0] for r in results]).reshape(len(order), bootstrap_samples)
+    boot_beta = np.concatenate([r[1] for r in results]).reshape(len(order), bootstrap_samples)
+
+    tail = (1 - confidence) / 2 * 100
+    for row, i in enumerate(order):
+        ok = np.isfinite(boot_mean[row]) & np.isfinite(boot_beta[row])
+        if not np.any(ok):
+            continue
+        fits[i].pga_mean_ci = np.percentile(boot_mean[row][ok], [tail, 100 - tail]).tolist()
+        fits[i].beta_ci = np.percentile(boot_beta[row][ok], [tail, 100 - tail]).tolist()
+
+    return fits
@@ -0,0 +1,88 @@
+"""
+Convolution of fragility curves with site hazard curves
+"""
+import numpy as np
+
+from .core import fragility_probabilities
+
+# Smallest rate used when interpolating hazard curves in log space
+_RATE_FLOOR = 1e-300
+
+
+def _adaptive_log_grid(log_levels, log_medians, betas, points_per_beta, span):
+    """Build a log-PGA grid that is dense where any fragility curve changes.
+
+    The grid is the union of the hazard curve abscissae and, for every
+    damage state, points spaced beta / points_per_beta apart within
+    +/- span betas of the median, clipped to the hazard curve range.
+    """
+    offsets = np.linspace(-span, span, 2 * span * points_per_beta + 1)
+    local = (log_medians[:, None] + betas[:, None] * offsets[None, :]).ravel()
+    local = local[(local > log_levels[0]) & (local < log_levels[-1])]
+    return np.unique(np.concatenate([log_levels, local]))
+
+
+def damage_state_rates(
+    pga_levels,
+    annual_rates,
+    pga_mean,
+    beta,
+    points_per_beta: int = 20,
+    span: int = 5
+) -> np.ndarray:
+    """Annual rate of reaching or exceeding each damage state at each site.
+
+    ``annual_rates`` holds one hazard curve per row (annual rate of
+    exceeding each PGA level) sharing the ``pga_levels`` abscissae, and
+    ``pga_mean``/``beta`` hold one entry per damage state. The result has
+    shape (sites, damage states) and is the discretized integral
+
+        lambda_ds = sum_i P[ds | a_i*] * (lambda(a_i) - lambda(a_i+1))
+                    + P[ds | a_max] * lambda(a_max)
+
+    evaluated on an adaptive log-PGA grid, with hazard rates interpolated
+    linearly in log-log space. Exceedances above the last hazard level are
+    assigned the fragility probability at that level.
+    """
+    pga_levels = np.asarray(pga_levels, dtype=float)
+    annual_rates = np.atleast_2d(np.asarray(annual_rates, dtype=float))
+    pga_mean = np.atleast_1d(np.asarray(pga_mean, dtype=float))
+    beta = np.atleast_1d(np.asarray(beta, dtype=float))
+
+    if pga_levels.ndim != 1 or len(pga_levels) < 2:
+        raise ValueError("At least two PGA levels are required")
+    if np.any(pga_levels <= 0) or np.any(np.diff(pga_levels) <= 0):
+        raise ValueError("PGA levels must be positive and strictly increasing")
+    if annual_rates.shape[1] != len(pga_levels):
+        raise ValueError("Each hazard curve must have one rate per PGA level")
+    if np.any(annual_rates < 0) or np.any(np.diff(annual_rates, axis=1) > 0):
+        raise ValueError("Hazard rates must be non-negative and non-increasing with PGA")
+    if pga_mean.shape != beta.shape:
+        raise ValueError("pga_mean and beta must have one entry per damage state")
+
+    log_levels = np.log(pga_levels)
+    grid = _adaptive_log_grid(log_levels, np.log(pga_mean), beta, points_per_beta, span)
+
+    # Interpolate every site's log-rate curve onto the grid at once, since
+    # all sites share the same abscissae
+    upper = np.clip(np.searchsorted(log_levels, grid, side="right"), 1, len(log_levels) - 1)
+    lower = upper - 1
+    weight = (grid - log_levels[lower]) / (log_levels[upper] - log_levels[lower])
+    log_rates = np.log(np.maximum(annual_rates, _RATE_FLOOR))
+    grid_rates = np.exp(
+        log_rates[:, lower] * (1 - weight) + log_rates[:, upper] * weight
+    )
+    grid_rates[grid_rates <= _RATE_FLOOR] = 0.0
+
+    # Fragility at the geometric midpoints of each interval: (damage states, intervals)
+    midpoints = np.exp(0.5 * (grid[:-1] + grid[1:]))
+    probs = fragility_probabilities(midpoints[None, :], pga_mean[:, None], beta[:, None])
+    tail_probs = fragility_probabilities(pga_levels[-1], pga_mean, beta)
+
+    rate_drops = grid_rates[:, :-1] - grid_rates[:, 1:]
+    return rate_drops @ probs.T + grid_rates[:, -1:] * tail_probs[None, :]
+
+
+def exceedance_probability(rates, years: float) -> np.ndarray:
+    """Poisson probability of at least one exceedance within a time horizon"""
+    return -np.expm1(-np.asarray(rates, dtype=float) * years)
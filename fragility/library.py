@@ -0,0 +1,81 @@
+"""
+In-memory index over the fragility parameter library
+"""
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .core import fragility_probabilities
+
+
+class FragilityIndex:
+    """Immutable, array-backed lookup of fragility parameters by typology.
+
+    Rows are grouped by typology so each typology maps to a contiguous
+    slice of the parameter arrays, and batch evaluation gathers all rows
+    for all requested items with a single fancy-indexing step.
+    """
+
+    def __init__(self, rows: Sequence[dict]):
+        rows = sorted(rows, key=lambda row: (row["typology"], float(row["pga_mean"])))
+
+        self.damage_states = [row["damage_state"] for row in rows]
+        self.pga_mean = np.array([float(row["pga_mean"]) for row in rows])
+        self.beta = np.array([float(row["beta"]) for row in rows])
+
+        self.slices: Dict[str, slice] = {}
+        for i, row in enumerate(rows):
+            current = self.slices.get(row["typology"])
+            start = current.start if current else i
+            self.slices[row["typology"]] = slice(start, i + 1)
+
+    def __len__(self):
+        return len(self.damage_states)
+
+    def __contains__(self, typology):
+        return typology in self.slices
+
+    @property
+    def typologies(self) -> List[str]:
+        return list(self.slices)
+
+    def get(self, typology: str) -> List[dict]:
+        """Return the damage states of one typology"""
+        rows = self.slices[typology]
+        return [
+            {
+                "damage_state": self.damage_states[i],
+                "pga_mean": float(self.pga_mean[i]),
+                "beta": float(self.beta[i])
+            }
+            for i in range(rows.start, rows.stop)
+        ]
+
+    def evaluate(self, typologies: Sequence[str], pga) -> List[Dict[str, float]]:
+        """Exceedance probabilities of every damage state for each (typology, PGA) item.
+
+        A single PGA value is applied to all items. Raises KeyError for
+        unknown typologies.
+        """
+        pga = np.broadcast_to(np.asarray(pga, dtype=float), (len(typologies),))
+
+        starts = np.array([self.slices[t].start for t in typologies], dtype=int)
+        counts = np.array([self.slices[t].stop - self.slices[t].start for t in typologies], dtype=int)
+
+        # Row indices for all items concatenated, e.g. counts [2, 3] and
+        # starts [0, 5] give [0, 1, 5, 6, 7]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.repeat(starts, counts) + offsets
+
+        probs = fragility_probabilities(np.repeat(pga, counts), self.pga_mean[rows], self.beta[rows])
+
+        results = []
+        position = 0
+        for count in counts:
+            item_rows = rows[position:position + count]
+            results.append({
+                self.damage_states[row]: float(prob)
+                for row, prob in zip(item_rows, probs[position:position + count])
+            })
+            position += count
+        return results
@@ -0,0 +1,158 @@
+"""
+Monte Carlo connectivity analysis for rail networks under seismic scenarios
+"""
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+# The union-find loop holds the GIL, so batches run on processes. One pool
+# serves every request; its workers come from a forkserver, so they never
+# inherit the server's threads, locks or database connections.
+POOL_WORKERS = os.cpu_count() or 1
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _batch_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=POOL_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the shared batch pool; the next estimate starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+@dataclass
+class ConnectivityEstimate:
+    """Result of a Monte Carlo connectivity run"""
+    probability: float
+    standard_error: float
+    ci_lower: float
+    ci_upper: float
+    realizations: int
+    connected_realizations: int
+
+
+def _find(parent: List[int], node: int) -> int:
+    """Find the root of a node with path halving"""
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+
+def _count_connected(
+    n_nodes: int,
+    edge_from: Sequence[int],
+    edge_to: Sequence[int],
+    failure_prob: np.ndarray,
+    source: int,
+    target: int,
+    realizations: int,
+    seed_sequence: np.random.SeedSequence
+) -> int:
+    """Count realizations in one batch where source and target stay connected"""
+    rng = np.random.default_rng(seed_sequence)
+
+    # One vectorized draw for the whole batch: True means the element survives
+    survived = rng.random((realizations, len(failure_prob))) >= failure_prob
+
+    connected = 0
+    for row in survived:
+        parent = list(range(n_nodes))
+        for edge in np.flatnonzero(row):
+            root_a = _find(parent, edge_from[edge])
+            root_b = _find(parent, edge_to[edge])
+            if root_a != root_b:
+                parent[root_a] = root_b
+        if _find(parent, source) == _find(parent, target):
+            connected += 1
+
+    return connected
+
+
+def estimate_connectivity(
+    n_nodes: int,
+    edge_from: Sequence[int],
+    edge_to: Sequence[int],
+    failure_prob: Sequence[float],
+    source: int,
+    target: int,
+    realizations: int = 10000,
+    batch_size: int = 2000,
+    seed: int = None,
+    max_workers: int = None
+) -> ConnectivityEstimate:
+    """Estimate the probability that source and target remain connected.
+
+    Nodes are indexed 0..n_nodes-1 and each edge fails independently with
+    its own probability. Realizations are split into batches, each with an
+    independent child seed, so results only depend on the seed and the
+    batch size, not on the number of workers. Batches run on the shared
+    process pool, at most ``max_workers`` at a time; ``max_workers`` of 1
+    runs them in the calling thread.
+    """
+    failure_prob = np.asarray(failure_prob, dtype=float)
+    edge_from = [int(node) for node in edge_from]
+    edge_to = [int(node) for node in edge_to]
+
+    if len(edge_from) != len(edge_to) or len(edge_from) != len(failure_prob):
+        raise ValueError("Edge endpoints and failure probabilities must have the same length")
+    if not (0 <= source < n_nodes and 0 <= target < n_nodes):
+        raise ValueError("Source and target must be valid node indices")
+    if realizations <= 0 or batch_size <= 0:
+        raise ValueError("Realizations and batch size must be positive")
+
+    if source == target:
+        connected = realizations
+    else:
+        batch_sizes = [batch_size] * (realizations // batch_size)
+        if realizations % batch_size:
+            batch_sizes.append(realizations % batch_size)
+        seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+        args = [
+            (n_nodes, edge_from, edge_to, failure_prob, source, target, size, child)
+            for size, child in zip(batch_sizes, seeds)
+        ]
+
+        workers = min(max_workers or POOL_WORKERS, len(args))
+        if workers <= 1:
+            connected = sum(_count_connected(*batch) for batch in args)
+        else:
+            executor = _batch_pool()
+            connected = 0
+            pending = []
+            for batch in args:
+                pending.append(executor.submit(_count_connected, *batch))
+                if len(pending) >= workers:
+                    connected += pending.pop(0).result()
+            connected += sum(future.result() for future in pending)
+
+    probability = connected / realizations
+    standard_error = math.sqrt(probability * (1 - probability) / realizations)
+
+    return ConnectivityEstimate(
+        probability=probability,
+        standard_error=standard_error,
+        ci_lower=max(0.0, probability - 1.96 * standard_error),
+        ci_upper=min(1.0, probability + 1.96 * standard_error),
+        realizations=realizations,
+        connected_realizations=connected
+    )
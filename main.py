@@ -1,10 +1,11 @@
 """
 Main application entry point for Railway PostgreSQL Database Project
 """
-from database import DatabaseManager
+from database import DatabaseManager, StudentAggregates, GradePartitioning
 from database.tests import run_all_tests
 from database.demo import run_advanced_demo
 from database.student_utils import get_student_data_summary
+from database.export import export_grades_interactive
 
 def show_menu():
     """Display the main application menu"""
@@ -17,7 +18,10 @@ def show_menu():
     print("3. 📊 Quick Database Stats")
     print("4. 🔍 Interactive Query Mode")
     print("5. 📚 Student Grades Summary")
-    print("6. ❌ Exit")
+    print("6. 🧮 Check Student Aggregates")
+    print("7. 📤 Export Student Grades (CSV/Parquet)")
+    print("8. 🗂️ Partition Student Grades by Year")
+    print("9. ❌ Exit")
     print("-" * 60)
 
 def quick_stats():
@@ -103,6 +107,79 @@ def interactive_query():
     except Exception as e:
         print(f"❌ Error in interactive mode: {e}")
 
+def check_aggregates():
+    """Rebuild student aggregates from scratch and report any differences"""
+    print("\n🧮 STUDENT AGGREGATES CONSISTENCY CHECK")
+    print("-" * 40)
+    
+    try:
+        with DatabaseManager() as db:
+            if not StudentAggregates.create_tables(db):
+                print("❌ Could not create the student_aggregates table")
+                return
+            
+            differences = StudentAggregates.check_consistency(db)
+            if differences is None:
+                print("❌ Consistency check failed")
+                return
+            
+            if not differences:
+                print("✅ Student aggregates match student_grades")
+                return
+            
+            print(f"⚠️ {len(differences)} students differ:")
+            for row in differences[:10]:
+                print(f"   AEM {row['aem']}: expected {row['expected_count']} grades, "
+                      f"sum {row['expected_sum']}, range {row['expected_min']}-{row['expected_max']}; "
+                      f"found {row['actual_count']} grades, sum {row['actual_sum']}, "
+                      f"range {row['actual_min']}-{row['actual_max']}")
+            if len(differences) > 10:
+                print(f"   ... and {len(differences) - 10} more")
+            
+            if input("\nRebuild the aggregates now? (y/N): ").strip().lower() == 'y':
+                if StudentAggregates.rebuild(db):
+                    print("✅ Student aggregates rebuilt")
+                else:
+                    print("❌ Rebuild failed")
+                    
+    except Exception as e:
+        print(f"❌ Error checking aggregates: {e}")
+
+def partition_grades():
+    """Migrate student_grades to year partitions and optionally freeze past years"""
+    print("\n🗂️ STUDENT GRADES PARTITIONING")
+    print("-" * 40)
+    
+    try:
+        with DatabaseManager() as db:
+            if not GradePartitioning.is_partitioned(db):
+                if input("student_grades is not partitioned. Migrate it now? (y/N): ").strip().lower() != 'y':
+                    return
+                if not GradePartitioning.migrate(db):
+                    print("❌ Migration failed, student_grades is unchanged")
+                    return
+                print("✅ student_grades partitioned by year "
+                      "(the original table is kept as student_grades_unpartitioned)")
+            
+            if not (GradePartitioning.create_tables(db) and GradePartitioning.ensure_partitions(db)):
+                print("❌ Could not create the missing partitions")
+                return
+            
+            years = GradePartitioning.partition_years(db) or []
+            print(f"📅 Year partitions: {', '.join(str(year) for year in years)}")
+            
+            answer = input("Years to freeze stats for (e.g. 2019 2020, blank to skip): ").strip()
+            for year in answer.replace(",", " ").split():
+                if GradePartitioning.freeze_year(db, int(year)):
+                    print(f"✅ Stats for {year} frozen")
+                else:
+                    print(f"❌ Could not freeze {year}")
+                    
+    except ValueError:
+        print("❌ Years must be numbers")
+    except Exception as e:
+        print(f"❌ Error partitioning grades: {e}")
+
 def main():
     """Main application loop"""
     print("🎉 Welcome to the Railway PostgreSQL Database Application!")
@@ -111,7 +188,7 @@ def main():
         show_menu()
         
         try:
-            choice = input("\nEnter your choice (1-6): ").strip()
+            choice = input("\nEnter your choice (1-9): ").strip()
             
             if choice == '1':
                 run_all_tests()
@@ -124,10 +201,16 @@ def main():
             elif choice == '5':
                 get_student_data_summary()
             elif choice == '6':
+                check_aggregates()
+            elif choice == '7':
+                export_grades_interactive()
+            elif choice == '8':
+                partition_grades()
+            elif choice == '9':
                 print("\n👋 Goodbye! Thanks for using the Railway PostgreSQL Database Application!")
                 break
             else:
-                print("❌ Invalid choice. Please enter 1-6.")
+                print("❌ Invalid choice. Please enter 1-9.")
                 
         except KeyboardInterrupt:
             print("\n\n👋 Application interrupted. Goodbye!")
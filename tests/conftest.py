@@ -0,0 +1,53 @@
+"""
+Shared fixtures. Database tests run against TEST_DATABASE_URL, which must
+point to a throwaway database: every test rebuilds its tables from scratch.
+"""
+import os
+
+import pytest
+
+from database import DatabaseManager, GradePartitioning
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# Tables and functions created by the database classes, dropped before each test
+DERIVED_TABLES = (
+    "student_grades", "student_grades_unpartitioned", "frozen_year_stats", "student_aggregates",
+    "grade_sketches", "grade_sketch_buckets", "grade_sketch_registers",
+    "grade_zscore_groups", "grade_zscores"
+)
+
+
+def insert_grades(db, rows):
+    """Insert (aem, test, grade, year) tuples in one statement"""
+    assert db.execute_command(
+        "INSERT INTO student_grades (aem, test, grade, year) SELECT * FROM unnest(%s::int[], %s::varchar[], %s::numeric[], %s::int[]);",
+        [list(column) for column in zip(*rows)]
+    )
+
+
+@pytest.fixture
+def db(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    monkeypatch.setenv("DATABASE_URL", TEST_DATABASE_URL)
+    monkeypatch.setattr(GradePartitioning, "_known_years", set())
+    monkeypatch.setattr(GradePartitioning, "_partitioned", None)
+
+    with DatabaseManager() as db:
+        assert db.execute_command(
+            "".join(f"DROP TABLE IF EXISTS {table} CASCADE;" for table in DERIVED_TABLES) + """
+            DROP SEQUENCE IF EXISTS student_grades_id_seq CASCADE;
+            CREATE TABLE student_grades (
+                id SERIAL PRIMARY KEY,
+                aem INTEGER NOT NULL,
+                test VARCHAR(50) NOT NULL,
+                grade DECIMAL(4, 2) NOT NULL,
+                year INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (aem, test, year)
+            );
+            """
+        )
+        yield db
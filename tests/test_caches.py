@@ -0,0 +1,136 @@
+"""
+Tests for the in-process caches of the students router
+"""
+import time
+
+from api.routers.count_cache import CountCache
+from api.routers.transcript_cache import ENTRY_OVERHEAD_BYTES, NOT_FOUND, TranscriptCache
+
+
+def test_transcript_cache_hits_after_first_load():
+    cache = TranscriptCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return b"[1]"
+
+    assert cache.get_or_load(1, loader) == b"[1]"
+    assert cache.get_or_load(1, loader) == b"[1]"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_transcript_cache_caches_not_found_but_not_failures():
+    cache = TranscriptCache()
+    assert cache.get_or_load(1, lambda: NOT_FOUND) == NOT_FOUND
+    assert cache.get(1) == NOT_FOUND
+    assert cache.get_or_load(2, lambda: None) is None
+    assert cache.get(2) is None
+
+
+def test_transcript_cache_discards_fill_racing_an_invalidation():
+    cache = TranscriptCache()
+
+    def loader():
+        # A write to the same student commits while the fill is running
+        cache.invalidate(1)
+        return b"[stale]"
+
+    assert cache.get_or_load(1, loader) == b"[stale]"
+    assert cache.get(1) is None
+    assert cache.get_or_load(1, lambda: b"[fresh]") == b"[fresh]"
+    assert cache.get(1) == b"[fresh]"
+
+
+def test_transcript_cache_discards_fill_racing_a_clear():
+    cache = TranscriptCache()
+
+    def loader():
+        cache.clear()
+        return b"[stale]"
+
+    cache.get_or_load(1, loader)
+    assert cache.get(1) is None
+
+
+def test_transcript_cache_keeps_no_bookkeeping_for_idle_students():
+    cache = TranscriptCache()
+    for aem in range(1000):
+        cache.invalidate(aem)
+        cache.get_or_load(aem, lambda: b"[]")
+    for aem in range(1000):
+        cache.invalidate(aem)
+    assert cache._generations == {} and cache._loading == {}
+
+
+def test_transcript_cache_failed_loader_releases_bookkeeping():
+    cache = TranscriptCache()
+
+    def loader():
+        raise RuntimeError("database down")
+
+    try:
+        cache.get_or_load(1, loader)
+    except RuntimeError:
+        pass
+    assert cache._loading == {}
+
+
+def test_transcript_cache_evicts_least_recently_used_within_byte_budget():
+    body = b"x" * 100
+    cache = TranscriptCache(max_bytes=3 * (len(body) + ENTRY_OVERHEAD_BYTES))
+    for aem in (1, 2, 3):
+        cache.get_or_load(aem, lambda: body)
+    cache.get(1)
+    cache.get_or_load(4, lambda: body)
+
+    assert cache.get(2) is None
+    assert cache.get(1) == body and cache.get(4) == body
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    assert cache.stats()["evictions"] == 1
+
+
+def test_count_cache_counts_once_per_key():
+    cache = CountCache()
+    calls = []
+
+    def counter():
+        calls.append(1)
+        return 42
+
+    assert cache.get_or_count(("math", None), counter) == 42
+    assert cache.get_or_count(("math", None), counter) == 42
+    assert cache.get_or_count(("physics", None), counter) == 42
+    assert len(calls) == 2
+    assert cache.stats() == {"entries": 2, "max_entries": 1024, "hits": 1, "misses": 2}
+
+
+def test_count_cache_clear_discards_counts_racing_a_write():
+    cache = CountCache()
+
+    def counter():
+        cache.clear()
+        return 1
+
+    assert cache.get_or_count("key", counter) == 1
+    assert cache.stats()["entries"] == 0
+    assert cache.get_or_count("key", lambda: 2) == 2
+    assert cache.get_or_count("key", lambda: 3) == 2
+
+
+def test_count_cache_evicts_least_recently_used():
+    cache = CountCache(max_entries=2)
+    cache.get_or_count("a", lambda: 1)
+    cache.get_or_count("b", lambda: 2)
+    cache.get_or_count("a", lambda: 0)
+    cache.get_or_count("c", lambda: 3)
+    assert cache.get_or_count("a", lambda: 0) == 1
+    assert cache.get_or_count("b", lambda: 20) == 20
+
+
+def test_count_cache_expires_old_counts():
+    cache = CountCache(max_age=0)
+    cache.get_or_count("key", lambda: 1)
+    time.sleep(0.01)
+    assert cache.get_or_count("key", lambda: 2) == 2
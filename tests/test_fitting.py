@@ -0,0 +1,66 @@
+"""
+Tests for maximum-likelihood fragility fitting
+"""
+import numpy as np
+import pytest
+
+from fragility.core import fragility_probabilities
+from fragility.fitting import fit_fragility_curves
+
+
+def simulate(pga_mean, beta, size, rng):
+    pga = np.exp(rng.uniform(np.log(0.02), np.log(2.0), size))
+    damaged = rng.random(size) < fragility_probabilities(pga, pga_mean, beta)
+    return pga, damaged
+
+
+def test_recovers_parameters_of_each_group():
+    rng = np.random.default_rng(3)
+    groups = [simulate(0.3, 0.5, 4000, rng), simulate(0.8, 0.7, 2500, rng)]
+    fits = fit_fragility_curves([g[0] for g in groups], [g[1] for g in groups])
+
+    assert [fit.converged for fit in fits] == [True, True]
+    assert fits[0].pga_mean == pytest.approx(0.3, rel=0.05)
+    assert fits[0].beta == pytest.approx(0.5, rel=0.08)
+    assert fits[1].pga_mean == pytest.approx(0.8, rel=0.08)
+    assert fits[1].beta == pytest.approx(0.7, rel=0.1)
+    assert fits[0].observations == 4000
+    assert fits[0].damaged == int(groups[0][1].sum())
+    assert fits[0].log_likelihood < 0
+
+
+def test_unidentifiable_groups_do_not_converge():
+    fits = fit_fragility_curves(
+        [[0.1, 0.2, 0.3], [0.1, 0.2, 0.3, 0.4]],
+        [[False, False, False], [False, False, True, True]]
+    )
+    for fit in fits:
+        assert not fit.converged
+        assert fit.pga_mean is None and fit.beta is None and fit.log_likelihood is None
+
+
+def test_bootstrap_intervals_are_reproducible_across_worker_counts():
+    rng = np.random.default_rng(5)
+    pga, damaged = simulate(0.4, 0.6, 500, rng)
+    results = [
+        fit_fragility_curves([pga], [damaged], bootstrap_samples=200, seed=11, max_workers=workers)[0]
+        for workers in (1, 4)
+    ]
+    assert results[0].pga_mean_ci == results[1].pga_mean_ci
+    assert results[0].beta_ci == results[1].beta_ci
+
+    low, high = results[0].pga_mean_ci
+    assert low < results[0].pga_mean < high
+    low, high = results[0].beta_ci
+    assert low < results[0].beta < high
+
+
+@pytest.mark.parametrize("groups_pga, groups_damaged, kwargs, message", [
+    ([], [], {}, "At least one group"),
+    ([[0.1, 0.2]], [[True]], {}, "same, non-zero number"),
+    ([[0.0, 0.2]], [[True, False]], {}, "must be positive"),
+    ([[0.1, 0.2]], [[True, False]], {"confidence": 1.0}, "between 0 and 1"),
+])
+def test_rejects_invalid_input(groups_pga, groups_damaged, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        fit_fragility_curves(groups_pga, groups_damaged, **kwargs)
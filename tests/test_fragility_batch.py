@@ -0,0 +1,56 @@
+"""
+Tests for the streaming fragility batch endpoint
+"""
+import csv
+import io
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routers.latex import batch
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(batch.router)
+    return TestClient(app)
+
+
+def test_ndjson_rows_are_evaluated_in_order(client):
+    body = "\n".join([
+        json.dumps({"id": "a", "pga": 0.3, "pga_mean": 0.3, "beta": 0.6}),
+        "not json",
+        json.dumps({"id": "c", "pga": 0.3, "pga_mean": -1, "beta": 0.6}),
+    ])
+    response = client.post("/latex/fragility/batch", content=body, headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["line"] for row in rows] == [1, 2, 3]
+    assert rows[0]["probability"] == pytest.approx(0.5, abs=1e-6)
+    assert "error" in rows[1] and "error" in rows[2]
+
+
+def test_quoted_csv_header(client):
+    body = '"id","pga","pga_mean","beta"\nx,0.3,0.3,0.6\n'
+    response = client.post(
+        "/latex/fragility/batch", content=body, params={"output": "csv"}, headers={"content-type": "text/csv"}
+    )
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert rows[0]["id"] == "x" and rows[0]["error"] == ""
+    assert float(rows[0]["probability"]) == pytest.approx(0.5, abs=1e-6)
+
+
+def test_unknown_output_format_is_rejected(client):
+    response = client.post("/latex/fragility/batch", content="", params={"output": "xml"})
+    assert response.status_code == 422
+
+
+def test_oversized_body_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(batch, "MAX_BATCH_BYTES", 100)
+    body = json.dumps({"pga": 0.3, "pga_mean": 0.3, "beta": 0.6}) + "\n"
+    response = client.post("/latex/fragility/batch", content=body * 10)
+    assert response.status_code == 413
@@ -0,0 +1,39 @@
+"""
+Tests for request validation of the fragility endpoints
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routers.latex import fragility
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(fragility.router)
+    return TestClient(app)
+
+
+def test_hazard_convolution_defaults_and_rejects_null_damage_state(client):
+    body = {
+        "pga_levels": [0.1, 0.2, 0.4],
+        "annual_rates": [[1e-2, 4e-3, 1e-3]],
+        "fragility_curves": [{"pga_mean": 0.3, "beta": 0.5}]
+    }
+    response = client.post("/latex/fragility/hazard-convolution", json=body)
+    assert response.status_code == 200
+    assert response.json()["damage_states"] == ["ds_i"]
+
+    body["fragility_curves"][0]["damage_state"] = None
+    assert client.post("/latex/fragility/hazard-convolution", json=body).status_code == 422
+
+
+def test_curve_defaults_and_rejects_null_damage_state(client):
+    body = {"pga_mean": 0.3, "beta": 0.5, "points": 5}
+    response = client.post("/latex/fragility/curve", json=body)
+    assert response.status_code == 200
+    assert response.json()["damage_state"] == "ds_i"
+
+    body["damage_state"] = None
+    assert client.post("/latex/fragility/curve", json=body).status_code == 422
@@ -0,0 +1,17 @@
+"""
+Tests for the single-pass grade distributions
+"""
+from conftest import insert_grades
+from database.grade_distributions import GradeDistributions
+
+
+def test_pass_rates_count_grades_equal_to_a_threshold_as_passing(db):
+    insert_grades(db, [
+        (1, "Math", 5.7, 2023), (2, "Math", 5.7, 2023), (3, "Math", 5.7, 2023), (4, "Math", 6.0, 2023),
+        (5, "Physics", 0.1, 2023), (6, "Physics", 2.3, 2023), (7, "Physics", 2.29, 2023)
+    ])
+    groups = GradeDistributions.pass_rates(db, [5.7, 5.5, 0.1, 2.3])
+    assert [(g["test"], g["total"], g["pass_counts"]) for g in groups] == [
+        ("Math", 4, [4, 4, 4, 4]),
+        ("Physics", 3, [0, 0, 3, 1])
+    ]
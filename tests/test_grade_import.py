@@ -0,0 +1,63 @@
+"""
+Tests for the validation step of bulk grade imports
+"""
+from database.grade_import import _parse_header, _validate_chunk
+
+COLUMNS = {"aem": 0, "test": 1, "grade": 2, "year": 3}
+
+
+def validate(lines, delimiter=",", known_tests=None):
+    return _validate_chunk((2, [line.encode() for line in lines], delimiter, COLUMNS, known_tests))
+
+
+def test_parse_header_detects_delimiter_and_columns():
+    assert _parse_header(b'\xef\xbb\xbf"AEM";Test;Grade;Year\r\n') == (";", COLUMNS)
+    assert _parse_header(b"year\ttest\tgrade\taem\n") == ("\t", {"year": 0, "test": 1, "grade": 2, "aem": 3})
+    assert _parse_header(b"aem,test,grade,year\n")[0] == ","
+
+
+def test_valid_rows_are_written_for_copy():
+    csv_text, errors, rows = validate(["101,Math,7.5,2023\n", '102,"Physics, I",10,2024\n'])
+    assert errors == []
+    assert rows == 2
+    assert csv_text == '2,101,Math,7.5,2023\n3,102,"Physics, I",10,2024\n'
+
+
+def test_decimal_comma_with_semicolon_delimiter():
+    csv_text, errors, rows = validate(["101;Math;7,25;2023\n"], delimiter=";")
+    assert errors == []
+    assert csv_text == "2,101,Math,7.25,2023\n"
+
+
+def test_blank_and_empty_cell_rows_are_skipped():
+    csv_text, errors, rows = validate(["\n", ",,,\n", "101,Math,5,2023\n"])
+    assert errors == []
+    assert rows == 1
+    assert csv_text == "4,101,Math,5,2023\n"
+
+
+def test_every_problem_of_a_row_is_reported():
+    csv_text, errors, rows = validate([
+        "abc,,11,20x\n",
+        "0,Math,5.555,2023\n",
+        "101,Math\n",
+        "101," + "x" * 51 + ",5,2023\n",
+        b"\xff,Math,5,2023\n".decode("latin-1"),
+    ])
+    assert csv_text == ""
+    assert rows == 5
+    assert errors[0] == {"line": 2, "errors": [
+        "aem 'abc' is not an integer", "test is required",
+        "grade must be between 0 and 10", "year '20x' is not an integer"
+    ]}
+    assert errors[1] == {"line": 3, "errors": ["aem must be a positive integer", "grade must have at most two decimals"]}
+    assert errors[2] == {"line": 4, "errors": ["grade '' is not a number", "year '' is not an integer"]}
+    assert errors[3] == {"line": 5, "errors": ["test must be at most 50 characters"]}
+    assert errors[4]["line"] == 6
+
+
+def test_unknown_tests_are_rejected_only_when_known_tests_given():
+    _, errors, _ = validate(["101,Chemistry,5,2023\n"], known_tests=frozenset({"Math"}))
+    assert errors == [{"line": 2, "errors": ["unknown test 'Chemistry'"]}]
+    _, errors, _ = validate(["101,Chemistry,5,2023\n"])
+    assert errors == []
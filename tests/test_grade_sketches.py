@@ -0,0 +1,81 @@
+"""
+Tests for the pure helpers behind the grade sketches
+"""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from database.grade_sketches import (
+    BUCKETS_PER_POINT, MAX_BUCKET, PRECISION, REGISTERS, RELATIVE_STANDARD_ERROR,
+    GradeSketches, bucket_percentile, estimate_distinct, merge_groups
+)
+
+
+def registers_for(count, seed=0):
+    """HyperLogLog registers of ``count`` distinct random 64-bit hashes"""
+    rng = random.Random(seed)
+    registers = [0] * REGISTERS
+    for _ in range(count):
+        value = rng.getrandbits(64)
+        register = value >> (64 - PRECISION)
+        rest = value & ((1 << (64 - PRECISION)) - 1)
+        rho = (64 - PRECISION) - rest.bit_length() + 1
+        registers[register] = max(registers[register], rho)
+    return registers
+
+
+@pytest.mark.parametrize("count", [100, 3000, 50000])
+def test_estimate_distinct_within_error_bound(count):
+    estimate = estimate_distinct(registers_for(count))
+    assert abs(estimate - count) <= 3 * RELATIVE_STANDARD_ERROR * count + 2
+
+
+def test_estimate_distinct_of_empty_registers():
+    assert estimate_distinct([0] * REGISTERS) == 0
+
+
+def test_error_bound_widens_with_stale_rows():
+    assert GradeSketches.error_bound(1000) == math.ceil(2 * RELATIVE_STANDARD_ERROR * 1000)
+    assert GradeSketches.error_bound(1000, 7) == GradeSketches.error_bound(1000) + 7
+
+
+def test_bucket_percentile_matches_percentile_cont():
+    rng = np.random.default_rng(0)
+    grades = rng.integers(0, MAX_BUCKET + 1, 501) / BUCKETS_PER_POINT
+    counts = np.bincount((grades * BUCKETS_PER_POINT).round().astype(int), minlength=MAX_BUCKET + 1)
+    for fraction in (0.0, 0.1, 0.25, 0.5, 0.9, 1.0):
+        assert bucket_percentile(counts.tolist(), fraction) == pytest.approx(np.percentile(grades, fraction * 100))
+
+
+def test_bucket_percentile_edge_cases():
+    assert bucket_percentile([0] * (MAX_BUCKET + 1), 0.5) is None
+    counts = [0] * (MAX_BUCKET + 1)
+    counts[750] = 1
+    assert bucket_percentile(counts, 0.5) == 7.5
+
+
+def test_merge_groups_matches_direct_statistics():
+    parts = [[5.0, 6.5, 9.0], [3.25, 10.0], [7.0]]
+    groups = [
+        {
+            "grade_count": len(part),
+            "grade_sum": sum(part),
+            "grade_sumsq": sum(g * g for g in part),
+            "min_bucket": round(min(part) * BUCKETS_PER_POINT),
+            "max_bucket": round(max(part) * BUCKETS_PER_POINT),
+            "pass_count": sum(g >= 5 for g in part)
+        }
+        for part in parts
+    ]
+    grades = [g for part in parts for g in part]
+    merged = merge_groups(groups)
+    assert merged["count"] == 6
+    assert merged["average"] == pytest.approx(np.mean(grades))
+    assert merged["stddev"] == pytest.approx(np.std(grades, ddof=1))
+    assert (merged["min"], merged["max"]) == (3.25, 10.0)
+    assert merged["pass_count"] == 5
+
+    single = merge_groups(groups[2:])
+    assert single["stddev"] is None
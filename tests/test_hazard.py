@@ -0,0 +1,55 @@
+"""
+Tests for the hazard curve convolution
+"""
+import numpy as np
+import pytest
+
+from fragility.hazard import damage_state_rates, exceedance_probability
+
+# Power-law hazard curve lambda(a) = K * a^-KAPPA over a wide PGA range
+LEVELS = np.geomspace(1e-3, 1e2, 60)
+K, KAPPA = 1e-4, 2.0
+
+
+def power_law_rates():
+    return K * LEVELS ** -KAPPA
+
+
+def test_matches_closed_form_for_power_law_hazard():
+    pga_mean = np.array([0.2, 0.5, 1.0])
+    beta = np.array([0.4, 0.5, 0.6])
+    rates = damage_state_rates(LEVELS, power_law_rates(), pga_mean, beta)
+
+    # lambda_ds = K * theta^-kappa * exp(kappa^2 * beta^2 / 2)
+    expected = K * pga_mean ** -KAPPA * np.exp(KAPPA ** 2 * beta ** 2 / 2)
+    assert rates.shape == (1, 3)
+    np.testing.assert_allclose(rates[0], expected, rtol=0.02)
+
+
+def test_one_row_per_site():
+    curves = np.vstack([power_law_rates(), 2 * power_law_rates()])
+    rates = damage_state_rates(LEVELS, curves, [0.3, 0.6], [0.5, 0.5])
+    assert rates.shape == (2, 2)
+    np.testing.assert_allclose(rates[1], 2 * rates[0])
+    assert np.all(rates[:, 0] > rates[:, 1])
+
+
+@pytest.mark.parametrize("levels, rates, message", [
+    ([0.1], [1e-3], "At least two PGA levels"),
+    ([0.2, 0.1], [1e-3, 1e-4], "strictly increasing"),
+    ([0.1, 0.2], [1e-3], "one rate per PGA level"),
+    ([0.1, 0.2], [1e-4, 1e-3], "non-increasing"),
+])
+def test_rejects_invalid_hazard_curves(levels, rates, message):
+    with pytest.raises(ValueError, match=message):
+        damage_state_rates(levels, rates, [0.3], [0.5])
+
+
+def test_rejects_mismatched_fragility_parameters():
+    with pytest.raises(ValueError, match="one entry per damage state"):
+        damage_state_rates(LEVELS, power_law_rates(), [0.3, 0.6], [0.5])
+
+
+def test_exceedance_probability():
+    probabilities = exceedance_probability([0.0, 1e-3, 1.0], 50)
+    np.testing.assert_allclose(probabilities, 1 - np.exp(-np.array([0.0, 0.05, 50.0])))
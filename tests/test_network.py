@@ -0,0 +1,67 @@
+"""
+Tests for the Monte Carlo connectivity estimate
+"""
+import pytest
+
+from fragility.network import estimate_connectivity, shutdown_pool
+
+# A 3x3 grid of stations; node 0 is one corner and node 8 the opposite one
+GRID_EDGES = [(0, 1), (1, 2), (3, 4), (4, 5), (6, 7), (7, 8),
+              (0, 3), (3, 6), (1, 4), (4, 7), (2, 5), (5, 8)]
+
+
+def grid_estimate(**kwargs):
+    edge_from, edge_to = zip(*GRID_EDGES)
+    return estimate_connectivity(9, edge_from, edge_to, [0.3] * len(GRID_EDGES), 0, 8, **kwargs)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def batch_pool():
+    yield
+    shutdown_pool()
+
+
+def test_estimate_is_deterministic_across_worker_counts():
+    estimates = [
+        grid_estimate(realizations=5000, batch_size=700, seed=42, max_workers=workers)
+        for workers in (1, 2, 4, None)
+    ]
+    assert all(estimate == estimates[0] for estimate in estimates)
+    assert 0 < estimates[0].connected_realizations < 5000
+
+
+def test_different_seeds_give_different_samples():
+    first = grid_estimate(realizations=2000, seed=1, max_workers=1)
+    second = grid_estimate(realizations=2000, seed=2, max_workers=1)
+    assert first.connected_realizations != second.connected_realizations
+
+
+def test_certain_outcomes():
+    edge_from, edge_to = zip(*GRID_EDGES)
+    intact = estimate_connectivity(9, edge_from, edge_to, [0.0] * len(GRID_EDGES), 0, 8, realizations=100, seed=0)
+    destroyed = estimate_connectivity(9, edge_from, edge_to, [1.0] * len(GRID_EDGES), 0, 8, realizations=100, seed=0)
+    assert intact.probability == 1.0 and intact.standard_error == 0.0
+    assert destroyed.probability == 0.0
+    assert grid_estimate(realizations=10, seed=0).realizations == 10
+
+
+def test_confidence_interval_brackets_estimate():
+    estimate = grid_estimate(realizations=4000, seed=7, max_workers=1)
+    assert estimate.ci_lower <= estimate.probability <= estimate.ci_upper
+    assert estimate.probability == estimate.connected_realizations / 4000
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"realizations": 0},
+    {"batch_size": 0},
+])
+def test_rejects_invalid_sizes(kwargs):
+    with pytest.raises(ValueError):
+        grid_estimate(**kwargs)
+
+
+def test_rejects_invalid_nodes_and_mismatched_edges():
+    with pytest.raises(ValueError):
+        estimate_connectivity(3, [0, 1], [1, 2], [0.1, 0.1], 0, 5)
+    with pytest.raises(ValueError):
+        estimate_connectivity(3, [0, 1], [1], [0.1, 0.1], 0, 2)
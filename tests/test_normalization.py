@@ -0,0 +1,67 @@
+"""
+Tests for the materialized z-scores (need TEST_DATABASE_URL)
+"""
+import pytest
+
+from database import GradeNormalization
+
+from conftest import insert_grades
+
+GRADES = [
+    (1001, "Test 1", 4.0, 2023),
+    (1002, "Test 1", 6.0, 2023),
+    (1003, "Test 1", 8.0, 2023),
+    (1001, "Test 2", 5.0, 2023),
+]
+
+
+@pytest.fixture(autouse=True)
+def clean_dirty(monkeypatch):
+    monkeypatch.setattr(GradeNormalization, "_dirty", set())
+
+
+def z_scores(db):
+    rows = db.execute_query("SELECT aem, test, z_score FROM grade_zscores ORDER BY test, aem;")
+    return {(row["aem"], row["test"]): row["z_score"] for row in rows}
+
+
+def test_z_scores_match_group_statistics(db):
+    insert_grades(db, GRADES)
+    assert GradeNormalization.create_tables(db)
+
+    scores = z_scores(db)
+    assert scores[(1001, "Test 1")] == pytest.approx(-1.0)
+    assert scores[(1002, "Test 1")] == pytest.approx(0.0)
+    assert scores[(1003, "Test 1")] == pytest.approx(1.0)
+    # A single grade has no spread
+    assert scores[(1001, "Test 2")] is None
+
+
+def test_refresh_only_touches_given_groups_and_drops_deleted_grades(db):
+    insert_grades(db, GRADES)
+    assert GradeNormalization.create_tables(db)
+
+    assert db.execute_command("DELETE FROM student_grades WHERE aem = 1003;")
+    assert db.execute_command("UPDATE student_grades SET grade = 9 WHERE test = 'Test 2';")
+    assert GradeNormalization.refresh(db, [("Test 1", 2023)])
+
+    scores = z_scores(db)
+    assert (1003, "Test 1") not in scores
+    assert scores[(1001, "Test 1")] == pytest.approx(-0.70710678)
+    assert db.execute_query("SELECT mean FROM grade_zscore_groups WHERE test = 'Test 2';")[0]["mean"] == 5
+
+
+def test_failed_refresh_marks_groups_dirty_until_retried(db, monkeypatch):
+    insert_grades(db, GRADES)
+    assert GradeNormalization.create_tables(db)
+    assert db.execute_command("UPDATE student_grades SET grade = 2 WHERE aem = 1003;")
+
+    execute_command = db.execute_command
+    monkeypatch.setattr(db, "execute_command", lambda *args, **kwargs: False)
+    assert not GradeNormalization.refresh(db, [("Test 1", 2023)])
+    assert GradeNormalization._dirty == {("Test 1", 2023)}
+
+    monkeypatch.setattr(db, "execute_command", execute_command)
+    assert GradeNormalization.refresh_dirty(db)
+    assert GradeNormalization._dirty == set()
+    assert z_scores(db)[(1003, "Test 1")] < 0
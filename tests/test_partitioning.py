@@ -0,0 +1,102 @@
+"""
+Tests for the year partitioning of student_grades (need TEST_DATABASE_URL)
+"""
+from database import GradePartitioning, StudentAggregates
+from database.partitioning import DEFAULT_PARTITION, partition_name
+
+from conftest import insert_grades
+
+GRADES = [
+    (1001, "Test 1", 6.5, 2022),
+    (1001, "Test 2", 4.0, 2022),
+    (1002, "Test 1", 9.0, 2023),
+    (1003, "Test 1", 7.25, 2023),
+]
+
+
+def aggregates(db):
+    rows = db.execute_query("SELECT aem, grade_count, grade_sum FROM student_aggregates ORDER BY aem;")
+    return [(row["aem"], row["grade_count"], float(row["grade_sum"])) for row in rows]
+
+
+def test_migrate_copies_rows_into_year_partitions(db):
+    insert_grades(db, GRADES)
+    assert StudentAggregates.create_tables(db)
+    before = aggregates(db)
+
+    assert not GradePartitioning.is_partitioned(db)
+    assert GradePartitioning.migrate(db)
+    assert GradePartitioning.is_partitioned(db)
+
+    years = GradePartitioning.partition_years(db)
+    assert {2022, 2023} <= set(years)
+    rows = db.execute_query(f"SELECT aem, test, grade, year FROM {partition_name(2023)} ORDER BY aem;")
+    assert [(row["aem"], float(row["grade"])) for row in rows] == [(1002, 9.0), (1003, 7.25)]
+    assert aggregates(db) == before
+
+    # The id sequence and the upsert key survive the migration
+    insert_grades(db, [(1004, "Test 1", 5.0, 2022)])
+    assert db.execute_command("""
+        INSERT INTO student_grades (aem, test, grade, year) VALUES (1004, 'Test 1', 8.0, 2022)
+        ON CONFLICT (aem, test, year) DO UPDATE SET grade = EXCLUDED.grade;
+    """)
+    rows = db.execute_query("SELECT id, grade FROM student_grades WHERE aem = 1004;")
+    assert len(rows) == 1 and float(rows[0]["grade"]) == 8.0 and rows[0]["id"] > len(GRADES)
+
+
+def test_ensure_partitions_moves_default_rows(db):
+    insert_grades(db, GRADES)
+    assert StudentAggregates.create_tables(db)
+    assert GradePartitioning.migrate(db, keep_old=False)
+
+    insert_grades(db, [(1001, "Test 1", 3.0, 2090), (1005, "Test 3", 8.5, 2090)])
+    assert db.execute_query(f"SELECT COUNT(*) as count FROM {DEFAULT_PARTITION};")[0]["count"] == 2
+    before = aggregates(db)
+
+    assert GradePartitioning.ensure_partitions(db)
+
+    assert 2090 in GradePartitioning.partition_years(db)
+    assert db.execute_query(f"SELECT COUNT(*) as count FROM {DEFAULT_PARTITION};")[0]["count"] == 0
+    assert db.execute_query(f"SELECT COUNT(*) as count FROM {partition_name(2090)};")[0]["count"] == 2
+    # The move between partitions is not counted again by the aggregates
+    assert aggregates(db) == before
+    # Known years need no further work
+    assert GradePartitioning.ensure_partitions(db, [2090])
+
+
+def test_ensure_partitions_is_a_no_op_without_partitioning(db):
+    insert_grades(db, GRADES)
+    assert GradePartitioning.ensure_partitions(db, [2090])
+    assert GradePartitioning.partition_years(db) == []
+
+
+def test_is_partitioned_is_cached(db, monkeypatch):
+    assert not GradePartitioning.is_partitioned(db)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("is_partitioned queried the catalog again")
+
+    monkeypatch.setattr(db, "execute_query", fail)
+    assert not GradePartitioning.is_partitioned(db)
+
+
+def test_frozen_year_stats_are_invalidated_by_writes(db):
+    insert_grades(db, GRADES)
+    assert GradePartitioning.migrate(db)
+    assert GradePartitioning.create_tables(db)
+    live = GradePartitioning.yearly_stats(db)
+
+    assert GradePartitioning.freeze_year(db, 2022)
+    assert db.execute_query("SELECT year FROM frozen_year_stats;") == [{"year": 2022}]
+    assert GradePartitioning.yearly_stats(db) == live
+
+    assert db.execute_command("UPDATE student_grades SET grade = 10 WHERE aem = 1001 AND year = 2022;")
+    assert db.execute_query("SELECT year FROM frozen_year_stats;") == []
+    stats = {row["year"]: row for row in GradePartitioning.yearly_stats(db)}
+    assert float(stats[2022]["average_grade"]) == 10.0
+
+
+def test_yearly_stats_without_frozen_table(db):
+    insert_grades(db, GRADES)
+    stats = GradePartitioning.yearly_stats(db)
+    assert [(row["year"], row["total_records"], row["unique_students"]) for row in stats] == [(2023, 2, 2), (2022, 2, 1)]
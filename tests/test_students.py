@@ -0,0 +1,12 @@
+"""
+Tests for the write bookkeeping of the students router
+"""
+from api.routers import students
+
+
+def test_sketch_refresh_runs_once_per_batch_of_rows(monkeypatch):
+    monkeypatch.setattr(students, "_sketch_rows", 0)
+    due = [students._sketch_refresh_due(1) for _ in range(2 * students.SKETCH_REFRESH_ROWS)]
+    assert due.count(True) == 2
+    assert due[students.SKETCH_REFRESH_ROWS - 1] and due[-1]
+    assert students._sketch_refresh_due(students.SKETCH_REFRESH_ROWS)
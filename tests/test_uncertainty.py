@@ -0,0 +1,73 @@
+"""
+Tests for the Latin hypercube fragility bands
+"""
+import numpy as np
+import pytest
+
+from fragility.core import fragility_probabilities
+from fragility.uncertainty import fragility_band, latin_hypercube, sample_parameter
+
+PGA = np.array([0.05, 0.1, 0.3, 0.6, 1.2])
+
+
+def test_latin_hypercube_has_one_sample_per_stratum():
+    samples = latin_hypercube(50, 3, np.random.default_rng(0))
+    assert samples.shape == (50, 3)
+    for column in samples.T:
+        assert sorted(np.floor(column * 50).astype(int)) == list(range(50))
+
+
+def test_sample_parameter_distributions():
+    u = np.array([0.1, 0.5, 0.9])
+    np.testing.assert_allclose(sample_parameter(0.4, None, u), 0.4)
+    np.testing.assert_allclose(sample_parameter(0.4, {"distribution": "uniform", "lower": 0.2, "upper": 0.6}, u),
+                               [0.24, 0.4, 0.56])
+
+    lognormal = sample_parameter(0.4, {"distribution": "lognormal", "std": 0.3}, u)
+    assert lognormal[1] == pytest.approx(0.4, rel=1e-6)
+    assert lognormal[0] * lognormal[2] == pytest.approx(0.16, rel=1e-6)
+
+    normal = sample_parameter(0.4, {"distribution": "normal", "std": 0.05}, u)
+    assert normal[1] == pytest.approx(0.4, rel=1e-6)
+    assert normal[0] + normal[2] == pytest.approx(0.8, rel=1e-6)
+
+
+@pytest.mark.parametrize("distribution, message", [
+    ({"distribution": "gamma", "std": 0.3}, "Distribution must be one of"),
+    ({"distribution": "uniform", "lower": 0.5, "upper": 0.2}, "0 < lower < upper"),
+    ({"distribution": "lognormal"}, "positive std"),
+    ({"distribution": "normal", "std": 1.0}, "non-positive parameter values"),
+])
+def test_sample_parameter_rejects_invalid_settings(distribution, message):
+    with pytest.raises(ValueError, match=message):
+        sample_parameter(0.4, distribution, np.array([0.01, 0.5, 0.99]))
+
+
+def test_band_without_uncertainty_is_the_nominal_curve():
+    band = fragility_band(PGA, 0.3, 0.5, samples=10, seed=1)
+    nominal = fragility_probabilities(PGA, 0.3, 0.5)
+    np.testing.assert_allclose(band["mean"], nominal, atol=1e-6)
+    for values in band["percentiles"].values():
+        np.testing.assert_allclose(values, nominal, atol=1e-6)
+
+
+def test_band_brackets_the_median_and_is_reproducible():
+    kwargs = dict(pga_mean_distribution={"distribution": "lognormal", "std": 0.3},
+                  beta_distribution={"distribution": "uniform", "lower": 0.4, "upper": 0.6},
+                  samples=2000, seed=7)
+    band = fragility_band(PGA, 0.3, 0.5, **kwargs)
+    percentiles = band["percentiles"]
+    assert set(percentiles) == {"5", "50", "95"}
+    assert np.all(percentiles["5"] <= percentiles["50"])
+    assert np.all(percentiles["50"] <= percentiles["95"])
+    assert np.all((band["mean"] > percentiles["5"]) & (band["mean"] < percentiles["95"]))
+
+    again = fragility_band(PGA, 0.3, 0.5, **kwargs)
+    np.testing.assert_array_equal(band["mean"], again["mean"])
+
+
+def test_band_validation():
+    with pytest.raises(ValueError, match="PGA values must be positive"):
+        fragility_band([0.0, 0.1], 0.3, 0.5)
+    with pytest.raises(ValueError, match="At least two samples"):
+        fragility_band(PGA, 0.3, 0.5, samples=1)